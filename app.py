@@ -3,6 +3,8 @@ from app.api.db_routes import db_bp
 from app.api.file_routes import file_bp
 from app.api.web_routes import web_bp
 from app.api.rag_routes import rag_bp
+from app.api.history_routes import history_bp
+from app.api.asgi_routes import create_asgi_app
 
 app = Flask(__name__, 
             template_folder='app/templates', 
@@ -17,10 +19,14 @@ app.register_blueprint(db_bp)
 app.register_blueprint(file_bp)
 app.register_blueprint(web_bp)
 app.register_blueprint(rag_bp)
+app.register_blueprint(history_bp)
 
 @app.route('/')
 def index():
     return render_template('index.html')
 
+# ASGI entry point: `uvicorn app:asgi_app` serves /rag/search asynchronously and the rest through Flask
+asgi_app = create_asgi_app(app)
+
 if __name__ == '__main__':
     app.run(debug=True)
@@ -1,6 +1,10 @@
 import json
+import time
+import asyncio
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from IPython.display import Image, display
-from typing import Annotated, Literal
+from typing import Annotated, Dict, List, Literal, Optional
 from typing_extensions import TypedDict
 from langchain_core.messages import ToolMessage
 from langgraph.graph.message import add_messages
@@ -20,19 +24,52 @@ class BasicToolNode:
     """A node that runs the tools requested in the last AIMessage.
 
     This class retrieves tool calls from the most recent AIMessage in the input
-    and invokes the corresponding tool to generate responses.
+    and invokes the corresponding tools concurrently. The returned `ToolMessage`s
+    keep the order of the tool calls, and a tool that fails or exceeds its timeout
+    produces an error `ToolMessage` instead of failing the whole step.
+
+    Concurrency is bounded per step (per `__call__`), not per process, so
+    conversations served at the same time do not queue behind each other. A
+    tool's timeout is counted from the moment it starts running, not from the
+    time it spent waiting for a free slot. Python threads cannot be interrupted:
+    a call that times out keeps running in the background until the tool
+    returns, but it no longer counts against the step's `max_concurrency`.
 
     Attributes:
         tools_by_name (dict): A dictionary mapping tool names to tool instances.
+        max_concurrency (int): The maximum number of tool calls of one step running at the same time.
+        timeout (float): The default number of seconds a tool call may take.
+        timeouts (dict): Per-tool overrides of `timeout`, keyed by tool name.
     """
 
-    def __init__(self, tools: list) -> None:
+    def __init__(self, tools: list, max_concurrency: int = 4, timeout: Optional[float] = None,
+                 timeouts: Optional[Dict[str, float]] = None) -> None:
         """Initializes the BasicToolNode with available tools.
 
         Args:
             tools (list): A list of tool objects, each having a `name` attribute.
+            max_concurrency (int): The maximum number of tool calls of one step running at the same time.
+            timeout (float, optional): The default number of seconds a tool call may take. None means no limit.
+            timeouts (dict, optional): Per-tool overrides of `timeout`, keyed by tool name.
         """
         self.tools_by_name = {tool.name: tool for tool in tools}
+        self.max_concurrency = max(1, max_concurrency)
+        self.timeout = timeout
+        self.timeouts = timeouts or {}
+
+    def _timeout_for(self, tool_name: str) -> Optional[float]:
+        """Returns the timeout in seconds that applies to the given tool."""
+        return self.timeouts.get(tool_name, self.timeout)
+
+    @staticmethod
+    def _error_message(tool_call: dict, error: str) -> ToolMessage:
+        """Builds the ToolMessage reported to the agent when a tool call fails."""
+        return ToolMessage(
+            content=json.dumps(f"Error: {error}"),
+            name=tool_call["name"],
+            tool_call_id=tool_call["id"],
+            status="error",
+        )
 
     def __call__(self, inputs: dict):
         """Executes the tools based on the tool calls in the last message.
@@ -41,7 +78,7 @@ class BasicToolNode:
             inputs (dict): A dictionary containing the input state with messages.
 
         Returns:
-            dict: A dictionary with a list of `ToolMessage` outputs.
+            dict: A dictionary with a list of `ToolMessage` outputs, in the order of the tool calls.
 
         Raises:
             ValueError: If no messages are found in the input.
@@ -50,20 +87,128 @@ class BasicToolNode:
             message = messages[-1]
         else:
             raise ValueError("No message found in input")
-        outputs = []
-        for tool_call in message.tool_calls:
-            tool_result = self.tools_by_name[tool_call["name"]].invoke(
-                tool_call["args"]
-            )
-            outputs.append(
-                ToolMessage(
+        tool_calls = message.tool_calls
+        outputs: List[Optional[ToolMessage]] = [None] * len(tool_calls)
+        # Bounded, so a slot handed back twice raises instead of silently lifting the bound
+        semaphore = threading.BoundedSemaphore(self.max_concurrency)
+        lock = threading.Lock()
+        started: Dict[int, float] = {}
+        finished = set()
+        abandoned = set()
+
+        def run_tool_call(i: int, tool, args: dict):
+            # The slot is taken inside the worker, so the timeout clock starts when the tool does
+            semaphore.acquire()
+            with lock:
+                started[i] = time.monotonic()
+            try:
+                return tool.invoke(args)
+            finally:
+                # Either the call finished in time or the step abandoned it, never both: the slot is released once
+                with lock:
+                    expired = i in abandoned
+                    if not expired:
+                        finished.add(i)
+                # The slot of a timed-out call was already handed back by the step
+                if not expired:
+                    semaphore.release()
+
+        pending = {}
+        executor = ThreadPoolExecutor(max_workers=max(1, len(tool_calls)), thread_name_prefix="tool-node")
+        for i, tool_call in enumerate(tool_calls):
+            tool = self.tools_by_name.get(tool_call["name"])
+            if tool is None:
+                outputs[i] = self._error_message(
+                    tool_call, f"Tool '{tool_call['name']}' does not exist.")
+                continue
+            pending[executor.submit(run_tool_call, i, tool, tool_call["args"])] = i
+
+        while pending:
+            with lock:
+                deadlines = [started[i] + self._timeout_for(tool_calls[i]["name"]) for i in pending.values()
+                             if i in started and self._timeout_for(tool_calls[i]["name"]) is not None]
+                waiting = any(i not in started for i in pending.values())
+            wait_timeout = max(0.0, min(deadlines) - time.monotonic()) if deadlines else None
+            if waiting:
+                # Queued calls get their deadline once they start, which no future completion signals
+                wait_timeout = 0.05 if wait_timeout is None else min(wait_timeout, 0.05)
+            done, _ = wait(list(pending), timeout=wait_timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                i = pending.pop(future)
+                tool_call = tool_calls[i]
+                try:
+                    tool_result = future.result()
+                except Exception as e:
+                    outputs[i] = self._error_message(
+                        tool_call, f"Tool '{tool_call['name']}' failed: {e!r}")
+                    continue
+                outputs[i] = ToolMessage(
                     content=json.dumps(tool_result),
                     name=tool_call["name"],
                     tool_call_id=tool_call["id"],
                 )
-            )
+            now = time.monotonic()
+            for future, i in list(pending.items()):
+                timeout = self._timeout_for(tool_calls[i]["name"])
+                with lock:
+                    # A call that finished is collected by the next wait, even if its future is not marked done yet
+                    if i in finished or i not in started or timeout is None or now < started[i] + timeout:
+                        continue
+                    abandoned.add(i)
+                semaphore.release()
+                del pending[future]
+                outputs[i] = self._error_message(
+                    tool_calls[i], f"Tool '{tool_calls[i]['name']}' did not finish within {timeout} seconds.")
+        # Timed-out calls keep running in their threads; the step does not wait for them
+        executor.shutdown(wait=False)
         return {"messages": outputs}
 
+    async def acall(self, inputs: dict):
+        """Asynchronous variant of `__call__` that awaits the tools' `ainvoke` on the running event loop.
+
+        Concurrency is bounded by `max_concurrency` through a semaphore, so no thread is held while a tool
+        waits on the network. The timeout starts once the semaphore is acquired; a tool whose `ainvoke` runs
+        its sync implementation in a thread keeps running there after it timed out.
+
+        Args:
+            inputs (dict): A dictionary containing the input state with messages.
+
+        Returns:
+            dict: A dictionary with a list of `ToolMessage` outputs, in the order of the tool calls.
+
+        Raises:
+            ValueError: If no messages are found in the input.
+        """
+        if messages := inputs.get("messages", []):
+            message = messages[-1]
+        else:
+            raise ValueError("No message found in input")
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def run_tool_call(tool_call: dict) -> ToolMessage:
+            tool = self.tools_by_name.get(tool_call["name"])
+            if tool is None:
+                return self._error_message(
+                    tool_call, f"Tool '{tool_call['name']}' does not exist.")
+            timeout = self._timeout_for(tool_call["name"])
+            async with semaphore:
+                try:
+                    tool_result = await asyncio.wait_for(tool.ainvoke(tool_call["args"]), timeout=timeout)
+                except asyncio.TimeoutError:
+                    return self._error_message(
+                        tool_call, f"Tool '{tool_call['name']}' did not finish within {timeout} seconds.")
+                except Exception as e:
+                    return self._error_message(
+                        tool_call, f"Tool '{tool_call['name']}' failed: {e!r}")
+            return ToolMessage(
+                content=json.dumps(tool_result),
+                name=tool_call["name"],
+                tool_call_id=tool_call["id"],
+            )
+
+        outputs = await asyncio.gather(*(run_tool_call(tool_call) for tool_call in message.tool_calls))
+        return {"messages": list(outputs)}
+
 
 def route_tools(
     state: State,
@@ -1,12 +1,15 @@
 from langgraph.checkpoint.memory import MemorySaver
 from langgraph.graph import StateGraph, START
 from langchain_openai import ChatOpenAI
+from langchain_core.runnables import RunnableLambda
 from ..agent_graph.tool_chinook_sqlagent import query_chinook_sqldb
 from ..agent_graph.tool_travel_sqlagent import query_travel_sqldb
 from ..agent_graph.tool_lookup_policy_rag import lookup_swiss_airline_policy
 from ..agent_graph.tool_tavily_search import load_tavily_search_tool
 from ..agent_graph.tool_stories_rag import lookup_stories
+from ..agent_graph.tool_sql_result_pages import fetch_sql_result_page
 from ..agent_graph.load_tools_config import LoadToolsConfig
+from ..agent_graph.tool_registry import TOOL_REGISTRY
 from ..agent_graph.agent_backend import State, BasicToolNode, route_tools, plot_agent_schema
 
 TOOLS_CFG = LoadToolsConfig()
@@ -28,6 +31,8 @@ def build_graph():
     2. Defines nodes in the graph where each node represents a specific action:
        - Chatbot node: Executes the LLM with the given state and messages.
        - Tools node: Runs the tool invocations based on the last message in the input state.
+       Both nodes have a synchronous and an asynchronous implementation, so the graph can be run with
+       `stream` as well as with `astream`.
     3. Implements conditional routing between the chatbot and tools:
        - If a tool is required, it routes to the tools node.
        - Otherwise, the flow ends.
@@ -56,7 +61,11 @@ def build_graph():
              lookup_stories,
              query_travel_sqldb,
              query_chinook_sqldb,
+             fetch_sql_result_page,
              ]
+    if TOOLS_CFG.warm_up_tools:
+        # Build the shared tool backends now so the first user request does not pay for it
+        TOOL_REGISTRY.warm_up()
     # Tell the LLM which tools it can call
     primary_llm_with_tools = primary_llm.bind_tools(tools)
 
@@ -64,7 +73,11 @@ def build_graph():
         """Executes the primary language model with tools bound and returns the generated message."""
         return {"messages": [primary_llm_with_tools.invoke(state["messages"])]}
 
-    graph_builder.add_node("chatbot", chatbot)
+    async def achatbot(state: State):
+        """Asynchronous variant of `chatbot`, used when the graph is run with `ainvoke`/`astream`."""
+        return {"messages": [await primary_llm_with_tools.ainvoke(state["messages"])]}
+
+    graph_builder.add_node("chatbot", RunnableLambda(chatbot, afunc=achatbot))
     tool_node = BasicToolNode(
         tools=[
             search_tool,
@@ -72,8 +85,12 @@ def build_graph():
             lookup_stories,
             query_travel_sqldb,
             query_chinook_sqldb,
-        ])
-    graph_builder.add_node("tools", tool_node)
+            fetch_sql_result_page,
+        ],
+        max_concurrency=TOOLS_CFG.tool_node_max_concurrency,
+        timeout=TOOLS_CFG.tool_node_timeout,
+        timeouts=TOOLS_CFG.tool_node_timeouts)
+    graph_builder.add_node("tools", RunnableLambda(tool_node, afunc=tool_node.acall))
     # The `tools_condition` function returns "tools" if the chatbot asks to use a tool, and "__end__" if
     # it is fine directly responding. This conditional routing defines the main agent loop.
     graph_builder.add_conditional_edges(
@@ -0,0 +1,336 @@
+import os
+import re
+import json
+import math
+import asyncio
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import numpy as np
+from langchain_chroma import Chroma
+from langchain_core.documents import Document
+from ..agent_graph.table_router import STOPWORDS, stem
+from ..utils.vectorstore_manager import VectorStoreManager
+
+
+def tokenize(text: str) -> List[str]:
+    """Splits free text into lower-cased, stemmed content words, keeping non-ASCII letters (e.g. "Zürich")."""
+    return [stem(word) for word in re.findall(r"\w+", text.lower()) if word not in STOPWORDS]
+
+
+class BM25Index:
+    """
+    An in-memory inverted index that ranks documents with Okapi BM25.
+
+    Every term maps to the indexes of the documents containing it and its frequency in each, so a query only
+    touches the postings of its own terms. The index is saved next to the Chroma collection it was built from
+    (`<collection>.bm25.json`), together with the signature of the collection's files, and rebuilt when the
+    collection changes.
+
+    Attributes:
+        ids (List[str]): The ids of the documents in the Chroma collection.
+        documents (List[str]): The texts of the documents.
+        metadatas (List[dict]): The metadata of the documents.
+        k1 (float): The BM25 term frequency saturation.
+        b (float): The BM25 document length normalization.
+        signature (list): The signature of the collection files the index was built from.
+    """
+
+    def __init__(self, ids: List[str], documents: List[str], metadatas: List[Optional[dict]], k1: float = 1.5,
+                 b: float = 0.75, signature: Optional[list] = None) -> None:
+        """
+        Builds the index.
+
+        Args:
+            ids (List[str]): The ids of the documents.
+            documents (List[str]): The texts of the documents.
+            metadatas (List[dict]): The metadata of the documents.
+            k1 (float): The BM25 term frequency saturation.
+            b (float): The BM25 document length normalization.
+            signature (list, optional): The signature of the collection files the documents were read from.
+        """
+        self.ids = ids
+        self.documents = documents
+        self.metadatas = [metadata or {} for metadata in metadatas]
+        self.k1 = k1
+        self.b = b
+        self.signature = signature
+        postings: Dict[str, Dict[int, int]] = {}
+        lengths = []
+        for i, text in enumerate(documents):
+            terms = tokenize(text or "")
+            lengths.append(len(terms))
+            for term in terms:
+                doc_counts = postings.setdefault(term, {})
+                doc_counts[i] = doc_counts.get(i, 0) + 1
+        self._postings = {term: (np.fromiter(counts.keys(), dtype=np.int64, count=len(counts)),
+                                 np.fromiter(counts.values(), dtype=np.float32, count=len(counts)))
+                          for term, counts in postings.items()}
+        self._lengths = np.asarray(lengths, dtype=np.float32)
+        self._average_length = float(self._lengths.mean()) if lengths else 0.0
+
+    def __len__(self) -> int:
+        return len(self.documents)
+
+    def _idf(self, term: str) -> float:
+        """Returns the inverse document frequency of a term."""
+        frequency = len(self._postings[term][0])
+        return math.log(1 + (len(self.documents) - frequency + 0.5) / (frequency + 0.5))
+
+    def scores(self, terms: List[str]) -> np.ndarray:
+        """
+        Scores every document against query terms.
+
+        Args:
+            terms (List[str]): The tokenized query.
+
+        Returns:
+            np.ndarray: The BM25 score of every document, 0 for documents sharing no term with the query.
+        """
+        scores = np.zeros(len(self.documents), dtype=np.float32)
+        if not self._average_length:
+            return scores
+        for term in set(terms):
+            if term not in self._postings:
+                continue
+            doc_indexes, frequencies = self._postings[term]
+            norms = self.k1 * (1 - self.b + self.b * self._lengths[doc_indexes] / self._average_length)
+            scores[doc_indexes] += self._idf(term) * frequencies * (self.k1 + 1) / (frequencies + norms)
+        return scores
+
+    def matching_all(self, terms: List[str]) -> np.ndarray:
+        """Returns the indexes of the documents containing every one of the terms."""
+        matching = None
+        for term in set(terms):
+            if term not in self._postings:
+                return np.empty(0, dtype=np.int64)
+            doc_indexes = self._postings[term][0]
+            matching = doc_indexes if matching is None else np.intersect1d(matching, doc_indexes, assume_unique=True)
+        return matching if matching is not None else np.empty(0, dtype=np.int64)
+
+    def search(self, query: str, k: int) -> List[Tuple[int, float]]:
+        """
+        Returns the best matching documents of a query.
+
+        Args:
+            query (str): The query.
+            k (int): The number of documents to return.
+
+        Returns:
+            List[Tuple[int, float]]: The indexes and scores of up to `k` documents with a positive score, best first.
+        """
+        scores = self.scores(tokenize(query))
+        if not len(scores):
+            return []
+        top = np.argpartition(-scores, min(k, len(scores)) - 1)[:k]
+        return [(int(i), float(scores[i])) for i in top[np.argsort(-scores[top])] if scores[i] > 0]
+
+    def document(self, i: int) -> Document:
+        """Returns a document of the index as a LangChain `Document`."""
+        return Document(page_content=self.documents[i], metadata=self.metadatas[i], id=self.ids[i])
+
+    def save(self, path: str) -> None:
+        """Writes the documents and the signature to a JSON file; the postings are rebuilt on load."""
+        with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+            json.dump({"signature": self.signature, "k1": self.k1, "b": self.b, "ids": self.ids,
+                       "documents": self.documents, "metadatas": self.metadatas}, f)
+        os.replace(f"{path}.tmp", path)
+
+    @classmethod
+    def load(cls, path: str) -> "BM25Index":
+        """Reads an index written by `save`."""
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(data["ids"], data["documents"], data["metadatas"], k1=data["k1"], b=data["b"],
+                   signature=data["signature"])
+
+    @classmethod
+    def from_collection(cls, vectordb: Chroma, signature: Optional[list] = None, page_size: int = 5000) -> "BM25Index":
+        """
+        Builds the index of every document of a Chroma collection.
+
+        Args:
+            vectordb (Chroma): The vector store handle of the collection.
+            signature (list, optional): The signature of the collection files.
+            page_size (int): The number of documents read from Chroma at a time.
+
+        Returns:
+            BM25Index: The index.
+        """
+        ids, documents, metadatas = [], [], []
+        total = vectordb._collection.count()
+        for offset in range(0, total, page_size):
+            page = vectordb._collection.get(include=["documents", "metadatas"], limit=page_size, offset=offset)
+            ids.extend(page["ids"])
+            documents.extend(page["documents"])
+            metadatas.extend(page["metadatas"])
+        return cls(ids, documents, metadatas, signature=signature)
+
+
+class HybridRetriever:
+    """
+    Retrieves documents from a Chroma collection by fusing a BM25 ranking with the vector ranking.
+
+    Queries that name an exact term (a policy name, a fare class, a character) are answered by the lexical fast
+    path without an embedding call: when the query has at most `fast_path_max_terms` content words, some documents
+    contain all of them, and the best of those outscores every other document by `fast_path_margin`, those
+    documents are returned directly. Other queries run the vector search and the BM25 search, each for
+    `candidates` results, and merge them with reciprocal rank fusion, so documents ranked well by either method
+    come first and keyword-heavy queries keep the recall the embedding alone would miss.
+
+    The BM25 index is loaded from the file next to the collection, and (re)built from the collection when that
+    file is missing or the collection changed since.
+
+    Attributes:
+        persist_directory (str): The directory of the Chroma database.
+        collection_name (str): The name of the collection.
+        rrf_k (int): The rank offset of reciprocal rank fusion; higher values flatten the weight of top ranks.
+        candidates (int): The number of results taken from each ranking before fusion.
+        fast_path_max_terms (int): The maximum number of content words of a query for the lexical fast path.
+        fast_path_margin (float): How much the best full match must outscore every partial match.
+        lexical_hits (int): Queries answered by the lexical fast path.
+        hybrid_hits (int): Queries answered by fusion.
+    """
+
+    def __init__(self, persist_directory: str, collection_name: str, vectordb_factory: Callable[[], Chroma],
+                 vector_store_factory: Optional[Callable[[], Any]] = None, rrf_k: int = 60, candidates: int = 10,
+                 fast_path_max_terms: int = 4, fast_path_margin: float = 1.5) -> None:
+        """
+        Initializes the retriever without loading the index.
+
+        Args:
+            persist_directory (str): The directory of the Chroma database.
+            collection_name (str): The name of the collection.
+            vectordb_factory (Callable[[], Chroma]): Returns the current Chroma handle of the collection, which the
+                BM25 index is built from.
+            vector_store_factory (Callable, optional): Returns the store answering the vector searches, e.g. a
+                `CompactVectorIndex` of the collection. Defaults to the Chroma handle.
+            rrf_k (int): The rank offset of reciprocal rank fusion.
+            candidates (int): The number of results taken from each ranking before fusion.
+            fast_path_max_terms (int): The maximum number of content words of a query for the lexical fast path.
+            fast_path_margin (float): How much the best full match must outscore every partial match.
+        """
+        self.persist_directory = str(persist_directory)
+        self.collection_name = collection_name
+        self.vectordb_factory = vectordb_factory
+        self.vector_store_factory = vector_store_factory or vectordb_factory
+        self.rrf_k = rrf_k
+        self.candidates = candidates
+        self.fast_path_max_terms = fast_path_max_terms
+        self.fast_path_margin = fast_path_margin
+        self.lexical_hits = 0
+        self.hybrid_hits = 0
+        self._index: Optional[BM25Index] = None
+        self._lock = threading.Lock()
+
+    @property
+    def index_path(self) -> str:
+        """The file of the BM25 index, next to the collection."""
+        return os.path.join(self.persist_directory, f"{self.collection_name}.bm25.json")
+
+    @property
+    def index(self) -> BM25Index:
+        """The BM25 index of the collection, rebuilt when the collection files changed."""
+        signature = VectorStoreManager._signature(self.persist_directory)
+        signature = list(signature) if signature is not None else None
+        with self._lock:
+            if self._index is not None and self._index.signature == signature:
+                return self._index
+            if os.path.exists(self.index_path):
+                index = BM25Index.load(self.index_path)
+                if index.signature == signature:
+                    self._index = index
+                    return index
+            print(f"Building the BM25 index of '{self.collection_name}'")
+            self._index = BM25Index.from_collection(self.vectordb_factory(), signature=signature)
+            self._index.save(self.index_path)
+            return self._index
+
+    def refresh(self) -> BM25Index:
+        """
+        Brings the BM25 index up to date with the collection now, rather than on the first lookup after a change.
+
+        Returns:
+            BM25Index: The current index.
+        """
+        return self.index
+
+    def lexical_search(self, query: str, k: int, index: Optional[BM25Index] = None) -> Optional[List[Document]]:
+        """
+        Answers a query from the BM25 index alone when it names an exact term.
+
+        Args:
+            query (str): The query.
+            k (int): The number of documents to return.
+            index (BM25Index, optional): The index to search, already loaded. Defaults to `index`.
+
+        Returns:
+            List[Document]: The documents containing every word of the query, best first, or None when the query
+            needs the hybrid search.
+        """
+        terms = tokenize(query)
+        if not terms or len(set(terms)) > self.fast_path_max_terms:
+            return None
+        index = index if index is not None else self.index
+        matching = index.matching_all(terms)
+        if not len(matching):
+            return None
+        scores = index.scores(terms)
+        partial = scores.copy()
+        partial[matching] = 0
+        best = matching[np.argsort(-scores[matching])][:k]
+        if scores[best[0]] < self.fast_path_margin * partial.max(initial=0):
+            return None
+        return [index.document(int(i)) for i in best]
+
+    def _fuse(self, query: str, vector_docs: List[Document], k: int,
+              index: Optional[BM25Index] = None) -> List[Document]:
+        """Merges the vector ranking with the BM25 ranking by reciprocal rank fusion."""
+        index = index if index is not None else self.index
+        fused: Dict[str, float] = {}
+        documents: Dict[str, Document] = {}
+        for rank, doc in enumerate(vector_docs):
+            key = doc.id or doc.page_content
+            fused[key] = fused.get(key, 0.0) + 1 / (self.rrf_k + rank + 1)
+            documents[key] = doc
+        for rank, (i, _) in enumerate(index.search(query, self.candidates)):
+            key = index.ids[i]
+            if key not in documents:
+                # Documents returned without an id by older Chroma versions are matched by their text
+                key = next((key for key, doc in documents.items() if doc.page_content == index.documents[i]), key)
+            fused[key] = fused.get(key, 0.0) + 1 / (self.rrf_k + rank + 1)
+            documents.setdefault(key, index.document(i))
+        return [documents[key] for key in sorted(fused, key=fused.get, reverse=True)[:k]]
+
+    def search(self, query: str, k: int) -> List[Document]:
+        """
+        Retrieves the `k` documents most relevant to a query.
+
+        Args:
+            query (str): The query.
+            k (int): The number of documents to return.
+
+        Returns:
+            List[Document]: The documents, most relevant first.
+        """
+        docs = self.lexical_search(query, k)
+        if docs is not None:
+            self.lexical_hits += 1
+            return docs
+        self.hybrid_hits += 1
+        return self._fuse(query, self.vector_store_factory().similarity_search(query, k=max(k, self.candidates)), k)
+
+    async def asearch(self, query: str, k: int) -> List[Document]:
+        """
+        Asynchronous variant of `search`. Loading or rebuilding the BM25 index (and opening the vector store, which
+        may export it) reads the whole collection and writes files, so it runs in a worker thread rather than on
+        the event loop; the BM25 searches then run in memory and the vector search is awaited.
+        """
+        index = await asyncio.to_thread(lambda: self.index)
+        docs = self.lexical_search(query, k, index=index)
+        if docs is not None:
+            self.lexical_hits += 1
+            return docs
+        self.hybrid_hits += 1
+        vector_store = await asyncio.to_thread(self.vector_store_factory)
+        vector_docs = await vector_store.asimilarity_search(query, k=max(k, self.candidates))
+        return self._fuse(query, vector_docs, k, index=index)
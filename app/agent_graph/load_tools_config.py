@@ -12,6 +12,9 @@ class LoadToolsConfig:
     def __init__(self) -> None:
         with open(here("app/configs/tools_config.yml")) as cfg:
             app_config = yaml.load(cfg, Loader=yaml.FullLoader)
+        # The embedding settings are shared with the ingestion services, which read the same sections
+        with open(here("app/configs/app_config.yml")) as cfg:
+            shared_config = yaml.load(cfg, Loader=yaml.FullLoader)
 
         # Set environment variables
         os.environ['OPENAI_API_KEY'] = os.getenv("OPENAI_API_KEY")
@@ -21,6 +24,102 @@ class LoadToolsConfig:
         self.primary_agent_llm = app_config["primary_agent"]["llm"]
         self.primary_agent_llm_temperature = app_config["primary_agent"]["llm_temperature"]
 
+        # Schema snapshot configs
+        self.schema_snapshot_sample_rows = int(
+            app_config["schema_snapshot"]["sample_rows"])
+
+        # SQL query cache configs
+        self.sql_query_cache_path = str(here(
+            app_config["sql_query_cache"]["path"]))
+        self.sql_query_cache_max_entries = int(
+            app_config["sql_query_cache"]["max_entries"])
+
+        # SQL result pagination configs
+        self.sql_results_max_rows = int(
+            app_config["sql_results"]["max_rows"])
+        self.sql_results_max_bytes = int(
+            app_config["sql_results"]["max_bytes"])
+        self.sql_results_max_handles = int(
+            app_config["sql_results"]["max_handles"])
+
+        # SQL cost guard configs
+        self.sql_cost_guard_max_scan_rows = int(
+            app_config["sql_cost_guard"]["max_scan_rows"])
+        self.sql_cost_guard_implicit_limit = int(
+            app_config["sql_cost_guard"]["implicit_limit"])
+        self.sql_cost_guard_timeout = float(
+            app_config["sql_cost_guard"]["timeout"])
+
+        # SQL result cache configs
+        self.sql_result_cache_max_bytes = int(
+            app_config["sql_result_cache"]["max_bytes"])
+        self.sql_result_cache_max_result_bytes = int(
+            app_config["sql_result_cache"]["max_result_bytes"])
+
+        # Embedding cache configs (app_config.yml)
+        self.embedding_cache_path = str(here(
+            shared_config["embedding_cache"]["path"]))
+        self.embedding_cache_memory_max_entries = int(
+            shared_config["embedding_cache"]["memory_max_entries"])
+        self.embedding_cache_disk_max_entries = int(
+            shared_config["embedding_cache"]["disk_max_entries"])
+
+        # Embedding backend configs (app_config.yml)
+        self.embedding_provider = shared_config["embedding_backend"]["provider"]
+        self.embedding_backend_configs = {
+            "local_model": shared_config["embedding_backend"]["local_model"],
+            "dimensions": int(shared_config["embedding_backend"]["dimensions"]),
+            "batch_size": int(shared_config["embedding_backend"]["batch_size"]),
+        }
+
+        # Embedding client configs (app_config.yml)
+        self.embedding_client_base_url = shared_config["embedding_client"]["base_url"]
+        self.embedding_client_configs = {
+            "max_concurrency": int(shared_config["embedding_client"]["max_concurrency"]),
+            "requests_per_minute": int(shared_config["embedding_client"]["requests_per_minute"]),
+            "tokens_per_minute": int(shared_config["embedding_client"]["tokens_per_minute"]),
+            "max_retries": int(shared_config["embedding_client"]["max_retries"]),
+        }
+        self.embedding_batch_configs = {
+            "batch_size": int(shared_config["embedding_batches"]["batch_size"]),
+            "max_batch_tokens": int(shared_config["embedding_batches"]["max_tokens"]),
+        }
+
+        # Document ingestion configs
+        self.document_ingestion_workers = int(
+            app_config["document_ingestion"]["workers"])
+        self.document_ingestion_checkpoint_dir = str(here(
+            app_config["document_ingestion"]["checkpoint_dir"]))
+
+        # Vector index configs
+        self.vector_index_engine = app_config["vector_index"]["engine"]
+        self.vector_index_dtype = app_config["vector_index"]["dtype"]
+
+        # Hybrid retrieval configs
+        self.hybrid_retrieval_enabled = bool(
+            app_config["hybrid_retrieval"]["enabled"])
+        self.hybrid_retrieval_configs = {
+            "rrf_k": int(app_config["hybrid_retrieval"]["rrf_k"]),
+            "candidates": int(app_config["hybrid_retrieval"]["candidates"]),
+            "fast_path_max_terms": int(app_config["hybrid_retrieval"]["fast_path_max_terms"]),
+            "fast_path_margin": float(app_config["hybrid_retrieval"]["fast_path_margin"]),
+        }
+
+        # Context packing configs
+        self.context_packing_configs = {
+            "max_tokens": int(app_config["context_packing"]["max_tokens"]),
+            "near_duplicate_threshold": float(app_config["context_packing"]["near_duplicate_threshold"]),
+            "min_chunk_tokens": int(app_config["context_packing"]["min_chunk_tokens"]),
+        }
+
+        # Tool node configs
+        self.tool_node_max_concurrency = int(
+            app_config["tool_node"]["max_concurrency"])
+        self.tool_node_timeout = float(
+            app_config["tool_node"]["tool_timeout"])
+        self.tool_node_timeouts = {
+            name: float(timeout) for name, timeout in (app_config["tool_node"]["tool_timeouts"] or {}).items()}
+
         # Internet Search config
         self.tavily_search_max_results = int(
             app_config["tavily_search_api"]["tavily_search_max_results"])
@@ -59,6 +158,7 @@ class LoadToolsConfig:
         self.travel_sqlagent_llm = app_config["travel_sqlagent_configs"]["llm"]
         self.travel_sqlagent_llm_temperature = float(
             app_config["travel_sqlagent_configs"]["llm_temperature"])
+        self.travel_sqlagent_table_router = app_config["travel_sqlagent_configs"]["table_router"]
 
         # Chinook SQL agent configs
         self.chinook_sqldb_directory = str(here(
@@ -66,7 +166,10 @@ class LoadToolsConfig:
         self.chinook_sqlagent_llm = app_config["chinook_sqlagent_configs"]["llm"]
         self.chinook_sqlagent_llm_temperature = float(
             app_config["chinook_sqlagent_configs"]["llm_temperature"])
+        self.chinook_sqlagent_table_router = app_config["chinook_sqlagent_configs"]["table_router"]
 
         # Graph configs
         self.thread_id = str(
             app_config["graph_configs"]["thread_id"])
+        self.warm_up_tools = bool(
+            app_config["graph_configs"]["warm_up_tools"])
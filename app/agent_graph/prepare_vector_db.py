@@ -0,0 +1,102 @@
+"""
+Builds the Chroma collections of the RAG tools from their `unstructured_docs` directories.
+
+Usage:
+    python -m app.agent_graph.prepare_vector_db            # both collections
+    python -m app.agent_graph.prepare_vector_db stories_rag
+"""
+import sys
+from typing import Dict
+from ..agent_graph.load_tools_config import LoadToolsConfig
+from ..agent_graph.tool_registry import TOOL_REGISTRY
+from ..agent_graph import tool_lookup_policy_rag, tool_stories_rag  # noqa: F401 (registers the RAG tools)
+from ..utils.vectorstore_manager import VECTORSTORE_MANAGER
+from ..utils.compact_vector_index import get_compact_index
+from ..utils.document_ingestion import DocumentIngestor
+
+TOOLS_CFG = LoadToolsConfig()
+
+
+class PrepareVectorDB:
+    """
+    Indexes the documents of a RAG tool into the collection the tool reads from.
+
+    The collection is written through the tool's own shared Chroma handle and embedding model, so the chunks are
+    embedded by the same (cached, rate-limited) model that embeds the tool's queries. Only new or changed files are
+    processed on later runs. Once the collection is up to date, the BM25 index of the tool's hybrid retriever (and
+    the compact vector index, when that engine is configured) is rebuilt next to it.
+
+    Attributes:
+        rag_tool_name (str): The name of the RAG tool in the tool registry.
+        docs_dir (str): The directory of the PDF and text files.
+        chunk_size (int): The maximum number of characters of a chunk.
+        chunk_overlap (int): The number of characters shared by consecutive chunks.
+    """
+
+    def __init__(self, rag_tool_name: str, docs_dir: str, chunk_size: int, chunk_overlap: int) -> None:
+        """
+        Initializes the preparation of one collection.
+
+        Args:
+            rag_tool_name (str): The name of the RAG tool in the tool registry.
+            docs_dir (str): The directory of the PDF and text files.
+            chunk_size (int): The maximum number of characters of a chunk.
+            chunk_overlap (int): The number of characters shared by consecutive chunks.
+        """
+        self.rag_tool_name = rag_tool_name
+        self.docs_dir = docs_dir
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+
+    def run(self) -> Dict:
+        """
+        Brings the collection in line with the documents directory.
+
+        Returns:
+            dict: The statistics of the run, as returned by `DocumentIngestor.sync_directory`.
+        """
+        rag_tool = TOOL_REGISTRY.get(self.rag_tool_name)
+        vectordb = rag_tool.vectordb
+        # The tool's embedding model is the shared embedding cache wrapping the embedding executor
+        embeddings = vectordb.embeddings
+        ingestor = DocumentIngestor(
+            collection=vectordb._collection,
+            executor=embeddings.underlying,
+            embed_fn=embeddings.embed_documents,
+            chunk_size=self.chunk_size,
+            chunk_overlap=self.chunk_overlap,
+            workers=TOOLS_CFG.document_ingestion_workers,
+            checkpoint_dir=TOOLS_CFG.document_ingestion_checkpoint_dir)
+        print(f"Indexing {self.docs_dir} into '{rag_tool.collection_name}'")
+        stats = ingestor.sync_directory(self.docs_dir)
+        VECTORSTORE_MANAGER.mark_updated(rag_tool.vectordb_dir)
+        print("Number of vectors in vectordb:", vectordb._collection.count())
+        # Rebuilt now rather than on the first lookup
+        rag_tool.retriever.refresh()
+        if TOOLS_CFG.vector_index_engine == "compact":
+            get_compact_index(
+                persist_directory=rag_tool.vectordb_dir,
+                collection_name=rag_tool.collection_name,
+                embedding_function=lambda: rag_tool.embedding_function,
+                vectordb_factory=lambda: rag_tool.vectordb,
+                dtype=TOOLS_CFG.vector_index_dtype)
+        return stats
+
+
+VECTOR_DBS = {
+    "swiss_airline_policy_rag": lambda: PrepareVectorDB(
+        rag_tool_name="swiss_airline_policy_rag",
+        docs_dir=TOOLS_CFG.policy_rag_unstructured_docs_directory,
+        chunk_size=TOOLS_CFG.policy_rag_chunk_size,
+        chunk_overlap=TOOLS_CFG.policy_rag_chunk_overlap),
+    "stories_rag": lambda: PrepareVectorDB(
+        rag_tool_name="stories_rag",
+        docs_dir=TOOLS_CFG.stories_rag_unstructured_docs_directory,
+        chunk_size=TOOLS_CFG.stories_rag_chunk_size,
+        chunk_overlap=TOOLS_CFG.stories_rag_chunk_overlap),
+}
+
+
+if __name__ == "__main__":
+    for name in sys.argv[1:] or list(VECTOR_DBS):
+        VECTOR_DBS[name]().run()
@@ -0,0 +1,203 @@
+import os
+import json
+import sqlite3
+from typing import Dict, Iterable, List, Optional
+from langchain_community.utilities import SQLDatabase
+from ..agent_graph.sql_query_cache import schema_fingerprint
+from ..utils.sqlite_pool import create_sqlite_engine
+
+
+class SchemaSnapshot:
+    """
+    A precomputed description of a SQLite database: the DDL, column names and a few sample rows of every table,
+    rendered the way the SQL agents' prompts expect them.
+
+    A snapshot is computed once per version of the database file and stored as JSON next to it
+    (`<db file>.schema.json`), so restarting the server or rebuilding an agent does not reflect the schema or
+    query sample rows again. A snapshot is stale as soon as the database file's modification time or size changes.
+
+    Attributes:
+        db_path (str): The path of the SQLite database file.
+        version (dict): The file modification time, size and schema fingerprint the snapshot was computed for.
+        tables (dict): Maps each table name to its `ddl`, `columns`, `sample_rows` and rendered `table_info`.
+    """
+
+    def __init__(self, db_path: str, version: dict, tables: Dict[str, dict]) -> None:
+        """
+        Initializes a snapshot from already computed data. Use `load_or_build` to obtain one.
+
+        Args:
+            db_path (str): The path of the SQLite database file.
+            version (dict): The file modification time, size and schema fingerprint of the snapshot.
+            tables (dict): Maps each table name to its `ddl`, `columns`, `sample_rows` and `table_info`.
+        """
+        self.db_path = db_path
+        self.version = version
+        self.tables = tables
+
+    @staticmethod
+    def snapshot_path(db_path: str) -> str:
+        """Returns the path of the JSON file holding the snapshot of a database."""
+        return f"{db_path}.schema.json"
+
+    @staticmethod
+    def _file_version(db_path: str) -> dict:
+        """Returns the modification time and size of the database file."""
+        stat = os.stat(db_path)
+        return {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size}
+
+    @classmethod
+    def load_or_build(cls, db_path: str, sample_rows: int = 3) -> "SchemaSnapshot":
+        """
+        Loads the stored snapshot of a database, or computes and stores it if it is missing or stale.
+
+        Args:
+            db_path (str): The path of the SQLite database file.
+            sample_rows (int): The number of sample rows to include per table.
+
+        Returns:
+            SchemaSnapshot: The snapshot of the current version of the database.
+        """
+        file_version = cls._file_version(db_path)
+        path = cls.snapshot_path(db_path)
+        if os.path.exists(path):
+            try:
+                with open(path) as f:
+                    stored = json.load(f)
+                version = stored["version"]
+                if (version["mtime_ns"], version["size"], version["sample_rows"]) == \
+                        (file_version["mtime_ns"], file_version["size"], sample_rows):
+                    return cls(db_path, version, stored["tables"])
+            except (OSError, ValueError, KeyError) as e:
+                print(f"Ignoring unreadable schema snapshot {path}: {e}")
+        snapshot = cls.build(db_path, sample_rows=sample_rows)
+        snapshot.save()
+        return snapshot
+
+    @classmethod
+    def build(cls, db_path: str, sample_rows: int = 3) -> "SchemaSnapshot":
+        """
+        Computes the snapshot of a database by reading its catalogue and a few rows of every table.
+
+        Args:
+            db_path (str): The path of the SQLite database file.
+            sample_rows (int): The number of sample rows to include per table.
+
+        Returns:
+            SchemaSnapshot: The computed snapshot.
+        """
+        version = cls._file_version(db_path)
+        version["sample_rows"] = sample_rows
+        version["fingerprint"] = schema_fingerprint(db_path)
+        tables = {}
+        conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+        try:
+            rows = conn.execute(
+                "SELECT name, sql FROM sqlite_master WHERE type = 'table' "
+                "AND name NOT LIKE 'sqlite_%' ORDER BY name").fetchall()
+            for name, ddl in rows:
+                columns = [column[1] for column in conn.execute(f'PRAGMA table_info("{name}")')]
+                try:
+                    samples = conn.execute(f'SELECT * FROM "{name}" LIMIT {int(sample_rows)}').fetchall()
+                except sqlite3.Error:
+                    samples = []
+                samples = [[str(value)[:100] for value in row] for row in samples]
+                tables[name] = {
+                    "ddl": ddl.strip(),
+                    "columns": columns,
+                    "sample_rows": samples,
+                    "table_info": cls._render_table_info(name, ddl, columns, samples),
+                }
+        finally:
+            conn.close()
+        return cls(db_path, version, tables)
+
+    @staticmethod
+    def _render_table_info(name: str, ddl: str, columns: List[str], samples: List[List[str]]) -> str:
+        """Renders a table the same way `SQLDatabase.get_table_info` does: DDL followed by sample rows."""
+        table_info = ddl.strip()
+        if samples:
+            sample_rows_str = "\n".join("\t".join(row) for row in samples)
+            table_info += (
+                f"\n\n/*\n{len(samples)} rows from {name} table:\n"
+                f"{chr(9).join(columns)}\n{sample_rows_str}\n*/")
+        return table_info
+
+    def save(self) -> None:
+        """Stores the snapshot next to the database. A read-only location only costs a rebuild on next start."""
+        path = self.snapshot_path(self.db_path)
+        tmp_path = f"{path}.tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump({"version": self.version, "tables": self.tables}, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Could not store the schema snapshot {path}: {e}")
+
+    def is_current(self) -> bool:
+        """Checks whether the database file is still the version the snapshot was computed for."""
+        file_version = self._file_version(self.db_path)
+        return (file_version["mtime_ns"], file_version["size"]) == (self.version["mtime_ns"], self.version["size"])
+
+    def table_names(self) -> List[str]:
+        """Returns the sorted names of the tables in the snapshot."""
+        return sorted(self.tables)
+
+    def table_info(self, table_names: Optional[Iterable[str]] = None) -> str:
+        """
+        Returns the prompt description of some or all tables.
+
+        Args:
+            table_names (Iterable[str], optional): The tables to describe. All tables if omitted.
+
+        Returns:
+            str: The descriptions of the tables separated by blank lines.
+
+        Raises:
+            ValueError: If a requested table is not in the database.
+        """
+        if table_names is None:
+            table_names = self.table_names()
+        else:
+            table_names = list(table_names)
+            missing = set(table_names) - set(self.tables)
+            if missing:
+                raise ValueError(f"table_names {missing} not found in database")
+        return "\n\n".join(self.tables[name]["table_info"] for name in table_names)
+
+
+class SnapshotSQLDatabase(SQLDatabase):
+    """
+    A `SQLDatabase` that describes its tables from a `SchemaSnapshot` instead of reflecting them with SQLAlchemy.
+
+    It is created with lazy table reflection, so connecting is cheap, and `get_table_info` (used by
+    `create_sql_query_chain` on every question) returns precomputed text instead of querying sample rows.
+    """
+
+    snapshot: Optional[SchemaSnapshot] = None
+
+    def get_usable_table_names(self) -> Iterable[str]:
+        """Returns the names of the tables described by the snapshot."""
+        return self.snapshot.table_names()
+
+    def get_table_info(self, table_names: Optional[List[str]] = None) -> str:
+        """Returns the precomputed description of the given tables (or of all tables)."""
+        return self.snapshot.table_info(table_names)
+
+
+def load_sql_database(db_path: str, sample_rows: int = 3) -> SnapshotSQLDatabase:
+    """
+    Connects to a SQLite database through its shared read-only connection pool and attaches its schema snapshot,
+    computing it if needed.
+
+    Args:
+        db_path (str): The path of the SQLite database file.
+        sample_rows (int): The number of sample rows to include per table in the prompts.
+
+    Returns:
+        SnapshotSQLDatabase: The database, ready to be used by the SQL chains.
+    """
+    db = SnapshotSQLDatabase(
+        engine=create_sqlite_engine(db_path), lazy_table_reflection=True, sample_rows_in_table_info=sample_rows)
+    db.snapshot = SchemaSnapshot.load_or_build(db_path, sample_rows=sample_rows)
+    return db
@@ -0,0 +1,186 @@
+import os
+import re
+import time
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+from ..agent_graph.load_tools_config import LoadToolsConfig
+
+TOOLS_CFG = LoadToolsConfig()
+
+
+class SQLCostGuard:
+    """
+    Checks LLM-written SQL before it runs and bounds what it may cost while it runs.
+
+    Before execution the guard asks SQLite for the query plan (`EXPLAIN QUERY PLAN`) and estimates how many rows the
+    plan visits, using `MAX(rowid)` as a cheap size estimate of every scanned table. Full scans nested in each other
+    (a cross join or a join on a non-indexed column) multiply; when such a plan would visit more than
+    `max_scan_rows` rows the query is rejected with a message the agent can act on. A single full scan is allowed,
+    since it is bounded by the time budget.
+
+    Queries without a trailing `LIMIT` get an implicit one, and every query runs under a wall-clock budget enforced
+    with SQLite's progress handler, so a runaway query is interrupted instead of pinning a worker.
+
+    Attributes:
+        max_scan_rows (int): The number of rows a plan of nested full scans may visit before it is rejected.
+        implicit_limit (int): The `LIMIT` appended to queries that do not have one.
+        timeout (float): The number of seconds a query may run before it is interrupted.
+    """
+
+    PROGRESS_STEPS = 10000
+
+    def __init__(self, max_scan_rows: int = 5000000, implicit_limit: int = 10000, timeout: float = 15) -> None:
+        """
+        Initializes the guard.
+
+        Args:
+            max_scan_rows (int): The number of rows a plan of nested full scans may visit before it is rejected.
+            implicit_limit (int): The `LIMIT` appended to queries that do not have one.
+            timeout (float): The number of seconds a query may run before it is interrupted.
+        """
+        self.max_scan_rows = max_scan_rows
+        self.implicit_limit = implicit_limit
+        self.timeout = timeout
+        self._table_rows: Dict[str, Tuple[tuple, Dict[str, int]]] = {}
+        self._lock = threading.Lock()
+
+    def _estimate_rows(self, conn: sqlite3.Connection, db_path: str) -> Dict[str, int]:
+        """Returns the estimated row count of every table, recomputed when the database file changes."""
+        db_path = os.path.abspath(db_path)
+        stat = os.stat(db_path)
+        version = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            cached = self._table_rows.get(db_path)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        rows = {}
+        for (name,) in conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'").fetchall():
+            try:
+                # O(log n) on rowid tables; an upper bound when rows were deleted
+                rows[name.lower()] = conn.execute(f'SELECT MAX(rowid) FROM "{name}"').fetchone()[0] or 0
+            except sqlite3.Error:
+                # WITHOUT ROWID tables have no cheap estimate
+                rows[name.lower()] = 0
+        with self._lock:
+            self._table_rows[db_path] = (version, rows)
+        return rows
+
+    @staticmethod
+    def _aliases(query: str, table_rows: Dict[str, int]) -> Dict[str, str]:
+        """Maps the aliases used in a query (`Track t`, `Track AS t`) to their table or common table expression."""
+        aliases = {}
+        ctes = {name.lower() for name in re.findall(r"(\w+)\s+AS\s*\(", query, re.IGNORECASE)}
+        pairs = re.findall(r'\b(?=(\w+)["\]`]?\s+(?:AS\s+)?["\[`]?(\w+))', query, re.IGNORECASE)
+        for table, alias in pairs:
+            if (table.lower() in table_rows or table.lower() in ctes) and alias.lower() not in table_rows:
+                aliases[alias.lower()] = table.lower()
+        return aliases
+
+    def _plan_cost(self, plan: List[tuple], table_rows: Dict[str, int], aliases: Dict[str, str]) -> Tuple[int, int]:
+        """
+        Estimates the rows visited by a query plan.
+
+        Returns:
+            Tuple[int, int]: The estimated number of rows visited and the largest number of full scans nested in
+            each other.
+        """
+        children: Dict[int, List[tuple]] = {}
+        for node_id, parent, _, detail in plan:
+            children.setdefault(parent, []).append((node_id, detail))
+        materialized: Dict[str, int] = {}
+
+        def cost(parent: int) -> Tuple[int, int]:
+            loops, nested, total, total_nested = 1, 0, 0, 0
+            for node_id, detail in children.get(parent, []):
+                scan = re.match(r"SCAN (?:TABLE )?(\S+)", detail)
+                if scan and scan.group(1) != "CONSTANT":
+                    name = aliases.get(scan.group(1).lower(), scan.group(1).lower())
+                    rows = materialized.get(name, table_rows.get(name, 0))
+                    loops *= max(rows, 1)
+                    nested += 1
+                elif detail.startswith(("MATERIALIZE", "CO-ROUTINE")):
+                    sub_cost, sub_nested = cost(node_id)
+                    materialized[detail.split()[-1].lower()] = sub_cost
+                    total += sub_cost
+                    total_nested = max(total_nested, sub_nested)
+                elif detail.startswith("CORRELATED"):
+                    # Runs once per row of the enclosing loop
+                    sub_cost, sub_nested = cost(node_id)
+                    total += loops * sub_cost
+                    total_nested = max(total_nested, nested + sub_nested)
+                elif node_id in children:
+                    sub_cost, sub_nested = cost(node_id)
+                    total += sub_cost
+                    total_nested = max(total_nested, sub_nested)
+            return total + (loops if nested else 0), max(nested, total_nested)
+
+        return cost(0)
+
+    def check(self, conn: sqlite3.Connection, db_path: str, query: str) -> Optional[str]:
+        """
+        Rejects a query whose plan is too expensive.
+
+        Args:
+            conn (sqlite3.Connection): A connection to the database.
+            db_path (str): The path of the SQLite database.
+            query (str): The SQL query.
+
+        Returns:
+            str: An error message for the agent when the query is rejected, otherwise None.
+        """
+        plan = conn.execute(f"EXPLAIN QUERY PLAN {query}").fetchall()
+        table_rows = self._estimate_rows(conn, db_path)
+        estimated, nested = self._plan_cost(plan, table_rows, self._aliases(query, table_rows))
+        if nested >= 2 and estimated > self.max_scan_rows:
+            scanned = sorted({detail for _, _, _, detail in plan if detail.startswith("SCAN")})
+            return (f"Error: the query was not run because it would read about {estimated:,} rows "
+                    f"({'; '.join(scanned)}). Join the tables on their key columns and add WHERE conditions "
+                    f"instead of combining whole tables.")
+        return None
+
+    def limit(self, query: str) -> str:
+        """
+        Appends the implicit `LIMIT` to a query that does not end with one.
+
+        Args:
+            query (str): The SQL query, without a trailing semicolon.
+
+        Returns:
+            str: The query to execute.
+        """
+        if not re.match(r"^\s*(select|with)\b", query, re.IGNORECASE) \
+                or re.search(r"\blimit\s+\d+(\s*(,|offset)\s*\d+)?\s*$", query, re.IGNORECASE) \
+                or "--" in query.splitlines()[-1]:
+            return query
+        return f"{query} LIMIT {int(self.implicit_limit)}"
+
+    @contextmanager
+    def time_budget(self, conn: sqlite3.Connection) -> Iterator[None]:
+        """
+        Interrupts the statements executed on a connection within a `with` block once the time budget is spent.
+
+        Args:
+            conn (sqlite3.Connection): The connection the query runs on.
+        """
+        deadline = time.monotonic() + self.timeout
+        conn.set_progress_handler(lambda: time.monotonic() > deadline, self.PROGRESS_STEPS)
+        try:
+            yield
+        finally:
+            conn.set_progress_handler(None, 0)
+
+    def describe_error(self, error: sqlite3.Error) -> str:
+        """Turns an SQLite error into a message for the agent, explaining interruptions by the time budget."""
+        if str(error) == "interrupted":
+            return (f"Error: the query was stopped after {self.timeout:g} seconds. Narrow it down with WHERE "
+                    f"conditions, join on key columns or aggregate the data instead.")
+        return f"Error: {error}"
+
+
+SQL_COST_GUARD = SQLCostGuard(
+    max_scan_rows=TOOLS_CFG.sql_cost_guard_max_scan_rows,
+    implicit_limit=TOOLS_CFG.sql_cost_guard_implicit_limit,
+    timeout=TOOLS_CFG.sql_cost_guard_timeout)
@@ -0,0 +1,219 @@
+import re
+import sqlite3
+import hashlib
+import threading
+from contextlib import nullcontext
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+from ..agent_graph.load_tools_config import LoadToolsConfig
+from ..agent_graph.sql_cost_guard import SQL_COST_GUARD, SQLCostGuard
+from ..agent_graph.sql_result_cache import SQL_RESULT_CACHE, SQLResultCache
+from ..utils.sqlite_pool import get_sqlite_pool
+
+TOOLS_CFG = LoadToolsConfig()
+
+# Quoted strings and identifiers (kept as they are), or `--` and `/* */` comments
+COMMENT_PATTERN = re.compile(
+    r"""('(?:[^']|'')*'|"(?:[^"]|"")*"|`[^`]*`|\[[^\]]*\])|--[^\n]*|/\*.*?(?:\*/|$)""", re.DOTALL)
+
+
+class BoundedSQLRunner:
+    """
+    Runs SQL queries against SQLite databases and returns a bounded, paginated text preview of the result.
+
+    Queries run on the shared read-only connection pool of the database. Rows are streamed from the cursor and
+    reading stops as soon as the row or byte cap is reached, so a `SELECT *` over a large table never materializes
+    the full result in memory, in the graph checkpoint or in the LLM prompt. When more rows exist, the total is obtained with a `COUNT(*)` evaluated by SQLite and the preview
+    ends with a handle that the `fetch_sql_result_page` tool accepts to read the following pages. Previews of
+    repeated queries are served from the SQL result cache. With a cost guard, expensive plans are rejected before
+    execution and every query runs with an implicit `LIMIT` and a time budget.
+
+    Attributes:
+        max_rows (int): The maximum number of rows in a preview or page.
+        max_bytes (int): The maximum size in bytes of the rows of a preview or page.
+        max_handles (int): The number of result handles remembered, least recently used dropped first.
+        result_cache (SQLResultCache): The cache holding the previews of recent queries, if any.
+        cost_guard (SQLCostGuard): The guard checking and bounding the queries, if any.
+    """
+
+    def __init__(self, max_rows: int = 50, max_bytes: int = 8000, max_handles: int = 256,
+                 result_cache: Optional[SQLResultCache] = None, cost_guard: Optional[SQLCostGuard] = None) -> None:
+        """
+        Initializes the runner.
+
+        Args:
+            max_rows (int): The maximum number of rows in a preview or page.
+            max_bytes (int): The maximum size in bytes of the rows of a preview or page.
+            max_handles (int): The number of result handles remembered.
+            result_cache (SQLResultCache, optional): The cache holding the previews of recent queries.
+            cost_guard (SQLCostGuard, optional): The guard checking and bounding the queries.
+        """
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        self.max_handles = max_handles
+        self.result_cache = result_cache
+        self.cost_guard = cost_guard
+        self._handles: "OrderedDict[str, Tuple[str, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _strip(query: str) -> str:
+        """
+        Removes comments, trailing semicolons and whitespace so the query can be used as a subquery: a trailing
+        `-- comment` would otherwise comment out the closing parenthesis.
+        """
+        query = COMMENT_PATTERN.sub(lambda match: match.group(1) or " ", query)
+        return re.sub(r"[;\s]+$", "", query.strip())
+
+    def _shorten(self, row: tuple) -> tuple:
+        """Cuts the long text and blob values of a row too large for the byte cap on its own, marking the cuts."""
+        cell_bytes = max(16, self.max_bytes // max(1, len(row)))
+        shortened = []
+        for value in row:
+            if isinstance(value, str) and len(value.encode("utf-8")) > cell_bytes:
+                kept = value.encode("utf-8")[:cell_bytes].decode("utf-8", "ignore")
+                value = f"{kept}... [truncated, {len(value) - len(kept)} more characters]"
+            elif isinstance(value, bytes) and len(repr(value)) > cell_bytes:
+                value = f"{repr(value)[:cell_bytes]}... [truncated, {len(value)} bytes in total]"
+            shortened.append(value)
+        return tuple(shortened)
+
+    def _read_rows(self, cursor: sqlite3.Cursor) -> Tuple[List[tuple], bool]:
+        """
+        Reads rows until a cap is hit. Returns the rows and whether the cursor had more rows.
+
+        A first row larger than `max_bytes` is kept with its long values cut, so one huge text or blob value does not
+        get past the byte cap.
+        """
+        rows, size = [], 0
+        while True:
+            batch = cursor.fetchmany(min(100, self.max_rows + 1))
+            if not batch:
+                return rows, False
+            for row in batch:
+                row_size = len(repr(row).encode("utf-8"))
+                if not rows and row_size > self.max_bytes:
+                    row = self._shorten(row)
+                    row_size = len(repr(row).encode("utf-8"))
+                size += row_size
+                if len(rows) >= self.max_rows or (rows and size > self.max_bytes):
+                    return rows, True
+                rows.append(row)
+
+    def _register(self, db_path: str, query: str) -> str:
+        """Remembers a query so its further pages can be fetched, and returns its handle."""
+        handle = hashlib.sha1(f"{db_path}\x00{query}".encode("utf-8")).hexdigest()[:12]
+        with self._lock:
+            self._handles[handle] = (db_path, query)
+            self._handles.move_to_end(handle)
+            while len(self._handles) > self.max_handles:
+                self._handles.popitem(last=False)
+        return handle
+
+    def _time_budget(self, conn: sqlite3.Connection):
+        """Returns the context bounding the run time of the statements executed in it."""
+        return self.cost_guard.time_budget(conn) if self.cost_guard is not None else nullcontext()
+
+    def _describe_error(self, error: sqlite3.Error) -> str:
+        """Renders an SQLite error for the agent."""
+        return self.cost_guard.describe_error(error) if self.cost_guard is not None else f"Error: {error}"
+
+    @staticmethod
+    def _format(columns: List[str], rows: List[tuple], first_row: int, total: Optional[int]) -> str:
+        """Renders a page of rows as compact text."""
+        if not rows:
+            return "The query returned no rows."
+        total_str = f" of {total}" if total is not None else ""
+        return (f"Columns: ({', '.join(columns)})\n"
+                f"Rows {first_row}-{first_row + len(rows) - 1}{total_str}:\n"
+                f"{rows}")
+
+    def run(self, db_path: str, query: str) -> str:
+        """
+        Runs a query and returns the first page of its result.
+
+        Args:
+            db_path (str): The path of the SQLite database.
+            query (str): The SQL query.
+
+        Returns:
+            str: A preview of the result, with the total row count and a page handle when it was truncated, or an
+            error message for the agent.
+        """
+        query = self._strip(query)
+        # Registered up front so a handle quoted in a cached preview stays valid
+        handle = self._register(db_path, query)
+        if self.result_cache is not None:
+            return self.result_cache.get_or_run(db_path, query, lambda q: self._run(db_path, q, handle))
+        return self._run(db_path, query, handle)
+
+    def _run(self, db_path: str, query: str, handle: str) -> str:
+        """Executes a query and renders its first page."""
+        try:
+            with get_sqlite_pool(db_path).connection() as conn:
+                limited = query
+                if self.cost_guard is not None:
+                    rejection = self.cost_guard.check(conn, db_path, query)
+                    if rejection is not None:
+                        return rejection
+                    limited = self.cost_guard.limit(query)
+                with self._time_budget(conn):
+                    cursor = conn.execute(limited)
+                    if cursor.description is None:
+                        return "The query returned no rows."
+                    columns = [column[0] for column in cursor.description]
+                    rows, truncated = self._read_rows(cursor)
+                    cursor.close()
+                    if not truncated:
+                        return self._format(columns, rows, 1, len(rows))
+                    total = conn.execute(f"SELECT COUNT(*) FROM ({limited})").fetchone()[0]
+        except sqlite3.Error as e:
+            return self._describe_error(e)
+        result = (self._format(columns, rows, 1, total)
+                  + f"\nThe result is truncated. Call fetch_sql_result_page with handle '{handle}' and offset "
+                    f"{len(rows)} to read the following rows.")
+        if limited != query and total >= self.cost_guard.implicit_limit:
+            result += f"\nOnly the first {total} rows can be read; add filters or aggregate to see the rest."
+        return result
+
+    def fetch_page(self, handle: str, offset: int) -> str:
+        """
+        Returns a further page of a truncated result.
+
+        Args:
+            handle (str): The handle printed under the truncated result.
+            offset (int): The number of rows to skip, i.e. the number of rows already read.
+
+        Returns:
+            str: The rows of the page, or an error message for the agent.
+        """
+        with self._lock:
+            entry = self._handles.get(handle)
+        if entry is None:
+            return f"Error: unknown or expired result handle '{handle}'. Run the query again."
+        db_path, query = entry
+        offset = max(0, int(offset))
+        if self.cost_guard is not None:
+            query = self.cost_guard.limit(query)
+        try:
+            with get_sqlite_pool(db_path).connection() as conn, self._time_budget(conn):
+                cursor = conn.execute(
+                    f"SELECT * FROM ({query}) LIMIT ? OFFSET ?",
+                    (self.max_rows + 1, offset))
+                columns = [column[0] for column in cursor.description]
+                rows, truncated = self._read_rows(cursor)
+                cursor.close()
+        except sqlite3.Error as e:
+            return self._describe_error(e)
+        result = self._format(columns, rows, offset + 1, None)
+        if truncated:
+            result += f"\nMore rows are available from offset {offset + len(rows)}."
+        return result
+
+
+SQL_RESULT_PAGER = BoundedSQLRunner(
+    max_rows=TOOLS_CFG.sql_results_max_rows,
+    max_bytes=TOOLS_CFG.sql_results_max_bytes,
+    max_handles=TOOLS_CFG.sql_results_max_handles,
+    result_cache=SQL_RESULT_CACHE,
+    cost_guard=SQL_COST_GUARD)
@@ -0,0 +1,259 @@
+import os
+import re
+import time
+import asyncio
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+from langchain_core.runnables import Runnable, RunnableLambda
+from ..agent_graph.load_tools_config import LoadToolsConfig
+
+TOOLS_CFG = LoadToolsConfig()
+
+_FINGERPRINTS: Dict[str, Tuple[Tuple[float, int], str]] = {}
+_FINGERPRINTS_LOCK = threading.Lock()
+
+
+def schema_fingerprint(db_path: str) -> str:
+    """
+    Returns a hash of the schema (tables, views, indexes and triggers) of a SQLite database.
+
+    The hash only changes when the DDL changes, not when rows are inserted. It is recomputed only when the file's
+    modification time or size changed since the last call.
+
+    Args:
+        db_path (str): The path of the SQLite database file.
+
+    Returns:
+        str: The hex digest of the schema.
+    """
+    stat = os.stat(db_path)
+    signature = (stat.st_mtime, stat.st_size)
+    with _FINGERPRINTS_LOCK:
+        cached = _FINGERPRINTS.get(db_path)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        rows = conn.execute(
+            "SELECT type, name, tbl_name, sql FROM sqlite_master ORDER BY type, name").fetchall()
+    finally:
+        conn.close()
+    fingerprint = hashlib.sha256(repr(rows).encode("utf-8")).hexdigest()
+    with _FINGERPRINTS_LOCK:
+        _FINGERPRINTS[db_path] = (signature, fingerprint)
+    return fingerprint
+
+
+def normalize_question(question: str) -> str:
+    """Lower-cases the question, collapses whitespace and drops trailing punctuation."""
+    return re.sub(r"[\s?.!]+$", "", " ".join(question.lower().split()))
+
+
+class SQLQueryCache:
+    """
+    A cache from a normalized natural-language question to the SQL query an LLM wrote for it.
+
+    Entries are keyed by (scope, schema fingerprint, normalized question), where the scope identifies the agent
+    (database and LLM) that wrote the query. When the schema of the database changes its fingerprint changes too,
+    so stale queries are never returned and are purged from the cache. Entries live in an in-memory LRU and in a
+    SQLite file so they survive restarts. A query is only cached once it ran without error (see `cache_on_success`),
+    so a broken query is written again by the LLM next time instead of being replayed.
+
+    Attributes:
+        cache_path (str): The path of the SQLite file holding the cached queries.
+        max_entries (int): The maximum number of queries kept in memory and on disk.
+        hits (int): Number of questions answered from the cache.
+        misses (int): Number of questions that needed the LLM.
+    """
+
+    def __init__(self, cache_path: str, max_entries: int = 5000) -> None:
+        """
+        Initializes the cache and creates its SQLite file if needed.
+
+        Args:
+            cache_path (str): The path of the SQLite file holding the cached queries.
+            max_entries (int): The maximum number of queries kept in memory and on disk.
+        """
+        self.cache_path = str(cache_path)
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        # Maps every key to the database and schema fingerprint of its query, and the query
+        self._memory: "OrderedDict[str, Tuple[str, str, str]]" = OrderedDict()
+        self._fingerprints: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(self.cache_path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(self.cache_path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS sql_queries ("
+            "key TEXT PRIMARY KEY, db_path TEXT NOT NULL, fingerprint TEXT NOT NULL, "
+            "question TEXT NOT NULL, query TEXT NOT NULL, last_used REAL NOT NULL)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_sql_queries_last_used ON sql_queries (last_used)")
+        self._conn.commit()
+
+    @staticmethod
+    def _key(scope: str, fingerprint: str, question: str) -> str:
+        """Returns the cache key of a question."""
+        return hashlib.sha256(f"{scope}\x00{fingerprint}\x00{question}".encode("utf-8")).hexdigest()
+
+    def _current_fingerprint(self, db_path: str) -> str:
+        """Returns the schema fingerprint of a database and purges entries of its previous schemas."""
+        fingerprint = schema_fingerprint(db_path)
+        with self._lock:
+            previous = self._fingerprints.get(db_path)
+            self._fingerprints[db_path] = fingerprint
+            if previous is not None and previous != fingerprint:
+                print(f"Schema of {db_path} changed. Dropping its cached SQL queries.")
+                # Only the queries written for the previous schema of this database; other databases keep theirs
+                for key in [key for key, (path, old, _) in self._memory.items() if path == db_path and old == previous]:
+                    del self._memory[key]
+            if previous != fingerprint:
+                self._conn.execute(
+                    "DELETE FROM sql_queries WHERE db_path = ? AND fingerprint != ?", (db_path, fingerprint))
+                self._conn.commit()
+        return fingerprint
+
+    def get(self, scope: str, db_path: str, question: str) -> Optional[str]:
+        """
+        Returns the cached SQL query for a question, or None.
+
+        Args:
+            scope (str): Identifies the agent that writes the queries (e.g. database name and LLM).
+            db_path (str): The path of the SQLite database the query runs against.
+            question (str): The user question.
+
+        Returns:
+            str or None: The cached SQL query.
+        """
+        fingerprint = self._current_fingerprint(db_path)
+        key = self._key(scope, fingerprint, normalize_question(question))
+        with self._lock:
+            entry = self._memory.get(key)
+            query = entry[2] if entry is not None else None
+            if query is None:
+                row = self._conn.execute("SELECT query FROM sql_queries WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    query = row[0]
+                    self._conn.execute("UPDATE sql_queries SET last_used = ? WHERE key = ?", (time.time(), key))
+                    self._conn.commit()
+            if query is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._memory[key] = (db_path, fingerprint, query)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+            return query
+
+    def put(self, scope: str, db_path: str, question: str, query: str) -> None:
+        """
+        Stores the SQL query written for a question.
+
+        Args:
+            scope (str): Identifies the agent that writes the queries (e.g. database name and LLM).
+            db_path (str): The path of the SQLite database the query runs against.
+            question (str): The user question.
+            query (str): The SQL query written by the LLM.
+        """
+        if not query or not query.strip():
+            return
+        fingerprint = self._current_fingerprint(db_path)
+        normalized = normalize_question(question)
+        key = self._key(scope, fingerprint, normalized)
+        with self._lock:
+            self._memory[key] = (db_path, fingerprint, query)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sql_queries (key, db_path, fingerprint, question, query, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?)", (key, db_path, fingerprint, normalized, query, time.time()))
+            self._conn.execute(
+                "DELETE FROM sql_queries WHERE key IN ("
+                "SELECT key FROM sql_queries ORDER BY last_used DESC LIMIT -1 OFFSET ?)", (self.max_entries,))
+            self._conn.commit()
+
+    def discard(self, scope: str, db_path: str, question: str) -> None:
+        """
+        Removes the SQL query cached for a question, if any.
+
+        Args:
+            scope (str): Identifies the agent that writes the queries (e.g. database name and LLM).
+            db_path (str): The path of the SQLite database the query runs against.
+            question (str): The user question.
+        """
+        key = self._key(scope, self._current_fingerprint(db_path), normalize_question(question))
+        with self._lock:
+            self._memory.pop(key, None)
+            self._conn.execute("DELETE FROM sql_queries WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def wrap(self, write_query: Runnable, scope: str, db_path: str) -> Runnable:
+        """
+        Wraps a SQL-writing chain so that repeated questions skip the LLM round trip.
+
+        The written queries are not cached here but by `cache_on_success`, once they ran. The cache lookup reads
+        SQLite, so the asynchronous variant runs it in a worker thread.
+
+        Args:
+            write_query (Runnable): A chain taking {"question": ...} and returning a SQL query.
+            scope (str): Identifies the agent that writes the queries (e.g. database name and LLM).
+            db_path (str): The path of the SQLite database the query runs against.
+
+        Returns:
+            Runnable: A chain with the same input and output as `write_query`.
+        """
+        def write_query_cached(inputs: dict, config=None) -> str:
+            query = self.get(scope, db_path, inputs["question"])
+            if query is None:
+                query = write_query.invoke(inputs, config)
+            return query
+
+        async def awrite_query_cached(inputs: dict, config=None) -> str:
+            query = await asyncio.to_thread(self.get, scope, db_path, inputs["question"])
+            if query is None:
+                query = await write_query.ainvoke(inputs, config)
+            return query
+
+        return RunnableLambda(write_query_cached, afunc=awrite_query_cached, name="write_query_cached")
+
+    def cache_on_success(self, execute_query: Runnable, scope: str, db_path: str) -> Runnable:
+        """
+        Wraps the step running the SQL query so that the query is cached once it ran without error, and a cached
+        query that now fails is evicted.
+
+        Args:
+            execute_query (Runnable): Takes the SQL query and returns its result, an "Error: ..." message on
+                failure (as `BoundedSQLRunner.run` does).
+            scope (str): Identifies the agent that writes the queries, as given to `wrap`.
+            db_path (str): The path of the SQLite database the query runs against.
+
+        Returns:
+            Runnable: A chain taking {"question": ..., "query": ...} and returning the result of the query.
+        """
+        def record(inputs: dict, result) -> None:
+            if isinstance(result, str) and result.startswith("Error"):
+                self.discard(scope, db_path, inputs["question"])
+            else:
+                self.put(scope, db_path, inputs["question"], inputs["query"])
+
+        def execute_query_cached(inputs: dict, config=None):
+            result = execute_query.invoke(inputs["query"], config)
+            record(inputs, result)
+            return result
+
+        async def aexecute_query_cached(inputs: dict, config=None):
+            result = await execute_query.ainvoke(inputs["query"], config)
+            await asyncio.to_thread(record, inputs, result)
+            return result
+
+        return RunnableLambda(execute_query_cached, afunc=aexecute_query_cached, name="execute_query_cached")
+
+SQL_QUERY_CACHE = SQLQueryCache(
+    cache_path=TOOLS_CFG.sql_query_cache_path,
+    max_entries=TOOLS_CFG.sql_query_cache_max_entries)
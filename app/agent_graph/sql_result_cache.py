@@ -0,0 +1,145 @@
+import os
+import re
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+from ..agent_graph.load_tools_config import LoadToolsConfig
+
+TOOLS_CFG = LoadToolsConfig()
+
+
+class SQLResultCache:
+    """
+    An in-memory LRU cache of SQL query results keyed by (database path, SQL text).
+
+    The reference databases are read-mostly, so repeated aggregate queries can be answered from memory. Before a
+    cached result is returned the cache checks whether the database changed: it keeps one connection per database
+    open and compares its `PRAGMA data_version` (which changes when another connection commits) together with the
+    modification time and size of the database file and its WAL. When anything changed, every cached result of
+    that database is dropped.
+
+    The cache is bounded by the total size in bytes of the cached results.
+
+    Attributes:
+        max_bytes (int): The total size of cached results above which the least recently used ones are evicted.
+        max_result_bytes (int): Results larger than this are never cached.
+        hits (int): Number of queries answered from the cache.
+        misses (int): Number of queries that had to run against the database.
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, max_result_bytes: int = 1024 * 1024) -> None:
+        """
+        Initializes an empty cache.
+
+        Args:
+            max_bytes (int): The total size of cached results above which the least recently used ones are evicted.
+            max_result_bytes (int): Results larger than this are never cached.
+        """
+        self.max_bytes = max_bytes
+        self.max_result_bytes = max_result_bytes
+        self.hits = 0
+        self.misses = 0
+        self._size = 0
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[str, int]]" = OrderedDict()
+        self._versions: Dict[str, tuple] = {}
+        self._watchers: Dict[str, sqlite3.Connection] = {}
+        self._lock = threading.Lock()
+
+    def _version(self, db_path: str) -> Optional[tuple]:
+        """
+        Returns a token that changes whenever the content of the database changes, or None when the database cannot
+        be opened (e.g. it is missing or was moved). Caller holds the lock.
+        """
+        try:
+            conn = self._watchers.get(db_path)
+            if conn is None:
+                conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True, check_same_thread=False)
+                self._watchers[db_path] = conn
+            data_version = conn.execute("PRAGMA data_version").fetchone()[0]
+        except sqlite3.Error:
+            watcher = self._watchers.pop(db_path, None)
+            if watcher is not None:
+                watcher.close()
+            return None
+        files = []
+        for path in (db_path, f"{db_path}-wal"):
+            if os.path.exists(path):
+                stat = os.stat(path)
+                files.append((stat.st_mtime_ns, stat.st_size))
+        return data_version, tuple(files)
+
+    def _evict(self, db_path: Optional[str] = None) -> None:
+        """Drops the cached results of one database, or everything. Caller holds the lock."""
+        for key in [key for key in self._entries if db_path is None or key[0] == db_path]:
+            self._size -= self._entries.pop(key)[1]
+
+    def get_or_run(self, db_path: str, query: str, run: Callable[[str], str]) -> str:
+        """
+        Returns the cached result of a query, or runs it and caches the result.
+
+        Args:
+            db_path (str): The path of the SQLite database the query runs against.
+            query (str): The SQL query.
+            run (Callable[[str], str]): Executes the query and returns its result as a string.
+
+        Returns:
+            str: The result of the query.
+        """
+        if not re.match(r"^\s*(select|with)\b", query, re.IGNORECASE):
+            # Only read-only queries are cacheable
+            return run(query)
+        db_path = os.path.abspath(db_path)
+        key = (db_path, query.strip())
+        with self._lock:
+            version = self._version(db_path)
+            if version is None:
+                # Nothing to cache against; the query reports the error the way it would without the cache
+                self._evict(db_path)
+                self._versions.pop(db_path, None)
+            else:
+                if self._versions.get(db_path) != version:
+                    self._evict(db_path)
+                    self._versions[db_path] = version
+                cached = self._entries.get(key)
+                if cached is not None:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return cached[0]
+                self.misses += 1
+        if version is None:
+            return run(query)
+        result = run(query)
+        size = len(result.encode("utf-8")) if isinstance(result, str) else 0
+        if not size or size > self.max_result_bytes or result.startswith("Error:"):
+            return result
+        with self._lock:
+            # Only cache the result if the database did not change while the query was running
+            current = self._version(db_path)
+            if current is not None and self._versions.get(db_path) == current:
+                if key in self._entries:
+                    self._size -= self._entries.pop(key)[1]
+                self._entries[key] = (result, size)
+                self._size += size
+                while self._size > self.max_bytes and self._entries:
+                    self._size -= self._entries.popitem(last=False)[1][1]
+        return result
+
+    def invalidate(self, db_path: Optional[str] = None) -> None:
+        """
+        Drops the cached results of one database, or of all databases.
+
+        Args:
+            db_path (str, optional): The database whose results should be dropped.
+        """
+        with self._lock:
+            self._evict(os.path.abspath(db_path) if db_path else None)
+
+    def stats(self) -> Dict[str, float]:
+        """Returns hits, misses, the number of cached results and their total size in bytes."""
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries), "bytes": self._size}
+
+
+SQL_RESULT_CACHE = SQLResultCache(
+    max_bytes=TOOLS_CFG.sql_result_cache_max_bytes,
+    max_result_bytes=TOOLS_CFG.sql_result_cache_max_result_bytes)
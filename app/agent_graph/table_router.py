@@ -0,0 +1,257 @@
+import os
+import re
+import json
+import math
+import threading
+from collections import defaultdict, deque
+from typing import Dict, Iterable, List, Optional, Tuple
+from langchain_core.runnables import Runnable, RunnableLambda
+from ..agent_graph.schema_snapshot import SchemaSnapshot
+
+STOPWORDS = {
+    "a", "about", "all", "an", "and", "any", "are", "as", "at", "be", "by", "can", "do", "does", "each", "for",
+    "from", "get", "give", "has", "have", "how", "i", "in", "is", "it", "its", "list", "many", "me", "most",
+    "much", "my", "of", "on", "or", "per", "show", "than", "that", "the", "their", "there", "these", "this",
+    "to", "top", "was", "were", "what", "when", "where", "which", "who", "whose", "with", "you", "your",
+}
+
+
+def stem(word: str) -> str:
+    """A deliberately small stemmer that folds the plural forms found in table and column names."""
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 4 and word.endswith(("ses", "xes", "ches", "shes")):
+        return word[:-2]
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+
+def tokenize(text: str) -> List[str]:
+    """Splits identifiers and free text (CamelCase, snake_case, punctuation) into lower-cased stemmed tokens."""
+    text = re.sub(r"([a-z0-9])([A-Z])", r"\1 \2", text)
+    text = re.sub(r"([A-Z]+)([A-Z][a-z])", r"\1 \2", text)
+    return [stem(word) for word in re.findall(r"[a-z0-9]+", text.lower())]
+
+
+class TableRouter:
+    """
+    A local, CPU-only router that picks the tables relevant to a question.
+
+    Every table is indexed by the tokens of its name (weighted higher) and of its column names. Questions are scored
+    with TF-IDF against that index, with configured synonyms (e.g. "song" -> "track") and synonyms learned from
+    previous LLM decisions expanding the question tokens. For every question word the best matching table is
+    selected; when several tables tie for a word they are only kept if their overall score is within
+    `relative_score` of the best table. Tables connecting two selected tables through foreign keys are added so
+    the generated SQL can join them.
+
+    The router also reports a confidence: the share of the question's content words it could match to the schema.
+    Below `min_confidence` the caller should fall back to the LLM and can feed the LLM's choice back with `learn`.
+
+    Attributes:
+        snapshot (SchemaSnapshot): The schema the router was built from.
+        synonyms (dict): Maps a question token to the schema tokens it stands for.
+        learned (dict): Maps a question token to the tables the LLM picked for questions containing it.
+        min_confidence (float): The confidence below which `route` results should not be trusted.
+        relative_score (float): Tables tied for a word are dropped when scoring below this fraction of the best table.
+        learned_path (str): The JSON file where learned synonyms are persisted, if any.
+    """
+
+    TABLE_NAME_WEIGHT = 3.0
+    COLUMN_WEIGHT = 1.0
+
+    def __init__(self, snapshot: SchemaSnapshot, synonyms: Optional[Dict[str, List[str]]] = None,
+                 min_confidence: float = 0.5, relative_score: float = 0.35,
+                 learned_path: Optional[str] = None) -> None:
+        """
+        Builds the index of a database schema.
+
+        Args:
+            snapshot (SchemaSnapshot): The schema of the database.
+            synonyms (dict, optional): Maps a word that may appear in questions to schema words it stands for.
+            min_confidence (float): The confidence below which `route` results should not be trusted.
+            relative_score (float): Tables tied for a word are dropped when scoring below this fraction of the best
+                table.
+            learned_path (str, optional): A JSON file to load and persist learned synonyms.
+        """
+        self.snapshot = snapshot
+        self.synonyms = {stem(word.lower()): [token for target in targets for token in tokenize(target)]
+                         for word, targets in (synonyms or {}).items()}
+        self.min_confidence = min_confidence
+        self.relative_score = relative_score
+        self.learned_path = learned_path
+        self.learned: Dict[str, Dict[str, int]] = defaultdict(dict)
+        self._lock = threading.Lock()
+        if learned_path and os.path.exists(learned_path):
+            with open(learned_path) as f:
+                for token, tables in json.load(f).items():
+                    self.learned[token].update(tables)
+
+        self.weights: Dict[str, Dict[str, float]] = {}
+        self.references: Dict[str, set] = defaultdict(set)
+        table_names = {name.lower(): name for name in snapshot.tables}
+        for name, table in snapshot.tables.items():
+            weights: Dict[str, float] = defaultdict(float)
+            for token in tokenize(name):
+                weights[token] += self.TABLE_NAME_WEIGHT
+            for column in table["columns"]:
+                for token in tokenize(column):
+                    weights[token] += self.COLUMN_WEIGHT
+            self.weights[name] = dict(weights)
+            for referenced in re.findall(r'REFERENCES\s+["\[`]?(\w+)', table["ddl"], re.IGNORECASE):
+                referenced = table_names.get(referenced.lower())
+                if referenced and referenced != name:
+                    self.references[name].add(referenced)
+                    self.references[referenced].add(name)
+        n_tables = max(1, len(self.weights))
+        document_frequency: Dict[str, int] = defaultdict(int)
+        for weights in self.weights.values():
+            for token in weights:
+                document_frequency[token] += 1
+        self.idf = {token: math.log(1 + n_tables / df) for token, df in document_frequency.items()}
+
+    def _expand(self, token: str) -> List[str]:
+        """Returns the schema tokens a question token stands for."""
+        return [token] + self.synonyms.get(token, [])
+
+    def _join_path(self, start: str, goal: str) -> Optional[List[str]]:
+        """Returns the tables of a shortest foreign-key path between two tables (both included), or None."""
+        previous: Dict[str, Optional[str]] = {start: None}
+        frontier = deque([start])
+        while frontier:
+            table = frontier.popleft()
+            if table == goal:
+                path = []
+                while table is not None:
+                    path.append(table)
+                    table = previous[table]
+                return path[::-1]
+            for neighbour in sorted(self.references.get(table, ())):
+                if neighbour not in previous:
+                    previous[neighbour] = table
+                    frontier.append(neighbour)
+        return None
+
+    def route(self, question: str) -> Tuple[List[str], float]:
+        """
+        Selects the tables relevant to a question.
+
+        The tables matching the question are completed with every table on the shortest foreign-key path between
+        each pair of them, e.g. Track and InvoiceLine between Genre and Invoice, so the query can join them. When a
+        matching table has no path to the others, the confidence is lowered so the question falls back to the LLM.
+
+        Args:
+            question (str): The user question.
+
+        Returns:
+            Tuple[List[str], float]: The selected table names (in schema order) and the router's confidence
+            between 0 and 1.
+        """
+        tokens = [token for token in tokenize(question) if token not in STOPWORDS and not token.isdigit()]
+        if not tokens:
+            return [], 0.0
+        scores: Dict[str, float] = defaultdict(float)
+        candidates = set()
+        matched = 0
+        with self._lock:
+            learned = {token: dict(self.learned[token]) for token in tokens if token in self.learned}
+        for token in tokens:
+            token_scores: Dict[str, float] = defaultdict(float)
+            for expanded in self._expand(token):
+                idf = self.idf.get(expanded)
+                if idf is None:
+                    continue
+                for table, weights in self.weights.items():
+                    if expanded in weights:
+                        token_scores[table] += idf * weights[expanded]
+            for table, count in learned.get(token, {}).items():
+                if table in self.weights:
+                    token_scores[table] += self.TABLE_NAME_WEIGHT * min(count, 3)
+            if not token_scores:
+                continue
+            matched += 1
+            for table, score in token_scores.items():
+                scores[table] += score
+            # The table matching a word best is a candidate; it is kept unconditionally when it is the only one
+            token_best = max(token_scores.values())
+            best_tables = [table for table, score in token_scores.items() if score == token_best]
+            candidates.update((table, len(best_tables) == 1) for table in best_tables)
+        if not scores:
+            return [], 0.0
+        best = max(scores.values())
+        selected = {table for table, unique in candidates
+                    if unique or scores[table] >= self.relative_score * best}
+        confidence = matched / len(tokens)
+        matching = sorted(selected)
+        joined = {table: {table} for table in matching}
+        for i, table in enumerate(matching):
+            for other in matching[i + 1:]:
+                path = self._join_path(table, other)
+                if path is not None:
+                    selected.update(path)
+                    joined[table].add(other)
+                    joined[other].add(table)
+        # The tables reachable from each other; a table cut off from the rest cannot be joined in one query
+        largest_group = max(len(group) for group in joined.values())
+        if largest_group < len(matching):
+            confidence *= 0.5 * largest_group / len(matching)
+        return [table for table in self.snapshot.table_names() if table in selected], confidence
+
+    def learn(self, question: str, tables: Iterable[str]) -> None:
+        """
+        Records the tables chosen by the LLM for a question so similar questions are routed locally next time.
+
+        Only question words the schema index could not match are learned.
+
+        Args:
+            question (str): The user question.
+            tables (Iterable[str]): The tables selected for it.
+        """
+        tables = [table for table in tables if table in self.weights]
+        tokens = {token for token in tokenize(question)
+                  if token not in STOPWORDS and not any(expanded in self.idf for expanded in self._expand(token))}
+        if not tables or not tokens:
+            return
+        with self._lock:
+            for token in tokens:
+                for table in tables:
+                    self.learned[token][table] = self.learned[token].get(table, 0) + 1
+            if self.learned_path:
+                try:
+                    with open(self.learned_path, "w") as f:
+                        json.dump(self.learned, f)
+                except OSError as e:
+                    print(f"Could not store learned table synonyms in {self.learned_path}: {e}")
+
+    def as_runnable(self, fallback: Optional[Runnable] = None) -> Runnable:
+        """
+        Returns a runnable mapping {"question": ...} to the list of table names to use.
+
+        Args:
+            fallback (Runnable, optional): A chain (typically LLM based) taking the same input and returning table
+                names, used when the router is not confident. Without a fallback, all tables are used.
+
+        Returns:
+            Runnable: The table selection step.
+        """
+        def select_tables(inputs: dict, config=None) -> List[str]:
+            tables, confidence = self.route(inputs["question"])
+            if tables and confidence >= self.min_confidence:
+                return tables
+            if fallback is None:
+                return self.snapshot.table_names()
+            tables = fallback.invoke(inputs, config)
+            self.learn(inputs["question"], tables)
+            return tables
+
+        async def aselect_tables(inputs: dict, config=None) -> List[str]:
+            tables, confidence = self.route(inputs["question"])
+            if tables and confidence >= self.min_confidence:
+                return tables
+            if fallback is None:
+                return self.snapshot.table_names()
+            tables = await fallback.ainvoke(inputs, config)
+            self.learn(inputs["question"], tables)
+            return tables
+
+        return RunnableLambda(select_tables, afunc=aselect_tables, name="select_tables")
@@ -1,13 +1,18 @@
-from typing import List
+import asyncio
+from typing import List, Optional
 from langchain_openai import ChatOpenAI
 from langchain_core.pydantic_v1 import BaseModel, Field
 from langchain.chains.openai_tools import create_extraction_chain_pydantic
-from langchain_community.utilities import SQLDatabase
 from langchain.chains import create_sql_query_chain
-from langchain_core.runnables import RunnablePassthrough
+from langchain_core.runnables import RunnableLambda, RunnablePassthrough
 from operator import itemgetter
 from langchain_core.tools import tool
 from .load_tools_config import LoadToolsConfig
+from .tool_registry import TOOL_REGISTRY
+from .sql_query_cache import SQL_QUERY_CACHE
+from .sql_pagination import SQL_RESULT_PAGER
+from .schema_snapshot import load_sql_database
+from .table_router import TableRouter
 
 TOOLS_CFG = LoadToolsConfig()
 
@@ -56,14 +61,16 @@ class ChinookSQLAgent:
     """
     A specialized SQL agent that interacts with the Chinook SQL database using an LLM (Large Language Model).
 
-    The agent handles SQL queries by mapping user questions to relevant SQL tables based on categories like "Music"
-    and "Business". It uses an extraction chain to determine relevant tables based on the question and then
-    executes queries against the database using the appropriate tables.
+    The agent handles SQL queries by mapping user questions to relevant SQL tables. A local table router picks the
+    tables from the schema; only when it is not confident does an LLM extraction chain map the question to categories
+    like "Music" and "Business". The query is then written against the selected tables.
 
     Attributes:
         sql_agent_llm (ChatOpenAI): The language model used for interpreting and interacting with the database.
-        db (SQLDatabase): The SQL database object, representing the Chinook database.
-        full_chain (Runnable): A chain of operations that maps user questions to SQL tables and executes queries.
+        db (SnapshotSQLDatabase): The SQL database object, representing the Chinook database.
+        table_router (TableRouter): The local router selecting the tables relevant to a question.
+        full_chain (Runnable): A chain of operations that maps user questions to SQL tables and writes the SQL query,
+            answered from the SQL query cache for questions seen before.
 
     Methods:
         __init__: Initializes the agent by setting up the LLM, connecting to the SQL database, and creating query chains.
@@ -74,18 +81,22 @@ class ChinookSQLAgent:
         llm_temperature (float): The temperature setting for the LLM, controlling the randomness of responses.
     """
 
-    def __init__(self, sqldb_directory: str, llm: str, llm_temerature: float) -> None:
+    def __init__(self, sqldb_directory: str, llm: str, llm_temerature: float, sample_rows: int = 3,
+                 table_router_configs: Optional[dict] = None) -> None:
         """Initializes the ChinookSQLAgent with the LLM and database connection.
 
         Args:
             sqldb_directory (str): The directory path to the SQLite database file.
             llm (str): The LLM model identifier (e.g., "gpt-3.5-turbo").
             llm_temerature (float): The temperature value for the LLM, determining the randomness of the model's output.
+            sample_rows (int): The number of sample rows per table shown to the LLM, taken from the schema snapshot.
+            table_router_configs (dict, optional): Keyword arguments of the `TableRouter` (synonyms, thresholds).
         """
         self.sql_agent_llm = ChatOpenAI(
             model=llm, temperature=llm_temerature)
 
-        self.db = SQLDatabase.from_uri(f"sqlite:///{sqldb_directory}")
+        # Table descriptions come from the precomputed schema snapshot instead of reflecting the database
+        self.db = load_sql_database(sqldb_directory, sample_rows=sample_rows)
         print(self.db.get_usable_table_names())
         category_chain_system = """Return the names of the SQL tables that are relevant to the user question. \
         The tables are:
@@ -94,25 +105,57 @@ class ChinookSQLAgent:
         Business"""
         category_chain = create_extraction_chain_pydantic(
             Table, self.sql_agent_llm, system_message=category_chain_system)
-        table_chain = category_chain | get_tables  # noqa
+        llm_table_chain = category_chain | get_tables  # noqa
         query_chain = create_sql_query_chain(self.sql_agent_llm, self.db)
         # Convert "question" key to the "input" key expected by current table_chain.
-        table_chain = {"input": itemgetter("question")} | table_chain
+        llm_table_chain = {"input": itemgetter("question")} | llm_table_chain
+        # Pick the tables locally and only ask the LLM when the router is not confident.
+        self.table_router = TableRouter(
+            self.db.snapshot, learned_path=f"{sqldb_directory}.table_router.json", **(table_router_configs or {}))
+        table_chain = self.table_router.as_runnable(fallback=llm_table_chain)
         # Set table_names_to_use using table_chain.
-        self.full_chain = RunnablePassthrough.assign(
+        full_chain = RunnablePassthrough.assign(
             table_names_to_use=table_chain) | query_chain
+        # Repeated questions against an unchanged schema reuse the SQL written the first time.
+        self.full_chain = SQL_QUERY_CACHE.wrap(
+            full_chain, scope=f"chinook:{llm}", db_path=sqldb_directory)
+        # Returns a bounded preview of the rows and caches the query for the question once it ran without error
+        self.run_query = SQL_QUERY_CACHE.cache_on_success(
+            RunnableLambda(lambda query: SQL_RESULT_PAGER.run(sqldb_directory, query)),
+            scope=f"chinook:{llm}", db_path=sqldb_directory)
+
+
+TOOL_REGISTRY.register(
+    "chinook_sqlagent",
+    lambda: ChinookSQLAgent(
+        sqldb_directory=TOOLS_CFG.chinook_sqldb_directory,
+        llm=TOOLS_CFG.chinook_sqlagent_llm,
+        llm_temerature=TOOLS_CFG.chinook_sqlagent_llm_temperature,
+        sample_rows=TOOLS_CFG.schema_snapshot_sample_rows,
+        table_router_configs=TOOLS_CFG.chinook_sqlagent_table_router
+    ),
+    watch_path=TOOLS_CFG.chinook_sqldb_directory)
 
 
 @tool
 def query_chinook_sqldb(query: str) -> str:
     """Query the Chinook SQL Database. Input should be a search query."""
-    # Create an instance of ChinookSQLAgent
-    agent = ChinookSQLAgent(
-        sqldb_directory=TOOLS_CFG.chinook_sqldb_directory,
-        llm=TOOLS_CFG.chinook_sqlagent_llm,
-        llm_temerature=TOOLS_CFG.chinook_sqlagent_llm_temperature
-    )
+    # The agent is built once per process and rebuilt only when Chinook.db changes
+    agent = TOOL_REGISTRY.get("chinook_sqlagent")
+
+    sql = agent.full_chain.invoke({"question": query})
+
+    # Returns a bounded preview of the rows; further pages are read with fetch_sql_result_page
+    return agent.run_query.invoke({"question": query, "query": sql})
+
+
+async def aquery_chinook_sqldb(query: str) -> str:
+    """Asynchronous implementation of `query_chinook_sqldb`."""
+    # Building the agent loads the schema snapshot and connects to the database: off the event loop
+    agent = await asyncio.to_thread(TOOL_REGISTRY.get, "chinook_sqlagent")
+    sql = await agent.full_chain.ainvoke({"question": query})
+    # SQLite has no async driver; the pager runs off the event loop, in the executor of the sync lambda
+    return await agent.run_query.ainvoke({"question": query, "query": sql})
 
-    query = agent.full_chain.invoke({"question": query})
 
-    return agent.db.run(query)
+query_chinook_sqldb.coroutine = aquery_chinook_sqldb
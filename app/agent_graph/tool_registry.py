@@ -0,0 +1,128 @@
+import os
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple
+
+
+class ToolRegistry:
+    """
+    A process-wide registry that builds each tool backend (SQL agents, RAG tools, ...) once and shares it
+    between requests.
+
+    Building a SQL agent means creating a `ChatOpenAI` client, reflecting the database schema and composing the
+    LCEL chains. The registry does that work the first time a tool is requested (or at warm-up) and hands the same
+    instance to every subsequent caller. Instances that depend on a file on disk (e.g. a SQLite database) are
+    rebuilt automatically when the file's modification time or size changes, and can be invalidated explicitly.
+
+    The registry is safe to use from multiple Flask request threads: a global lock protects the registry
+    dictionaries and a per-entry lock ensures that an instance is only built once even when several threads ask
+    for it at the same time.
+
+    Attributes:
+        _factories (dict): Maps a registered name to a tuple of (factory, watched file path).
+        _instances (dict): Maps a registered name to a tuple of (instance, file signature at build time).
+    """
+
+    def __init__(self) -> None:
+        """Initializes an empty registry."""
+        self._lock = threading.Lock()
+        self._entry_locks: Dict[str, threading.Lock] = {}
+        self._factories: Dict[str, Tuple[Callable[[], Any], Optional[str]]] = {}
+        self._instances: Dict[str, Tuple[Any, Optional[Tuple[float, int]]]] = {}
+
+    @staticmethod
+    def _file_signature(path: Optional[str]) -> Optional[Tuple[float, int]]:
+        """Returns the (mtime, size) signature of a file, or None if there is no file to watch."""
+        if path is None or not os.path.exists(path):
+            return None
+        stat = os.stat(path)
+        return stat.st_mtime, stat.st_size
+
+    def register(self, name: str, factory: Callable[[], Any], watch_path: Optional[str] = None) -> None:
+        """
+        Registers a factory that builds the instance for `name`.
+
+        Registering the same name again replaces the factory and drops any instance built by the old one.
+
+        Args:
+            name (str): The unique name of the tool backend.
+            factory (Callable[[], Any]): A callable without arguments that builds the instance.
+            watch_path (str, optional): A file the instance depends on. The instance is rebuilt when it changes.
+        """
+        with self._lock:
+            self._factories[name] = (factory, watch_path)
+            self._entry_locks.setdefault(name, threading.Lock())
+            self._instances.pop(name, None)
+
+    def get(self, name: str) -> Any:
+        """
+        Returns the shared instance for `name`, building it if needed.
+
+        Args:
+            name (str): The name used when registering the factory.
+
+        Returns:
+            Any: The shared instance.
+
+        Raises:
+            KeyError: If no factory was registered under `name`.
+        """
+        with self._lock:
+            if name not in self._factories:
+                raise KeyError(f"No tool registered under the name '{name}'.")
+            factory, watch_path = self._factories[name]
+            entry_lock = self._entry_locks[name]
+        signature = self._file_signature(watch_path)
+        cached = self._instances.get(name)
+        if cached is not None and cached[1] == signature:
+            return cached[0]
+        with entry_lock:
+            # Another thread may have built the instance while we were waiting for the lock.
+            cached = self._instances.get(name)
+            if cached is not None and cached[1] == signature:
+                return cached[0]
+            if cached is not None:
+                print(f"Underlying file of '{name}' changed. Rebuilding the instance.")
+            instance = factory()
+            self._instances[name] = (instance, signature)
+            return instance
+
+    def invalidate(self, name: Optional[str] = None) -> None:
+        """
+        Drops the cached instance(s) so that the next `get` rebuilds them.
+
+        Args:
+            name (str, optional): The name of the instance to drop. If omitted, all instances are dropped.
+        """
+        with self._lock:
+            if name is None:
+                self._instances.clear()
+            else:
+                self._instances.pop(name, None)
+
+    def invalidate_path(self, path: str) -> None:
+        """
+        Drops every cached instance that depends on the given file, e.g. after a database has been replaced.
+
+        Args:
+            path (str): The path of the file that changed.
+        """
+        path = os.path.abspath(path)
+        with self._lock:
+            for name, (_, watch_path) in self._factories.items():
+                if watch_path is not None and os.path.abspath(watch_path) == path:
+                    self._instances.pop(name, None)
+
+    def warm_up(self, *names: str) -> None:
+        """
+        Builds the given instances (or all registered instances) ahead of the first request.
+
+        Args:
+            *names (str): The names to build. If omitted, every registered factory is built.
+        """
+        with self._lock:
+            names = names or tuple(self._factories)
+        for name in names:
+            self.get(name)
+
+
+TOOL_REGISTRY = ToolRegistry()
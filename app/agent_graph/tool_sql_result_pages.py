@@ -0,0 +1,8 @@
+from langchain_core.tools import tool
+from ..agent_graph.sql_pagination import SQL_RESULT_PAGER
+
+
+@tool
+def fetch_sql_result_page(handle: str, offset: int) -> str:
+    """Read more rows of a truncated SQL result. Input should be the handle printed under the result and the offset (number of rows already read)."""
+    return SQL_RESULT_PAGER.fetch_page(handle, offset)
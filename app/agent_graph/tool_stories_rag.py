@@ -1,7 +1,18 @@
+import asyncio
+from typing import Union
 from langchain_chroma import Chroma
+from langchain_core.embeddings import Embeddings
 from langchain_openai import OpenAIEmbeddings
 from langchain_core.tools import tool
 from ..agent_graph.load_tools_config import LoadToolsConfig
+from ..agent_graph.tool_registry import TOOL_REGISTRY
+from ..agent_graph.hybrid_retriever import HybridRetriever
+from ..utils.vectorstore_manager import VECTORSTORE_MANAGER
+from ..utils.context_packer import ContextPacker
+from ..utils.compact_vector_index import CompactVectorIndex, get_compact_index
+from ..utils.embedding_cache import get_cached_embeddings
+from ..utils.embedding_executor import get_embedding_executor
+from ..utils.embedding_backends import create_embedding_backend, embedding_model_name, executor_configs
 
 TOOLS_CFG = LoadToolsConfig()
 
@@ -19,12 +30,16 @@ class StoriesRAGTool:
         vectordb_dir (str): The directory where the Chroma vector database is persisted on disk.
         k (int): The number of top-k nearest neighbor stories to retrieve from the vector database.
         vectordb (Chroma): The Chroma vector database instance connected to the specified collection and embedding model.
+        retriever (HybridRetriever): Fuses BM25 and vector rankings, answering exact names from the BM25 index alone.
+        vector_store (Union[Chroma, CompactVectorIndex]): The engine answering vector searches, selected by the `vector_index` configs.
+        context_packer (ContextPacker): Bounds the retrieved stories returned to the agent to the `context_packing` token budget.
 
     Methods:
         __init__: Initializes the tool with the specified embedding model, vector database, and retrieval parameters.
     """
 
-    def __init__(self, embedding_model: str, vectordb_dir: str, k: int, collection_name: str) -> None:
+    def __init__(self, embedding_model: str, vectordb_dir: str, k: int, collection_name: str,
+                 chunk_overlap: int = 100) -> None:
         """
         Initializes the StoriesRAGTool with the necessary configurations.
 
@@ -34,26 +49,104 @@ class StoriesRAGTool:
             vectordb_dir (str): The directory path where the Chroma vector database is stored and persisted on disk.
             k (int): The number of nearest neighbor stories to retrieve based on query similarity.
             collection_name (str): The name of the collection inside the vector database that holds the relevant stories.
+            chunk_overlap (int): The number of characters shared by consecutive chunks of the collection.
         """
         self.embedding_model = embedding_model
         self.vectordb_dir = vectordb_dir
         self.k = k
-        self.vectordb = Chroma(
+        self.collection_name = collection_name
+        self.retriever = HybridRetriever(
+            persist_directory=vectordb_dir,
             collection_name=collection_name,
+            vectordb_factory=lambda: self.vectordb,
+            vector_store_factory=lambda: self.vector_store,
+            **TOOLS_CFG.hybrid_retrieval_configs)
+        self.context_packer = ContextPacker(
+            chunk_overlap=chunk_overlap,
+            model_name=TOOLS_CFG.primary_agent_llm,
+            **TOOLS_CFG.context_packing_configs)
+
+    @property
+    def embedding_name(self) -> str:
+        """The name of the configured embedding model, e.g. `hashing-384` when a local provider is selected."""
+        return embedding_model_name(
+            provider=TOOLS_CFG.embedding_provider,
+            openai_model=self.embedding_model,
+            local_model=TOOLS_CFG.embedding_backend_configs["local_model"],
+            dimensions=TOOLS_CFG.embedding_backend_configs["dimensions"])
+
+    @property
+    def embedding_function(self) -> Embeddings:
+        """The shared, cached embedding model of the collection's queries."""
+        return get_cached_embeddings(
+            model_name=self.embedding_name,
+            # OpenAI calls are rate-limited and retried by the executor; local providers embed in-process
+            underlying_factory=lambda: get_embedding_executor(
+                model_name=self.embedding_name,
+                underlying_factory=lambda: create_embedding_backend(
+                    provider=TOOLS_CFG.embedding_provider,
+                    openai_factory=lambda: OpenAIEmbeddings(
+                        model=self.embedding_model, base_url=TOOLS_CFG.embedding_client_base_url, max_retries=0),
+                    **TOOLS_CFG.embedding_backend_configs),
+                **TOOLS_CFG.embedding_batch_configs,
+                **executor_configs(TOOLS_CFG.embedding_provider, TOOLS_CFG.embedding_client_configs)),
+            cache_path=TOOLS_CFG.embedding_cache_path,
+            memory_max_entries=TOOLS_CFG.embedding_cache_memory_max_entries,
+            disk_max_entries=TOOLS_CFG.embedding_cache_disk_max_entries)
+
+    @property
+    def vectordb(self) -> Chroma:
+        """The shared Chroma handle of the collection, kept open by the vector store manager."""
+        return VECTORSTORE_MANAGER.get_vectordb(
+            collection_name=self.collection_name,
             persist_directory=self.vectordb_dir,
-            embedding_function=OpenAIEmbeddings(model=self.embedding_model)
+            embedding_function=lambda: self.embedding_function
         )
-        print("Number of vectors in vectordb:",
-              self.vectordb._collection.count(), "\n\n")
 
+    @property
+    def vector_store(self) -> Union[Chroma, CompactVectorIndex]:
+        """The engine answering vector searches: the Chroma handle, or the compact index exported from it."""
+        if TOOLS_CFG.vector_index_engine == "compact":
+            return get_compact_index(
+                persist_directory=self.vectordb_dir,
+                collection_name=self.collection_name,
+                embedding_function=lambda: self.embedding_function,
+                vectordb_factory=lambda: self.vectordb,
+                dtype=TOOLS_CFG.vector_index_dtype)
+        return self.vectordb
 
-@tool
-def lookup_stories(query: str) -> str:
-    """Search among the fictional stories and find the answer to the query. Input should be the query."""
-    rag_tool = StoriesRAGTool(
+
+TOOL_REGISTRY.register(
+    "stories_rag",
+    lambda: StoriesRAGTool(
         embedding_model=TOOLS_CFG.stories_rag_embedding_model,
         vectordb_dir=TOOLS_CFG.stories_rag_vectordb_directory,
         k=TOOLS_CFG.stories_rag_k,
-        collection_name=TOOLS_CFG.stories_rag_collection_name)
-    docs = rag_tool.vectordb.similarity_search(query, k=rag_tool.k)
-    return "\n\n".join([doc.page_content for doc in docs])
+        collection_name=TOOLS_CFG.stories_rag_collection_name,
+        chunk_overlap=TOOLS_CFG.stories_rag_chunk_overlap))
+
+
+@tool
+def lookup_stories(query: str) -> str:
+    """Search among the fictional stories and find the answer to the query. Input should be the query."""
+    rag_tool = TOOL_REGISTRY.get("stories_rag")
+    if TOOLS_CFG.hybrid_retrieval_enabled:
+        docs = rag_tool.retriever.search(query, k=rag_tool.k)
+    else:
+        docs = rag_tool.vector_store.similarity_search(query, k=rag_tool.k)
+    return rag_tool.context_packer.pack(docs)
+
+
+async def alookup_stories(query: str) -> str:
+    """Asynchronous implementation of `lookup_stories`."""
+    # Building the tool opens Chroma, and the vector store may export the compact index: both run off the event loop
+    rag_tool = await asyncio.to_thread(TOOL_REGISTRY.get, "stories_rag")
+    if TOOLS_CFG.hybrid_retrieval_enabled:
+        docs = await rag_tool.retriever.asearch(query, k=rag_tool.k)
+    else:
+        vector_store = await asyncio.to_thread(lambda: rag_tool.vector_store)
+        docs = await vector_store.asimilarity_search(query, k=rag_tool.k)
+    return rag_tool.context_packer.pack(docs)
+
+
+lookup_stories.coroutine = alookup_stories
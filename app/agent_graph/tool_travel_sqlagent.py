@@ -1,13 +1,17 @@
+import asyncio
 from langchain_core.tools import tool
-from langchain_community.utilities import SQLDatabase
 from langchain.chains import create_sql_query_chain
-from langchain_community.tools.sql_database.tool import QuerySQLDataBaseTool
 from langchain_core.prompts import PromptTemplate
 from langchain_core.output_parsers import StrOutputParser
-from langchain_core.runnables import RunnablePassthrough
-from operator import itemgetter
+from langchain_core.runnables import RunnableLambda, RunnablePassthrough
+from typing import Optional
 from langchain_openai import ChatOpenAI
 from ..agent_graph.load_tools_config import LoadToolsConfig
+from ..agent_graph.tool_registry import TOOL_REGISTRY
+from ..agent_graph.sql_query_cache import SQL_QUERY_CACHE
+from ..agent_graph.sql_pagination import SQL_RESULT_PAGER
+from ..agent_graph.schema_snapshot import load_sql_database
+from ..agent_graph.table_router import TableRouter
 
 TOOLS_CFG = LoadToolsConfig()
 
@@ -23,14 +27,16 @@ class TravelSQLAgentTool:
     Attributes:
         sql_agent_llm (ChatOpenAI): An instance of a ChatOpenAI language model used to generate and process SQL queries.
         system_role (str): A system prompt template that guides the language model in answering user questions based on SQL query results.
-        db (SQLDatabase): An instance of the SQL database used to execute queries.
+        db (SnapshotSQLDatabase): An instance of the SQL database used to execute queries.
+        table_router (TableRouter): The local router selecting the tables shown to the language model.
         chain (RunnablePassthrough): A chain of operations that creates SQL queries, executes them, and generates a response.
 
     Methods:
         __init__: Initializes the TravelSQLAgentTool by setting up the language model, SQL database, and query-answering pipeline.
     """
 
-    def __init__(self, llm: str, sqldb_directory: str, llm_temerature: float) -> None:
+    def __init__(self, llm: str, sqldb_directory: str, llm_temerature: float, sample_rows: int = 3,
+                 table_router_configs: Optional[dict] = None) -> None:
         """
         Initializes the TravelSQLAgentTool with the necessary configurations.
 
@@ -38,6 +44,8 @@ class TravelSQLAgentTool:
             llm (str): The name of the language model to be used for generating and interpreting SQL queries.
             sqldb_directory (str): The directory path where the SQLite database is stored.
             llm_temerature (float): The temperature setting for the language model, controlling response randomness.
+            sample_rows (int): The number of sample rows per table shown to the LLM, taken from the schema snapshot.
+            table_router_configs (dict, optional): Keyword arguments of the `TableRouter` (synonyms, thresholds).
         """
         self.sql_agent_llm = ChatOpenAI(
             model=llm, temperature=llm_temerature)
@@ -47,32 +55,60 @@ class TravelSQLAgentTool:
             SQL Result: {result}\n
             Answer:
             """
-        self.db = SQLDatabase.from_uri(
-            f"sqlite:///{sqldb_directory}")
+        # Table descriptions come from the precomputed schema snapshot instead of reflecting the database
+        self.db = load_sql_database(sqldb_directory, sample_rows=sample_rows)
         print(self.db.get_usable_table_names())
 
-        execute_query = QuerySQLDataBaseTool(db=self.db)
-        write_query = create_sql_query_chain(
-            self.sql_agent_llm, self.db)
+        # Bounded preview of the rows, answered from the result cache for repeated queries. The query is cached for
+        # the question once it ran without error.
+        execute_query = SQL_QUERY_CACHE.cache_on_success(
+            RunnableLambda(lambda query: SQL_RESULT_PAGER.run(sqldb_directory, query)),
+            scope=f"travel:{llm}", db_path=sqldb_directory)
+        # Only the tables picked by the local router are shown to the LLM (all of them when it is not confident).
+        self.table_router = TableRouter(
+            self.db.snapshot, learned_path=f"{sqldb_directory}.table_router.json", **(table_router_configs or {}))
+        # Repeated questions against an unchanged schema reuse the SQL written the first time.
+        write_query = SQL_QUERY_CACHE.wrap(
+            RunnablePassthrough.assign(table_names_to_use=self.table_router.as_runnable())
+            | create_sql_query_chain(self.sql_agent_llm, self.db),
+            scope=f"travel:{llm}", db_path=sqldb_directory)
         answer_prompt = PromptTemplate.from_template(
             self.system_role)
 
         answer = answer_prompt | self.sql_agent_llm | StrOutputParser()
         self.chain = (
             RunnablePassthrough.assign(query=write_query).assign(
-                result=itemgetter("query") | execute_query
+                result=execute_query
             )
             | answer
         )
 
 
+TOOL_REGISTRY.register(
+    "travel_sqlagent",
+    lambda: TravelSQLAgentTool(
+        llm=TOOLS_CFG.travel_sqlagent_llm,
+        sqldb_directory=TOOLS_CFG.travel_sqldb_directory,
+        llm_temerature=TOOLS_CFG.travel_sqlagent_llm_temperature,
+        sample_rows=TOOLS_CFG.schema_snapshot_sample_rows,
+        table_router_configs=TOOLS_CFG.travel_sqlagent_table_router
+    ),
+    watch_path=TOOLS_CFG.travel_sqldb_directory)
+
+
 @tool
 def query_travel_sqldb(query: str) -> str:
     """Query the Swiss Airline SQL Database and access all the company's information. Input should be a search query."""
-    agent = TravelSQLAgentTool(
-        llm=TOOLS_CFG.travel_sqlagent_llm,
-        sqldb_directory=TOOLS_CFG.travel_sqldb_directory,
-        llm_temerature=TOOLS_CFG.travel_sqlagent_llm_temperature
-    )
+    agent = TOOL_REGISTRY.get("travel_sqlagent")
     response = agent.chain.invoke({"question": query})
     return response
+
+
+async def aquery_travel_sqldb(query: str) -> str:
+    """Asynchronous implementation of `query_travel_sqldb`."""
+    # Building the agent loads the schema snapshot and connects to the database: off the event loop
+    agent = await asyncio.to_thread(TOOL_REGISTRY.get, "travel_sqlagent")
+    return await agent.chain.ainvoke({"question": query})
+
+
+query_travel_sqldb.coroutine = aquery_travel_sqldb
@@ -0,0 +1,42 @@
+from starlette.applications import Starlette
+from starlette.middleware.wsgi import WSGIMiddleware
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Mount, Route
+from ..servises.rag_servise import ChatBot
+from .history_routes import thread_id_of
+
+
+async def rag_search(request: Request) -> JSONResponse:
+    """Native async version of the Flask `/rag/search` route, served directly on the event loop."""
+    try:
+        data = await request.json()
+    except ValueError:
+        data = {}
+    print("Received request body:", data)
+
+    prompt = (data.get("query") or "").strip()
+    if not prompt:
+        return JSONResponse({"error": "Message cannot be empty."}, status_code=400)
+
+    result = await ChatBot.arespond(chatbot=[], message=prompt, thread_id=thread_id_of(data))
+    return JSONResponse({"response": result[1][-1]})
+
+
+def create_asgi_app(flask_app) -> Starlette:
+    """
+    Wraps the Flask application in an ASGI application.
+
+    `/rag/search` is answered by the async agent pipeline, so a single process can hold many in-flight
+    conversations without a thread per request. Every other route is forwarded to the Flask app.
+
+    Args:
+        flask_app (Flask): The Flask application serving the remaining routes.
+
+    Returns:
+        Starlette: The ASGI application, e.g. to be served with `uvicorn app:asgi_app`.
+    """
+    return Starlette(routes=[
+        Route("/rag/search", rag_search, methods=["POST"]),
+        Mount("/", app=WSGIMiddleware(flask_app)),
+    ])
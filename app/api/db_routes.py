@@ -1,5 +1,6 @@
 from flask import Blueprint, request, jsonify
 from ..agent_graph.tool_chinook_sqlagent import query_chinook_sqldb
+from .history_routes import record_exchange
 
 db_bp = Blueprint('db_bp', __name__, url_prefix='/db')
 
@@ -7,4 +8,5 @@ db_bp = Blueprint('db_bp', __name__, url_prefix='/db')
 def query_db():
     query = request.json.get('query')
     result = query_chinook_sqldb(query)
+    record_exchange(request.json, query, result)
     return jsonify(result)
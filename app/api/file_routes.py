@@ -1,5 +1,6 @@
 from flask import Blueprint, request, jsonify, current_app
 from ..servises.file_servise import *
+from .history_routes import record_exchange
 
 file_bp = Blueprint('file_bp', __name__, url_prefix='/file')
 
@@ -9,4 +10,9 @@ def upload_file():
     if file:
         response ="" # TODO
         return jsonify(response)
-    return jsonify({"status": "error", "message": "No file uploaded!"})
+    response = {"status": "error", "message": "No file uploaded!"}
+    payload = request.get_json(silent=True)
+    if payload is not None:
+        # Sent from the chat box, so the exchange belongs to the conversation
+        record_exchange(payload, f"file: {payload.get('file_data', '')}", response)
+    return jsonify(response)
@@ -0,0 +1,73 @@
+import json
+from typing import Any, Optional
+from flask import Blueprint, request, jsonify
+from ..configs.load_config import LoadProjectConfig
+from ..agent_graph.load_tools_config import LoadToolsConfig
+from ..utils.memory import Memory, get_chat_history_writer, new_thread_id
+
+PROJECT_CFG = LoadProjectConfig()
+TOOLS_CFG = LoadToolsConfig()
+
+MAX_THREAD_ID_LENGTH = 128
+
+history_bp = Blueprint('history_bp', __name__, url_prefix='/history')
+
+
+def thread_id_of(payload: Optional[dict]) -> Optional[str]:
+    """
+    Returns the `thread_id` a client sent with a request, or None when it sent none or an invalid one. The shared
+    `graph_configs.thread_id`, under which clients without a thread were once stored, is not accepted.
+    """
+    thread_id = (payload or {}).get('thread_id')
+    if not isinstance(thread_id, str) or not thread_id.strip() or len(thread_id) > MAX_THREAD_ID_LENGTH:
+        return None
+    thread_id = thread_id.strip()
+    return thread_id if thread_id != str(TOOLS_CFG.thread_id) else None
+
+
+def record_exchange(payload: Optional[dict], user_query: str, response: Any) -> None:
+    """
+    Stores an exchange of a route that does not go through the agent, in the conversation of its sender, or in a
+    new conversation of its own when the sender sent no `thread_id`.
+    """
+    if not isinstance(response, str):
+        response = json.dumps(response)
+    Memory.write_chat_history_to_file(
+        gradio_chatbot=[(user_query, response)], folder_path=PROJECT_CFG.memory_dir,
+        thread_id=thread_id_of(payload) or new_thread_id())
+
+
+def _history_store():
+    """Returns the store of the chat history writer, after writing the messages it still holds."""
+    writer = get_chat_history_writer(PROJECT_CFG.memory_dir)
+    writer.flush(timeout=5)
+    return writer.history_store
+
+
+@history_bp.route('', methods=['GET'])
+def read_history():
+    """Returns a page of a thread's messages: `?thread_id=&limit=20&before=<id of the oldest message shown>`."""
+    thread_id = thread_id_of(request.args)
+    if thread_id is None:
+        return jsonify({"error": "thread_id is required."}), 400
+    store = _history_store()
+    if store is None:
+        return jsonify({"error": "The chat history is stored in CSV files; set memory.backend to sqlite."}), 404
+    try:
+        limit = min(max(int(request.args.get('limit', 20)), 1), 200)
+        before = request.args.get('before', type=int)
+    except ValueError:
+        return jsonify({"error": "limit must be an integer."}), 400
+    return jsonify(store.read(thread_id, limit=limit, before=before))
+
+
+@history_bp.route('', methods=['DELETE'])
+def delete_history():
+    """Deletes the messages of one thread: `?thread_id=`."""
+    thread_id = thread_id_of(request.args)
+    if thread_id is None:
+        return jsonify({"error": "thread_id is required."}), 400
+    store = _history_store()
+    if store is None:
+        return jsonify({"error": "The chat history is stored in CSV files; set memory.backend to sqlite."}), 404
+    return jsonify({"deleted": store.delete_thread(thread_id)})
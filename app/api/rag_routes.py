@@ -1,5 +1,6 @@
 from flask import Blueprint, request, jsonify
 from ..servises.rag_servise  import ChatBot
+from .history_routes import thread_id_of
 
 
 rag_bp = Blueprint("rag", __name__)
@@ -12,5 +13,5 @@ def rag_search():
     if not prompt:
         return jsonify({"error": "Message cannot be empty."}), 400  # Handle empty input
 
-    result = ChatBot.respond(chatbot=[], message=prompt)
+    result = ChatBot.respond(chatbot=[], message=prompt, thread_id=thread_id_of(data))
     return jsonify({"response": result[1][-1]})
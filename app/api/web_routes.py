@@ -1,5 +1,6 @@
 from flask import Blueprint, request, jsonify
 from ..servises.web_servise  import SearchService
+from .history_routes import record_exchange
 
 web_bp = Blueprint('web_bp', __name__, url_prefix='/web')
 
@@ -7,4 +8,5 @@ web_bp = Blueprint('web_bp', __name__, url_prefix='/web')
 def web_search():
     query = request.json.get('query')
     result = SearchService.search(query)
+    record_exchange(request.json, query, result)
     return jsonify(result)
@@ -1,9 +1,11 @@
 import os
+import hashlib
 from typing import List, Tuple
 from ..utils.load_config import LoadConfig
-from sqlalchemy import create_engine, inspect
+from ..utils.sqlite_pool import create_sqlite_engine
+from ..utils.tabular_ingestion import TabularIngestor
+from sqlalchemy import inspect
 import pandas as pd
-from sqlalchemy import create_engine, inspect
 
 APPCFG = LoadConfig()
 
@@ -13,8 +15,8 @@ class PrepareSQLFromTabularData:
     """
     A class that prepares a SQL database from CSV or XLSX files within a specified directory.
 
-    This class reads each file, converts the data to a DataFrame, and then
-    stores it as a table in a SQLite database, which is specified by the application configuration.
+    This class streams each file in chunks and stores it as a table in a SQLite database,
+    which is specified by the application configuration.
     """
     def __init__(self, files_dir) -> None:
         """
@@ -27,8 +29,12 @@ class PrepareSQLFromTabularData:
         self.files_directory = files_dir
         self.file_dir_list = os.listdir(files_dir)
         db_path = APPCFG.stored_csv_xlsx_sqldb_directory
-        db_path = f"sqlite:///{db_path}"
-        self.engine = create_engine(db_path)
+        self.ingestor = TabularIngestor(
+            db_path, chunk_rows=APPCFG.ingestion_chunk_rows, sample_rows=APPCFG.ingestion_sample_rows,
+            workers=APPCFG.ingestion_workers, queue_chunks=APPCFG.ingestion_queue_chunks,
+            parallel_min_bytes=APPCFG.ingestion_parallel_min_bytes)
+        # Writable, WAL-mode engine from the shared SQLite pool, so readers are not blocked while loading
+        self.engine = create_sqlite_engine(db_path, read_only=False)
         print("Number of csv files:", len(self.file_dir_list))
 
     def _prepare_db(self):
@@ -36,18 +42,12 @@ class PrepareSQLFromTabularData:
         Private method to convert CSV/XLSX files from the specified directory into SQL tables.
 
         Each file's name (excluding the extension) is used as the table name.
-        The data is saved into the SQLite database referenced by the engine attribute.
-        """
-        for file in self.file_dir_list:
-            full_file_path = os.path.join(self.files_directory, file)
-            file_name, file_extension = os.path.splitext(file)
-            if file_extension == ".csv":
-                df = pd.read_csv(full_file_path)
-            elif file_extension == ".xlsx":
-                df = pd.read_excel(full_file_path)
-            else:
-                raise ValueError("The selected file type is not supported")
-            df.to_sql(file_name, self.engine, index=False)
+        The files are streamed in chunks, so memory use does not depend on their size.
+        Only new or changed files are loaded, and tables of files removed from the directory are dropped,
+        so the pipeline can be re-run on the same database.
+        """
+        self.ingestor.sync_files(
+            [os.path.join(self.files_directory, file) for file in self.file_dir_list], prune=True)
         print("==============================")
         print("All csv files are saved into the sql database.")
 
@@ -103,26 +103,54 @@ class PrepareVectorDBFromTabularData:
         the data into ChromaDB, and validating the existence of the injected data.
         """
         self.df, self.file_name = self._load_dataframe(file_directory=self.file_directory)
-        self.docs, self.metadatas, self.ids, self.embeddings = self._prepare_data_for_injection(df=self.df, file_name=self.file_name)
+        self.docs, self.metadatas, self.ids = self._prepare_data_for_injection(df=self.df, file_name=self.file_name)
         self._inject_data_into_chromadb()
         self._validate_db()
 
     def _inject_data_into_chromadb(self):
         """
-        Inject the prepared data into ChromaDB.
-        
-        Raises an error if the collection_name already exists in ChromaDB.
+        Inject the prepared data into ChromaDB incrementally.
+
+        The collection is created if it does not exist. Since ids are content hashes, only rows whose id is not
+        yet stored for this file are embedded and upserted, batch by batch, and rows of this file that are no
+        longer in it are deleted. Re-running the pipeline on an unchanged file makes no embedding call.
         The method prints a confirmation message upon successful data injection.
         """
-        collection = self.APPCFG.chroma_client.create_collection(name=self.APPCFG.collection_name)
-        collection.add(
-            documents=self.docs,
-            metadatas=self.metadatas,
-            embeddings=self.embeddings,
-            ids=self.ids
-        )
+        collection = self.APPCFG.chroma_client.get_or_create_collection(name=self.APPCFG.collection_name)
+        existing_ids = set(collection.get(where={"source": self.file_name}, include=[])["ids"])
+        new_rows = [i for i, doc_id in enumerate(self.ids) if doc_id not in existing_ids]
+        removed_ids = list(existing_ids - set(self.ids))
+
+        embedded = 0
+
+        def upsert_batch(batch, embeddings):
+            nonlocal embedded
+            rows = [new_rows[i] for i in batch]
+            # Upserted batch by batch, so an interrupted run keeps what was already embedded
+            collection.upsert(
+                documents=[self.docs[i] for i in rows],
+                metadatas=[self.metadatas[i] for i in rows],
+                embeddings=embeddings,
+                ids=[self.ids[i] for i in rows]
+            )
+            embedded += len(rows)
+            print(f"Embedded {embedded}/{len(new_rows)} new rows")
+
+        # Batches are embedded concurrently within the rate budget, through the embedding cache
+        metrics = self.APPCFG.embedding_executor.embed_in_batches(
+            [self.docs[i] for i in new_rows],
+            on_batch=upsert_batch,
+            checkpoint_path=os.path.join(
+                self.APPCFG.embedding_checkpoint_dir, f"{self.APPCFG.collection_name}-{self.file_name}.json"),
+            embed_fn=self.APPCFG.embedding_model.embed_documents)
+        for start in range(0, len(removed_ids), self.APPCFG.embedding_batch_size):
+            collection.delete(ids=removed_ids[start:start + self.APPCFG.embedding_batch_size])
         print("==============================")
-        print("Data is stored in ChromaDB.")
+        print(f"Data is stored in ChromaDB: {len(new_rows)} rows added, {len(removed_ids)} rows removed, "
+              f"{len(self.ids) - len(new_rows)} rows unchanged.")
+        print(f"Embedding throughput: {metrics['texts_per_second']:.0f} texts/sec, "
+              f"{metrics['tokens_per_second']:.0f} tokens/sec, {metrics['retries']} retries, "
+              f"{metrics['rate_limited']} rate limited responses.")
     
     def _load_dataframe(self, file_directory: str):
         """
@@ -153,40 +181,34 @@ class PrepareVectorDBFromTabularData:
 
     def _prepare_data_for_injection(self, df:pd.DataFrame, file_name:str):
         """
-        Generate embeddings and prepare documents for data injection.
-        
+        Prepare documents for data injection.
+
+        Each row becomes one document built column by column with vectorized string operations. The id of a
+        document is a hash of the file name and its content, so it is stable across runs and identical rows
+        share an id; duplicates are dropped before embedding.
+
         Args:
             df (pd.DataFrame): The DataFrame containing the data to be processed.
             file_name (str): The base name of the file for use in metadata.
             
         Returns:
-            list, list, list, list: Lists containing documents, metadatas, ids, and embeddings respectively.
-        """
-        docs = []
-        metadatas = []
-        ids = []
-        embeddings = []
-        for index, row in df.iterrows():
-            output_str = ""
-            # Treat each row as a separate chunk
-            for col in df.columns:
-                output_str += f"{col}: {row[col]},\n"
-            
-            # That wa for microsoft azure 
-
-            # response = self.APPCFG.azure_openai_client.embeddings.create(
-            #     input = output_str,
-            #     model= self.APPCFG.embedding_model_name
-            # )
-
-            # Now for openAi 
-            response = self.APPCFG.embedding_model.embed_query(output_str)
-
-            embeddings.append(response)
-            docs.append(output_str)
-            metadatas.append({"source": file_name})
-            ids.append(f"id{index}")
-        return docs, metadatas, ids, embeddings
+            list, list, list: Lists containing documents, metadatas and ids respectively.
+        """
+        # Treat each row as a separate chunk: "col: value,\n" for every column
+        docs = pd.Series("", index=df.index)
+        for col in df.columns:
+            # Newer pandas keep missing values as NaN in string columns; render them as "nan" like before
+            docs = docs + f"{col}: " + df[col].astype(str).fillna("nan") + ",\n"
+        # Identical rows produce the same id and are only embedded once
+        docs_by_id = {}
+        for doc in docs.tolist():
+            docs_by_id.setdefault(hashlib.sha256(f"{file_name}\x00{doc}".encode("utf-8")).hexdigest(), doc)
+        if len(docs_by_id) < len(docs):
+            print(f"Skipped {len(docs) - len(docs_by_id)} duplicate rows")
+        ids = list(docs_by_id)
+        docs = list(docs_by_id.values())
+        metadatas = [{"source": file_name} for _ in docs]
+        return docs, metadatas, ids
         
 
     def _validate_db(self):
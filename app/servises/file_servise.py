@@ -1,9 +1,8 @@
-import os
 from typing import List, Tuple
 from ..utils.load_config import LoadConfig
-from sqlalchemy import create_engine, inspect
-import pandas as pd
-from sqlalchemy import create_engine, inspect
+from ..utils.sqlite_pool import create_sqlite_engine
+from ..utils.tabular_ingestion import TabularIngestor
+from sqlalchemy import inspect
 
 APPCFG = LoadConfig()
 
@@ -12,7 +11,7 @@ class ProcessFiles:
     """
     A class to process uploaded files, converting them to a SQL database format.
 
-    This class handles both CSV and XLSX files, reading them into pandas DataFrames and
+    This class handles both CSV and XLSX files, streaming them in chunks and
     storing each as a separate table in the SQL database specified by the application configuration.
     """
     def __init__(self, files_dir: List, chatbot: List) -> None:
@@ -27,8 +26,12 @@ class ProcessFiles:
         self.files_dir = files_dir
         self.chatbot = chatbot
         db_path = APPCFG.uploaded_files_sqldb_directory
-        db_path = f"sqlite:///{db_path}"
-        self.engine = create_engine(db_path)
+        self.ingestor = TabularIngestor(
+            db_path, chunk_rows=APPCFG.ingestion_chunk_rows, sample_rows=APPCFG.ingestion_sample_rows,
+            workers=APPCFG.ingestion_workers, queue_chunks=APPCFG.ingestion_queue_chunks,
+            parallel_min_bytes=APPCFG.ingestion_parallel_min_bytes)
+        # Writable, WAL-mode engine from the shared SQLite pool, so readers are not blocked while loading
+        self.engine = create_sqlite_engine(db_path, read_only=False)
         print("Number of uploaded files:", len(self.files_dir))
 
     def _process_uploaded_files(self) -> Tuple:
@@ -38,17 +41,8 @@ class ProcessFiles:
         Returns:
             Tuple[str, List]: A tuple containing an empty string and the updated chatbot conversation list.
         """
-        for file_dir in self.files_dir:
-            file_names_with_extensions = os.path.basename(file_dir)
-            file_name, file_extension = os.path.splitext(
-                file_names_with_extensions)
-            if file_extension == ".csv":
-                df = pd.read_csv(file_dir)
-            elif file_extension == ".xlsx":
-                df = pd.read_excel(file_dir)
-            else:
-                raise ValueError("The selected file type is not supported")
-            df.to_sql(file_name, self.engine, index=False)
+        # Re-uploaded files replace their table only if their content changed; earlier uploads are kept
+        self.ingestor.sync_files(self.files_dir, prune=False)
         print("==============================")
         print("All csv/xlsx files are saved into the sql database.")
         self.chatbot.append(
@@ -12,7 +12,10 @@ from langchain_openai import OpenAIEmbeddings
 # from langchain.chat_models import AzureChatOpenAI
 from langchain_openai import ChatOpenAI
 
-import chromadb
+from ..utils.vectorstore_manager import VECTORSTORE_MANAGER
+from ..utils.embedding_cache import get_cached_embeddings
+from ..utils.embedding_executor import get_embedding_executor
+from ..utils.embedding_backends import create_embedding_backend, embedding_model_name, executor_configs
 
 print("Environment variables are loaded:", load_dotenv())
 
@@ -24,6 +27,11 @@ class LoadConfig:
 
         self.load_directories(app_config=app_config)
         self.load_llm_configs(app_config=app_config)
+        self.load_embedding_cache_config(app_config=app_config)
+        self.load_tabular_ingestion_config(app_config=app_config)
+        self.load_embedding_batch_config(app_config=app_config)
+        self.load_embedding_backend_config(app_config=app_config)
+        self.load_embedding_client_config(app_config=app_config)
         self.load_openai_models()
         self.load_chroma_client()
         self.load_rag_config(app_config=app_config)
@@ -74,6 +82,36 @@ class LoadConfig:
         self.temperature = app_config["llm_config"]["temperature"]
         self.embedding_model_name = os.getenv("OPENAI_EMBED_MODEL", "text-embedding-ada-002")  # Default embedding model
 
+    def load_embedding_cache_config(self, app_config):
+        self.embedding_cache_path = str(here(app_config["embedding_cache"]["path"]))
+        self.embedding_cache_memory_max_entries = int(app_config["embedding_cache"]["memory_max_entries"])
+        self.embedding_cache_disk_max_entries = int(app_config["embedding_cache"]["disk_max_entries"])
+
+    def load_tabular_ingestion_config(self, app_config):
+        self.ingestion_chunk_rows = int(app_config["tabular_ingestion"]["chunk_rows"])
+        self.ingestion_sample_rows = int(app_config["tabular_ingestion"]["sample_rows"])
+        self.ingestion_workers = int(app_config["tabular_ingestion"]["workers"])
+        self.ingestion_queue_chunks = int(app_config["tabular_ingestion"]["queue_chunks"])
+        self.ingestion_parallel_min_bytes = int(app_config["tabular_ingestion"]["parallel_min_bytes"])
+
+    def load_embedding_batch_config(self, app_config):
+        self.embedding_batch_size = int(app_config["embedding_batches"]["batch_size"])
+        self.embedding_batch_max_tokens = int(app_config["embedding_batches"]["max_tokens"])
+
+    def load_embedding_backend_config(self, app_config):
+        self.embedding_provider = app_config["embedding_backend"]["provider"]
+        self.embedding_local_model = app_config["embedding_backend"]["local_model"]
+        self.embedding_dimensions = int(app_config["embedding_backend"]["dimensions"])
+        self.embedding_local_batch_size = int(app_config["embedding_backend"]["batch_size"])
+
+    def load_embedding_client_config(self, app_config):
+        self.embedding_base_url = app_config["embedding_client"]["base_url"]
+        self.embedding_max_concurrency = int(app_config["embedding_client"]["max_concurrency"])
+        self.embedding_requests_per_minute = int(app_config["embedding_client"]["requests_per_minute"])
+        self.embedding_tokens_per_minute = int(app_config["embedding_client"]["tokens_per_minute"])
+        self.embedding_max_retries = int(app_config["embedding_client"]["max_retries"])
+        self.embedding_checkpoint_dir = str(here(app_config["embedding_client"]["checkpoint_dir"]))
+
     def load_openai_models(self):
         openai_api_key = os.environ["OPENAI_API_KEY"]
 
@@ -84,15 +122,53 @@ class LoadConfig:
             temperature=self.temperature
         )
 
-        # This will be used for embeddings
-        self.embedding_model = OpenAIEmbeddings(
-            openai_api_key=openai_api_key,
-            model=self.embedding_model_name
+        # The OpenAI model, or an in-process CPU model when a local embedding provider is configured
+        self.embedding_backend_name = embedding_model_name(
+            provider=self.embedding_provider,
+            openai_model=self.embedding_model_name,
+            local_model=self.embedding_local_model,
+            dimensions=self.embedding_dimensions
+        )
+
+        # Rate-limited, retried and concurrent embedding calls, sharing one budget per model.
+        # OpenAIEmbeddings' own retries are disabled in favour of the executor's.
+        self.embedding_executor = get_embedding_executor(
+            model_name=self.embedding_backend_name,
+            underlying_factory=lambda: create_embedding_backend(
+                provider=self.embedding_provider,
+                openai_factory=lambda: OpenAIEmbeddings(
+                    openai_api_key=openai_api_key,
+                    model=self.embedding_model_name,
+                    base_url=self.embedding_base_url,
+                    max_retries=0
+                ),
+                local_model=self.embedding_local_model,
+                dimensions=self.embedding_dimensions,
+                batch_size=self.embedding_local_batch_size
+            ),
+            batch_size=self.embedding_batch_size,
+            max_batch_tokens=self.embedding_batch_max_tokens,
+            **executor_configs(self.embedding_provider, {
+                "max_concurrency": self.embedding_max_concurrency,
+                "requests_per_minute": self.embedding_requests_per_minute,
+                "tokens_per_minute": self.embedding_tokens_per_minute,
+                "max_retries": self.embedding_max_retries
+            })
+        )
+
+        # This will be used for embeddings. Repeated texts are answered from the shared embedding cache.
+        self.embedding_model = get_cached_embeddings(
+            model_name=self.embedding_backend_name,
+            underlying_factory=lambda: self.embedding_executor,
+            cache_path=self.embedding_cache_path,
+            memory_max_entries=self.embedding_cache_memory_max_entries,
+            disk_max_entries=self.embedding_cache_disk_max_entries
         )
 
     def load_chroma_client(self):
-        self.chroma_client = chromadb.PersistentClient(
-            path=str(here(self.persist_directory)))
+        # Shared with every other LoadConfig instance instead of reopening the persistent client each time
+        self.chroma_client = VECTORSTORE_MANAGER.get_client(
+            str(here(self.persist_directory)))
 
     def load_rag_config(self, app_config):
         self.collection_name = app_config["rag_config"]["collection_name"]
@@ -127,12 +127,12 @@
 #             pass
 
 
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 from ..configs.load_config import LoadProjectConfig
 from ..agent_graph.load_tools_config import LoadToolsConfig
 from ..agent_graph.build_full_graph import build_graph
 from ..utils.app_utils import create_directory
-from ..utils.memory import Memory
+from ..utils.memory import Memory, new_thread_id
 from langchain_core.messages import HumanMessage
 
 
@@ -146,6 +146,11 @@ TOOLS_CFG = LoadToolsConfig()
 graph = build_graph()
 config = {"configurable": {"thread_id": TOOLS_CFG.thread_id}}
 
+
+def thread_config(thread_id: str) -> dict:
+    """Returns the graph config of a conversation; each browser session sends its own `thread_id`."""
+    return {"configurable": {"thread_id": thread_id}}
+
 create_directory("memory")
 
 
@@ -155,15 +160,18 @@ class ChatBot:
     user messages, generates appropriate responses, and saves the chat history to a specified memory directory.
 
     Attributes:
-        config (dict): A configuration dictionary that stores specific settings such as the `thread_id`.
+        config (dict): The configuration of the shared `graph_configs.thread_id` conversation. Requests without a
+            `thread_id` get a new conversation of their own instead.
 
     Methods:
-        respond(chatbot: List, message: str) -> Tuple:
+        respond(chatbot: List, message: str, thread_id: Optional[str] = None) -> Tuple:
             Processes the user message through the agent graph, generates a response, appends it to the chat history,
             and writes the chat history to a file.
+        arespond(chatbot: List, message: str, thread_id: Optional[str] = None) -> Tuple:
+            Asynchronous variant of `respond` for the ASGI entry point.
     """
     @staticmethod
-    def respond(chatbot: List, message: str) -> Tuple:
+    def respond(chatbot: List, message: str, thread_id: Optional[str] = None) -> Tuple:
         """
         Processes a user message using the agent graph, generates a response, and appends it to the chat history.
         The chat history is also saved to a memory file for future reference.
@@ -171,6 +179,8 @@ class ChatBot:
         Args:
             chatbot (List): A list representing the chatbot conversation history. Each entry is a tuple of the user message and the bot response.
             message (str): The user message to process.
+            thread_id (str, optional): The conversation of the message, which keys the agent's memory and the
+                stored history. Defaults to a new conversation of its own.
 
         Returns:
             Tuple: Returns an empty string (representing the new user input placeholder) and the updated conversation history.
@@ -179,8 +189,9 @@ class ChatBot:
         if not isinstance(message, str) or not message.strip():
             raise ValueError("Invalid message format. Message must be a non-empty string.")
 
+        thread_id = thread_id or new_thread_id()
         events = graph.stream(
-            {"messages": [HumanMessage(content=message)]}, config, stream_mode="values"
+            {"messages": [HumanMessage(content=message)]}, thread_config(thread_id), stream_mode="values"
         )
         for event in events:
             event["messages"][-1].pretty_print()
@@ -189,5 +200,36 @@ class ChatBot:
             (message, event["messages"][-1].content))
 
         Memory.write_chat_history_to_file(
-            gradio_chatbot=chatbot, folder_path=PROJECT_CFG.memory_dir, thread_id=TOOLS_CFG.thread_id)
+            gradio_chatbot=chatbot, folder_path=PROJECT_CFG.memory_dir, thread_id=thread_id)
+        return "", chatbot
+
+    @staticmethod
+    async def arespond(chatbot: List, message: str, thread_id: Optional[str] = None) -> Tuple:
+        """
+        Asynchronous variant of `respond` that runs the agent graph with `astream`, so the calling event loop is
+        free to serve other conversations while the LLM and the tools are waiting on the network.
+
+        Args:
+            chatbot (List): A list representing the chatbot conversation history. Each entry is a tuple of the user message and the bot response.
+            message (str): The user message to process.
+            thread_id (str, optional): The conversation of the message, which keys the agent's memory and the
+                stored history. Defaults to a new conversation of its own.
+
+        Returns:
+            Tuple: Returns an empty string (representing the new user input placeholder) and the updated conversation history.
+        """
+        if not isinstance(message, str) or not message.strip():
+            raise ValueError("Invalid message format. Message must be a non-empty string.")
+
+        thread_id = thread_id or new_thread_id()
+        async for event in graph.astream(
+            {"messages": [HumanMessage(content=message)]}, thread_config(thread_id), stream_mode="values"
+        ):
+            event["messages"][-1].pretty_print()
+
+        chatbot.append(
+            (message, event["messages"][-1].content))
+
+        Memory.write_chat_history_to_file(
+            gradio_chatbot=chatbot, folder_path=PROJECT_CFG.memory_dir, thread_id=thread_id)
         return "", chatbot
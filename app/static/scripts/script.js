@@ -6,9 +6,21 @@ const API_ROUTES = {
     webSearch: `${FLASK_SERVER_URL}/web/search`,
     ragSearch: `${FLASK_SERVER_URL}/rag/search`,
     fileUpload: `${FLASK_SERVER_URL}/file/upload`,
-    dbQuery: `${FLASK_SERVER_URL}/db/query`
+    dbQuery: `${FLASK_SERVER_URL}/db/query`,
+    history: `${FLASK_SERVER_URL}/history`
 };
 
+// The conversation of this browser, which keeps its messages and the agent's memory apart from other visitors
+const getSessionThreadId = () => {
+    let threadId = localStorage.getItem("chat-thread-id");
+    if (!threadId) {
+        threadId = window.crypto?.randomUUID?.() || `${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}`;
+        localStorage.setItem("chat-thread-id", threadId);
+    }
+    return threadId;
+};
+const SESSION_THREAD_ID = getSessionThreadId();
+
 // Determine the appropriate Flask route
 const getApiEndpoint = (message) => {
     if (message.startsWith("web:")) return API_ROUTES.webSearch;
@@ -33,63 +45,97 @@ let isGeneratingResponse = false;
 // const GOOGLE_API_KEY = "YOUR_API_KEY";
 // const API_REQUEST_URL = `https://generativelanguage.googleapis.com/v1/models/gemini-pro:generateContent?key=${GOOGLE_API_KEY}`;
 
-// Load saved data from local storage
-const loadSavedChatHistory = () => {
-    const savedConversations = JSON.parse(localStorage.getItem("saved-api-chats")) || [];
-    const isLightTheme = localStorage.getItem("themeColor") === "light_mode";
-
-    document.body.classList.toggle("light_mode", isLightTheme);
-    themeToggleButton.innerHTML = isLightTheme ? '<i class="bx bx-moon"></i>' : '<i class="bx bx-sun"></i>';
-
-    chatHistoryContainer.innerHTML = '';
+// Messages per history page, and the cursor of the next (older) page; null once the whole thread is shown
+const HISTORY_PAGE_SIZE = 20;
+let historyCursor = null;
+let isLoadingHistory = false;
 
-    // Iterate through saved chat history and display messages
-    savedConversations.forEach(conversation => {
-        // Display the user's message
-        const userMessageHtml = `
+// Build the elements of one stored interaction without the typing effect
+const createHistoryMessageElements = (message) => {
+    const userMessageHtml = `
 
             <div class="message__content">
                 <img class="message__avatar" src="/static/images/assets/profile.png" alt="User avatar">
-               <p class="message__text">${conversation.userMessage}</p>
+               <p class="message__text"></p>
             </div>
         
         `;
 
-        const outgoingMessageElement = createChatMessageElement(userMessageHtml, "message--outgoing");
-        chatHistoryContainer.appendChild(outgoingMessageElement);
+    const outgoingMessageElement = createChatMessageElement(userMessageHtml, "message--outgoing");
+    outgoingMessageElement.querySelector(".message__text").innerText = message.user_query;
 
-        // Display the API response
-        const responseText = conversation.apiResponse?.candidates?.[0]?.content?.parts?.[0]?.text;
-        const parsedApiResponse = marked.parse(responseText); // Convert to HTML
-        const rawApiResponse = responseText; // Plain text version
-
-        const responseHtml = `
+    const responseHtml = `
         
            <div class="message__content">
                 <img class="message__avatar" src="/static/images/assets/gemini.svg" alt="Gemini avatar">
                 <p class="message__text"></p>
-                <div class="message__loading-indicator hide">
-                    <div class="message__loading-bar"></div>
-                    <div class="message__loading-bar"></div>
-                    <div class="message__loading-bar"></div>
-                </div>
             </div>
-            <span onClick="copyMessageToClipboard(this)" class="message__icon hide"><i class='bx bx-copy-alt'></i></span>
+            <span onClick="copyMessageToClipboard(this)" class="message__icon"><i class='bx bx-copy-alt'></i></span>
         
         `;
 
-        const incomingMessageElement = createChatMessageElement(responseHtml, "message--incoming");
-        chatHistoryContainer.appendChild(incomingMessageElement);
+    const incomingMessageElement = createChatMessageElement(responseHtml, "message--incoming");
+    incomingMessageElement.querySelector(".message__text").innerHTML = marked.parse(message.response || "");
 
-        const messageTextElement = incomingMessageElement.querySelector(".message__text");
+    return [outgoingMessageElement, incomingMessageElement];
+};
 
-        // Display saved chat without typing effect
-        showTypingEffect(rawApiResponse, parsedApiResponse, messageTextElement, incomingMessageElement, true); // 'true' skips typing
-    });
+// Load one page of the conversation from the server; older pages are inserted above the messages already shown
+const loadChatHistoryPage = async (before = null) => {
+    if (isLoadingHistory) return;
+    isLoadingHistory = true;
+
+    try {
+        const params = new URLSearchParams({ thread_id: SESSION_THREAD_ID, limit: HISTORY_PAGE_SIZE });
+        if (before !== null) params.set("before", before);
+
+        const response = await fetch(`${API_ROUTES.history}?${params}`);
+        if (!response.ok) return;
+        const page = await response.json();
+
+        const fragment = document.createDocumentFragment();
+        page.messages.forEach(message => createHistoryMessageElements(message).forEach(element => fragment.appendChild(element)));
+
+        if (before === null) {
+            chatHistoryContainer.appendChild(fragment);
+            chatHistoryContainer.scrollTop = chatHistoryContainer.scrollHeight;
+        } else {
+            // Keep the messages in view where they were while the older page is added above them
+            const previousHeight = chatHistoryContainer.scrollHeight;
+            chatHistoryContainer.insertBefore(fragment, chatHistoryContainer.firstChild);
+            chatHistoryContainer.scrollTop += chatHistoryContainer.scrollHeight - previousHeight;
+        }
 
-    document.body.classList.toggle("hide-header", savedConversations.length > 0);
+        hljs.highlightAll();
+        addCopyButtonToCodeBlocks();
+        historyCursor = page.next_before;
+        document.body.classList.toggle("hide-header", chatHistoryContainer.children.length > 0);
+    } catch (error) {
+        console.error("Could not load the chat history:", error);
+    } finally {
+        isLoadingHistory = false;
+    }
 };
 
+// Load the theme and the latest messages on page load
+const loadSavedChatHistory = () => {
+    const isLightTheme = localStorage.getItem("themeColor") === "light_mode";
+
+    document.body.classList.toggle("light_mode", isLightTheme);
+    themeToggleButton.innerHTML = isLightTheme ? '<i class="bx bx-moon"></i>' : '<i class="bx bx-sun"></i>';
+
+    chatHistoryContainer.innerHTML = '';
+    historyCursor = null;
+    loadChatHistoryPage();
+};
+
+// Load older messages when scrolled to the top of the conversation
+chatHistoryContainer.addEventListener("scroll", () => {
+    if (chatHistoryContainer.scrollTop === 0 && historyCursor !== null) {
+        loadChatHistoryPage(historyCursor);
+    }
+});
+
 // create a new chat message element
 const createChatMessageElement = (htmlContent, ...cssClasses) => {
     const messageElement = document.createElement("div");
@@ -156,6 +202,8 @@ const requestApiResponse = async (incomingMessageElement) => {
         } else {
             requestBody = { query: currentUserMessage };
         }
+        // Every route stores the exchange in this browser's conversation
+        requestBody.thread_id = SESSION_THREAD_ID;
 
         // Make API request
         const response = await fetch(apiUrl, {
@@ -169,15 +217,8 @@ const requestApiResponse = async (incomingMessageElement) => {
 
         // Extract response text
         const responseText = responseData.response || "No response received.";
-        showTypingEffect(responseText, responseText, messageTextElement, incomingMessageElement);
-
-        // Save conversation in local storage
-        let savedConversations = JSON.parse(localStorage.getItem("saved-api-chats")) || [];
-        savedConversations.push({
-            userMessage: currentUserMessage,
-            apiResponse: responseText
-        });
-        localStorage.setItem("saved-api-chats", JSON.stringify(savedConversations));
+        // The server stores the conversation; only the new message is rendered
+        showTypingEffect(responseText, marked.parse(responseText), messageTextElement, incomingMessageElement);
 
         // Clear input after sending
         inputElement.value = ""; 
@@ -288,9 +329,9 @@ themeToggleButton.addEventListener('click', () => {
 });
 
 // Clear all chat history
-clearChatButton.addEventListener('click', () => {
+clearChatButton.addEventListener('click', async () => {
     if (confirm("Are you sure you want to delete all chat history?")) {
-        localStorage.removeItem("saved-api-chats");
+        await fetch(`${API_ROUTES.history}?${new URLSearchParams({ thread_id: SESSION_THREAD_ID })}`, { method: "DELETE" });
 
         // Reload chat history to reflect changes
         loadSavedChatHistory();
@@ -0,0 +1,306 @@
+import os
+import json
+import uuid
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from .vectorstore_manager import VectorStoreManager
+
+try:
+    import fcntl
+except ImportError:  # Windows: concurrent exports are still safe, only not deduplicated
+    fcntl = None
+
+SUPPORTED_DTYPES = ("float16", "int8")
+
+
+@contextmanager
+def _export_lock(lock_path: str) -> Iterator[None]:
+    """Holds an exclusive lock on a file, which serializes the exports of a collection across processes."""
+    with open(lock_path, "a") as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+class CompactVectorIndex:
+    """
+    An exact nearest-neighbour index over a memory-mapped matrix of normalized, quantized embeddings.
+
+    The vectors of a Chroma collection are exported once to a `<collection>.vectors.<export id>.npy` file next to
+    it, as float16 (half the size of float32) or int8 with one scale per row (a quarter), with the ids, texts and
+    metadata in the side file `<collection>.vectors.json`, which names the matrix of the current export. The
+    matrix is opened with `np.load(mmap_mode="r")`, so the operating system pages it in on demand and
+    every server worker process on the machine shares the same physical pages instead of holding its own copy.
+    A query is answered with a matrix product over the whole matrix, in blocks of `BLOCK_ROWS` rows converted to
+    float32, which for collections of this size is fast and, unlike an HNSW graph, exact over the stored vectors.
+    int8 is the faster of the two: NumPy converts float16 without SIMD on many builds.
+
+    It offers the search methods of the LangChain `Chroma` store used by the RAG tools, ranking by cosine
+    similarity (the same order as Chroma's L2 distance for the normalized OpenAI embeddings).
+
+    Attributes:
+        vectors (np.ndarray): The memory-mapped matrix, one row per document.
+        scales (np.ndarray): The per-row scales of an int8 matrix, None for float16.
+        ids (List[str]): The ids of the documents.
+        documents (List[str]): The texts of the documents.
+        metadatas (List[dict]): The metadata of the documents.
+        embedding_function (Embeddings): Embeds the queries.
+        signature (list): The signature of the collection files the index was exported from.
+    """
+
+    BLOCK_ROWS = 256
+
+    def __init__(self, vectors: np.ndarray, scales: Optional[np.ndarray], ids: List[str], documents: List[str],
+                 metadatas: List[dict], embedding_function: Embeddings, signature: Optional[list] = None) -> None:
+        """
+        Initializes the index over loaded arrays; use `load` or `build`.
+
+        Args:
+            vectors (np.ndarray): The matrix of normalized, quantized vectors.
+            scales (np.ndarray, optional): The per-row scales of an int8 matrix.
+            ids (List[str]): The ids of the documents.
+            documents (List[str]): The texts of the documents.
+            metadatas (List[dict]): The metadata of the documents.
+            embedding_function (Embeddings): Embeds the queries.
+            signature (list, optional): The signature of the collection files the index was exported from.
+        """
+        self.vectors = vectors
+        self.scales = scales
+        self.ids = ids
+        self.documents = documents
+        self.metadatas = metadatas
+        self.embedding_function = embedding_function
+        self.signature = signature
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @staticmethod
+    def paths(persist_directory: str, collection_name: str, export_id: Optional[str] = None) -> Dict[str, str]:
+        """
+        Returns the files of the index of a collection: the side file and export lock, and the matrix and scales of
+        an export (the files of exports made before export ids existed when none is given).
+        """
+        prefix = os.path.join(str(persist_directory), f"{collection_name}.vectors")
+        data_prefix = f"{prefix}.{export_id}" if export_id else prefix
+        return {"vectors": f"{data_prefix}.npy", "scales": f"{data_prefix}.scales.npy", "meta": f"{prefix}.json",
+                "lock": f"{prefix}.lock"}
+
+    @classmethod
+    def build(cls, collection, persist_directory: str, embedding_function: Embeddings, dtype: str = "int8",
+              signature: Optional[list] = None, page_size: int = 5000) -> "CompactVectorIndex":
+        """
+        Exports the vectors of a Chroma collection to the index files and opens them.
+
+        The collection is read page by page straight into a memory-mapped file, so memory use does not depend on
+        its size. Every export writes its matrix and scales to files of its own, named after a new export id, and
+        then atomically replaces the side file, which names them: processes exporting at the same time never write
+        to the same file, and readers always find a side file and a matrix of the same, complete export. The files
+        of the previous export are then removed (processes that still map them keep reading them). Concurrent
+        exports of a collection are serialized by `get_compact_index`.
+
+        Args:
+            collection: The Chroma collection.
+            persist_directory (str): The directory of the Chroma database, where the index files are written.
+            embedding_function (Embeddings): Embeds the queries.
+            dtype (str): "float16" or "int8".
+            signature (list, optional): The signature of the collection files.
+            page_size (int): The number of vectors read from Chroma at a time.
+
+        Returns:
+            CompactVectorIndex: The index, opened from the new files.
+        """
+        if dtype not in SUPPORTED_DTYPES:
+            raise ValueError(
+                f"Unsupported vector index dtype {dtype!r}, expected one of {', '.join(SUPPORTED_DTYPES)}")
+        export_id = f"{os.getpid()}-{uuid.uuid4().hex}"
+        paths = cls.paths(persist_directory, collection.name, export_id)
+        previous = cls._export_paths(persist_directory, collection.name)
+        total = collection.count()
+        ids, documents, metadatas = [], [], []
+        vectors = scales = None
+        for offset in range(0, max(total, 1), page_size):
+            page = collection.get(include=["embeddings", "documents", "metadatas"], limit=page_size, offset=offset)
+            if not page["ids"]:
+                break
+            block = np.asarray(page["embeddings"], dtype=np.float32)
+            if vectors is None:
+                vectors = np.lib.format.open_memmap(paths["vectors"], mode="w+", dtype=dtype,
+                                                    shape=(total, block.shape[1]))
+                scales = np.ones(total, dtype=np.float32)
+            block /= np.maximum(np.linalg.norm(block, axis=1, keepdims=True), 1e-12)
+            rows = slice(len(ids), len(ids) + len(block))
+            if dtype == "int8":
+                scales[rows] = np.maximum(np.abs(block).max(axis=1), 1e-12) / 127
+                vectors[rows] = np.round(block / scales[rows, None]).astype(np.int8)
+            else:
+                vectors[rows] = block.astype(np.float16)
+            ids.extend(page["ids"])
+            documents.extend(page["documents"])
+            metadatas.extend(metadata or {} for metadata in page["metadatas"])
+        if vectors is None:
+            vectors = np.lib.format.open_memmap(paths["vectors"], mode="w+", dtype=dtype, shape=(0, 0))
+            scales = np.ones(0, dtype=np.float32)
+        vectors.flush()
+        del vectors
+        np.save(paths["scales"], scales)
+        meta_tmp = f"{paths['meta']}.{export_id}.tmp"
+        with open(meta_tmp, "w", encoding="utf-8") as f:
+            json.dump({"dtype": dtype, "signature": signature, "export_id": export_id, "ids": ids,
+                       "documents": documents, "metadatas": metadatas}, f)
+        # Publishes the export: the side file is written last and names the files written above
+        os.replace(meta_tmp, paths["meta"])
+        if previous is not None:
+            for path in (previous["vectors"], previous["scales"]):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+        return cls.load(persist_directory, collection.name, embedding_function)
+
+    @classmethod
+    def _export_paths(cls, persist_directory: str, collection_name: str) -> Optional[Dict[str, str]]:
+        """Returns the files of the export the side file currently names, or None if there is none."""
+        paths = cls.paths(persist_directory, collection_name)
+        try:
+            with open(paths["meta"], encoding="utf-8") as f:
+                export_id = json.load(f).get("export_id")
+        except (OSError, ValueError):
+            return None
+        return cls.paths(persist_directory, collection_name, export_id)
+
+    @classmethod
+    def load(cls, persist_directory: str, collection_name: str,
+             embedding_function: Embeddings) -> Optional["CompactVectorIndex"]:
+        """
+        Opens the index files of a collection, memory-mapping the matrix.
+
+        Returns:
+            CompactVectorIndex: The index, or None if the collection was never exported.
+        """
+        paths = cls.paths(persist_directory, collection_name)
+        if not os.path.exists(paths["meta"]):
+            return None
+        with open(paths["meta"], encoding="utf-8") as f:
+            meta = json.load(f)
+        paths = cls.paths(persist_directory, collection_name, meta.get("export_id"))
+        # Slicing keeps the memory map; rows beyond the ids are left by a collection that shrank during export
+        vectors = np.load(paths["vectors"], mmap_mode="r")[:len(meta["ids"])]
+        scales = np.load(paths["scales"])[:len(meta["ids"])] if meta["dtype"] == "int8" else None
+        return cls(vectors, scales, meta["ids"], meta["documents"], meta["metadatas"], embedding_function,
+                   signature=meta["signature"])
+
+    def search_by_vector(self, embedding: List[float], k: int) -> List[Tuple[int, float]]:
+        """
+        Returns the `k` rows most similar to a vector.
+
+        Args:
+            embedding (List[float]): The query vector.
+            k (int): The number of rows to return.
+
+        Returns:
+            List[Tuple[int, float]]: The row indexes and cosine similarities, most similar first.
+        """
+        if not len(self.ids) or k <= 0:
+            return []
+        query = np.asarray(embedding, dtype=np.float32)
+        query /= max(float(np.linalg.norm(query)), 1e-12)
+        scores = np.empty(len(self.ids), dtype=np.float32)
+        # Small blocks converted into one reused buffer stay in the CPU cache between the conversion and the product
+        buffer = np.empty((min(self.BLOCK_ROWS, len(self.ids)), self.vectors.shape[1]), dtype=np.float32)
+        for start in range(0, len(self.ids), self.BLOCK_ROWS):
+            block = self.vectors[start:start + self.BLOCK_ROWS]
+            np.copyto(buffer[:len(block)], block, casting="unsafe")
+            scores[start:start + len(block)] = buffer[:len(block)] @ query
+        if self.scales is not None:
+            scores *= self.scales
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        return [(int(i), float(scores[i])) for i in top[np.argsort(-scores[top])]]
+
+    def _documents(self, hits: List[Tuple[int, float]]) -> List[Tuple[Document, float]]:
+        """Turns search hits into LangChain documents with their similarity."""
+        return [(Document(page_content=self.documents[i], metadata=self.metadatas[i], id=self.ids[i]), score)
+                for i, score in hits]
+
+    def similarity_search_with_score(self, query: str, k: int = 4) -> List[Tuple[Document, float]]:
+        """
+        Returns the documents most similar to a query with their cosine similarity, most similar first.
+
+        Args:
+            query (str): The query.
+            k (int): The number of documents to return.
+
+        Returns:
+            List[Tuple[Document, float]]: The documents and their similarity.
+        """
+        return self._documents(self.search_by_vector(self.embedding_function.embed_query(query), k))
+
+    def similarity_search(self, query: str, k: int = 4) -> List[Document]:
+        """
+        Returns the documents most similar to a query, like `Chroma.similarity_search`.
+
+        Args:
+            query (str): The query.
+            k (int): The number of documents to return.
+
+        Returns:
+            List[Document]: The documents, most similar first.
+        """
+        return [doc for doc, _ in self.similarity_search_with_score(query, k)]
+
+    async def asimilarity_search(self, query: str, k: int = 4) -> List[Document]:
+        """Asynchronous variant of `similarity_search`; only the query embedding is awaited."""
+        embedding = await self.embedding_function.aembed_query(query)
+        return [doc for doc, _ in self._documents(self.search_by_vector(embedding, k))]
+
+
+_INDEXES: Dict[Tuple[str, str, str], CompactVectorIndex] = {}
+_INDEXES_LOCK = threading.Lock()
+
+
+def get_compact_index(persist_directory: str, collection_name: str, embedding_function: Callable[[], Embeddings],
+                      vectordb_factory: Callable[[], object], dtype: str = "int8") -> CompactVectorIndex:
+    """
+    Returns the process-wide compact index of a Chroma collection, exporting it again when the collection changed.
+
+    The export found next to the collection is reused when it matches the collection's files, e.g. when it was
+    written by another worker process or by the ingestion script; otherwise it is rebuilt from the collection.
+    Exports are serialized across processes by a lock file, so when several workers find the export stale, one
+    rebuilds it and the others load its result.
+
+    Args:
+        persist_directory (str): The directory of the Chroma database.
+        collection_name (str): The name of the collection.
+        embedding_function (Callable[[], Embeddings]): Returns the model embedding the queries.
+        vectordb_factory (Callable[[], Chroma]): Returns the Chroma handle of the collection, used to export it.
+        dtype (str): "float16" or "int8".
+
+    Returns:
+        CompactVectorIndex: The shared index.
+    """
+    persist_directory = str(persist_directory)
+    signature = VectorStoreManager._signature(persist_directory)
+    signature = list(signature) if signature is not None else None
+    key = (persist_directory, collection_name, dtype)
+    with _INDEXES_LOCK:
+        index = _INDEXES.get(key)
+        if index is not None and index.signature == signature:
+            return index
+        with _export_lock(CompactVectorIndex.paths(persist_directory, collection_name)["lock"]):
+            # Loaded under the lock: another process may have just finished the export
+            index = CompactVectorIndex.load(persist_directory, collection_name, embedding_function())
+            if index is None or index.signature != signature or (index.scales is not None) != (dtype == "int8"):
+                print(f"Exporting '{collection_name}' to a compact {dtype} vector index")
+                index = CompactVectorIndex.build(vectordb_factory()._collection, persist_directory,
+                                                 embedding_function(), dtype=dtype, signature=signature)
+        _INDEXES[key] = index
+        return index
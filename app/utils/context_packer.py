@@ -0,0 +1,143 @@
+import re
+from typing import List, Optional, Sequence, Set, Tuple
+from langchain_core.documents import Document
+from .token_counting import count_tokens, truncate_to_tokens
+
+SEPARATOR = "\n\n"
+
+
+def _shingles(text: str, size: int = 3) -> Set[Tuple[str, ...]]:
+    """Returns the word n-grams of a text, compared to detect near-duplicate chunks."""
+    words = re.findall(r"\w+", text.lower())
+    if len(words) <= size:
+        return {tuple(words)} if words else set()
+    return {tuple(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def _overlap(previous: str, text: str, max_overlap: int, min_overlap: int) -> int:
+    """Returns the length of the longest end of `previous` that `text` starts with, ignoring short matches."""
+    for length in range(min(max_overlap, len(previous), len(text)), min_overlap - 1, -1):
+        if previous.endswith(text[:length]):
+            return length
+    return 0
+
+
+class ContextPacker:
+    """
+    Packs retrieved documents into a bounded context for the agent's prompt.
+
+    Consecutive chunks of a document share up to `chunk_overlap` characters, and a collection rebuilt from
+    slightly different copies of a file returns the same passage several times; both only cost tokens. The
+    documents are taken in order of relevance and:
+
+    - the text a chunk shares with a chunk of the same file already packed is cut from it, and chunks contained
+      in a packed chunk are dropped,
+    - chunks whose word trigrams overlap a packed chunk's by at least `near_duplicate_threshold` are dropped,
+    - chunks are added until `max_tokens` tokens of the prompt model are used; the first chunk that does not fit
+      is cut to the remaining budget when at least `min_chunk_tokens` remain, and the rest are left out.
+
+    The tokens are counted locally with tiktoken (or its estimate when the encodings are unavailable), so packing
+    costs no request and the size of the tool's answer no longer grows with `k`.
+
+    Attributes:
+        max_tokens (int): The token budget of the packed context.
+        chunk_overlap (int): The number of characters shared by consecutive chunks of the collection.
+        near_duplicate_threshold (float): The Jaccard similarity above which a chunk is a near-duplicate.
+        min_chunk_tokens (int): The smallest remainder of the budget worth filling with a cut chunk.
+        model_name (str): The model whose tokenizer counts the tokens.
+    """
+
+    def __init__(self, max_tokens: int = 1500, chunk_overlap: int = 100, near_duplicate_threshold: float = 0.8,
+                 min_chunk_tokens: int = 50, model_name: str = "gpt-4o-mini") -> None:
+        """
+        Initializes the packer.
+
+        Args:
+            max_tokens (int): The token budget of the packed context.
+            chunk_overlap (int): The number of characters shared by consecutive chunks of the collection.
+            near_duplicate_threshold (float): The Jaccard similarity above which a chunk is a near-duplicate.
+            min_chunk_tokens (int): The smallest remainder of the budget worth filling with a cut chunk.
+            model_name (str): The model whose tokenizer counts the tokens.
+        """
+        self.max_tokens = max_tokens
+        self.chunk_overlap = chunk_overlap
+        self.near_duplicate_threshold = near_duplicate_threshold
+        self.min_chunk_tokens = min_chunk_tokens
+        self.model_name = model_name
+
+    def _is_near_duplicate(self, shingles: Set[Tuple[str, ...]], packed: List[Set[Tuple[str, ...]]]) -> bool:
+        """Whether the shingles of a chunk are close to those of a packed chunk."""
+        for other in packed:
+            union = len(shingles | other)
+            if union and len(shingles & other) / union >= self.near_duplicate_threshold:
+                return True
+        return False
+
+    def _trim_overlap(self, doc: Document, packed: List[Tuple[Document, str]]) -> Optional[str]:
+        """Returns the text of a chunk minus what it shares with the packed chunks of its file, or None if empty."""
+        text = doc.page_content.strip()
+        source = (doc.metadata or {}).get("source")
+        # Some tolerance above chunk_overlap: the splitter moves the overlap to the nearest separator
+        max_overlap = self.chunk_overlap + self.chunk_overlap // 2
+        min_overlap = min(20, max(1, self.chunk_overlap // 4))
+        for other, other_text in packed:
+            if (other.metadata or {}).get("source") != source:
+                continue
+            if text in other_text:
+                return None
+            # Cuts the start the chunk shares with the end of a chunk it follows, then the end it shares with the
+            # start of a chunk it precedes
+            text = text[_overlap(other_text, text, max_overlap, min_overlap):].strip()
+            cut = _overlap(text, other_text, max_overlap, min_overlap)
+            text = text[:len(text) - cut].strip()
+        return text or None
+
+    def select(self, docs: Sequence[Document], scores: Optional[Sequence[float]] = None) -> List[Tuple[Document, str]]:
+        """
+        Chooses the documents of the context and the part of each that is kept.
+
+        Args:
+            docs (Sequence[Document]): The retrieved documents, most relevant first unless `scores` is given.
+            scores (Sequence[float], optional): The relevance of every document, higher is better.
+
+        Returns:
+            List[Tuple[Document, str]]: The packed documents and their kept text, most relevant first.
+        """
+        if scores is not None:
+            docs = [doc for _, doc in sorted(zip(scores, docs), key=lambda pair: -pair[0])]
+        packed: List[Tuple[Document, str]] = []
+        packed_shingles: List[Set[Tuple[str, ...]]] = []
+        separator_tokens = count_tokens(SEPARATOR, self.model_name)
+        used = 0
+        for doc in docs:
+            # Compared untrimmed, so cutting an overlap does not hide a near-duplicate
+            shingles = _shingles(doc.page_content)
+            if self._is_near_duplicate(shingles, packed_shingles):
+                continue
+            text = self._trim_overlap(doc, packed)
+            if text is None:
+                continue
+            remaining = self.max_tokens - used - (separator_tokens if packed else 0)
+            tokens = count_tokens(text, self.model_name)
+            if tokens > remaining:
+                if remaining >= self.min_chunk_tokens:
+                    text = truncate_to_tokens(text, remaining, self.model_name)
+                    packed.append((doc, text))
+                break
+            packed.append((doc, text))
+            packed_shingles.append(shingles)
+            used += tokens + (separator_tokens if len(packed) > 1 else 0)
+        return packed
+
+    def pack(self, docs: Sequence[Document], scores: Optional[Sequence[float]] = None) -> str:
+        """
+        Packs documents into the context returned to the agent.
+
+        Args:
+            docs (Sequence[Document]): The retrieved documents, most relevant first unless `scores` is given.
+            scores (Sequence[float], optional): The relevance of every document, higher is better.
+
+        Returns:
+            str: The kept texts, most relevant first, separated by blank lines.
+        """
+        return SEPARATOR.join(text for _, text in self.select(docs, scores))
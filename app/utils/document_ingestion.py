@@ -0,0 +1,245 @@
+import os
+import time
+import hashlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Callable, Dict, List, Optional, Set, Tuple
+from pypdf import PdfReader
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+from .tabular_ingestion import file_sha256
+from .embedding_executor import EmbeddingExecutor
+
+SUPPORTED_EXTENSIONS = (".pdf", ".txt", ".md")
+
+
+def load_pages(file_path: str) -> List[str]:
+    """
+    Reads the text of a document, page by page.
+
+    Args:
+        file_path (str): The path of a PDF, text or markdown file.
+
+    Returns:
+        List[str]: The text of every page of a PDF, or the whole text of a text file as a single page.
+
+    Raises:
+        ValueError: If the file type is not supported.
+    """
+    file_extension = os.path.splitext(file_path)[1].lower()
+    if file_extension == ".pdf":
+        return [page.extract_text() or "" for page in PdfReader(file_path).pages]
+    if file_extension in (".txt", ".md"):
+        with open(file_path, encoding="utf-8", errors="replace") as f:
+            return [f.read()]
+    raise ValueError(f"Unsupported file type {file_extension} of {os.path.basename(file_path)}, "
+                     f"expected one of {', '.join(SUPPORTED_EXTENSIONS)}.")
+
+
+def chunk_pages(pages: List[str], chunk_size: int, chunk_overlap: int) -> List[Tuple[str, int]]:
+    """
+    Splits pages into overlapping chunks of at most `chunk_size` characters, never across pages.
+
+    Args:
+        pages (List[str]): The text of every page.
+        chunk_size (int): The maximum number of characters of a chunk.
+        chunk_overlap (int): The number of characters shared by consecutive chunks.
+
+    Returns:
+        List[Tuple[str, int]]: Every chunk with the index of its page.
+    """
+    splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    return [(chunk, page) for page, text in enumerate(pages) for chunk in splitter.split_text(text)]
+
+
+def _parse_file(file_path: str, chunk_size: int, chunk_overlap: int) -> Dict:
+    """Loads and chunks one file. Runs in a worker process when parsing in parallel."""
+    start = time.perf_counter()
+    pages = load_pages(file_path)
+    chunks = chunk_pages(pages, chunk_size, chunk_overlap)
+    return {"file_path": file_path, "pages": len(pages), "chunks": chunks,
+            "parse_seconds": time.perf_counter() - start}
+
+
+class DocumentIngestor:
+    """
+    Loads PDF and text files into a Chroma collection, only reprocessing the files whose content changed.
+
+    Every chunk is stored with the name and the SHA-256 of its file in its metadata, so the collection itself
+    records which version of each file it holds: files whose hash is already indexed are skipped, and files no
+    longer in the directory are removed. The PDFs to (re)index are loaded and chunked in a process pool (text
+    extraction is CPU-bound), then the chunks are embedded in concurrent, rate-limited batches by the embedding
+    executor and upserted batch by batch, with a checkpoint so an interrupted run resumes where it stopped. The
+    chunks of the previous version of a file are only deleted once the new version is fully stored, so lookups
+    never see a file disappear during re-ingestion.
+
+    Attributes:
+        collection: The Chroma collection to write to.
+        executor (EmbeddingExecutor): Embeds the chunks in batches.
+        embed_fn (Callable): Embeds one batch, e.g. the cached embedding model wrapping the executor.
+        chunk_size (int): The maximum number of characters of a chunk.
+        chunk_overlap (int): The number of characters shared by consecutive chunks.
+        workers (int): The number of parser processes. 1 parses in the calling process.
+        checkpoint_dir (str): The directory of the embedding checkpoints, if any.
+    """
+
+    def __init__(self, collection, executor: EmbeddingExecutor,
+                 embed_fn: Optional[Callable[[List[str]], List[List[float]]]] = None, chunk_size: int = 500,
+                 chunk_overlap: int = 100, workers: int = 1, checkpoint_dir: Optional[str] = None) -> None:
+        """
+        Initializes the ingestor.
+
+        Args:
+            collection: The Chroma collection to write to.
+            executor (EmbeddingExecutor): Embeds the chunks in batches.
+            embed_fn (Callable, optional): Embeds one batch. Defaults to a rate-limited call of the executor's model.
+            chunk_size (int): The maximum number of characters of a chunk.
+            chunk_overlap (int): The number of characters shared by consecutive chunks.
+            workers (int): The number of parser processes. 1 parses in the calling process, 0 uses one process per
+                CPU core.
+            checkpoint_dir (str, optional): The directory of the embedding checkpoints.
+        """
+        self.collection = collection
+        self.executor = executor
+        self.embed_fn = embed_fn
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        self.checkpoint_dir = checkpoint_dir
+
+    def indexed_files(self, page_size: int = 5000) -> Dict[str, Set[str]]:
+        """
+        Returns the versions of every file held by the collection.
+
+        Returns:
+            dict: Maps a file name to the SHA-256 of its versions found in the collection; more than one means an
+            earlier run was interrupted before removing the previous version.
+        """
+        versions: Dict[str, Set[str]] = {}
+        for offset in range(0, self.collection.count(), page_size):
+            page = self.collection.get(include=["metadatas"], limit=page_size, offset=offset)
+            for metadata in page["metadatas"]:
+                metadata = metadata or {}
+                versions.setdefault(metadata.get("source"), set()).add(metadata.get("sha256"))
+        return versions
+
+    def parse_files(self, file_paths: List[str]) -> List[Dict]:
+        """
+        Loads and chunks files, extracting the text of PDFs in a process pool when there are several of them.
+
+        Args:
+            file_paths (List[str]): The paths of the files.
+
+        Returns:
+            List[dict]: For every file, its `file_path`, number of `pages`, `chunks` and `parse_seconds`.
+
+        Raises:
+            RuntimeError: If some files could not be parsed.
+        """
+        results, errors = {}, {}
+        # Text files are read in microseconds; only PDF extraction is worth a worker process
+        pdf_paths = [file_path for file_path in file_paths if file_path.lower().endswith(".pdf")]
+        if self.workers == 1 or len(pdf_paths) <= 1:
+            pdf_paths = []
+        for file_path in file_paths:
+            if file_path in pdf_paths:
+                continue
+            try:
+                results[file_path] = _parse_file(file_path, self.chunk_size, self.chunk_overlap)
+            except Exception as e:
+                errors[file_path] = str(e)
+        if pdf_paths:
+            # Spawned rather than forked, so parsers do not inherit locks held by the server's threads
+            with ProcessPoolExecutor(max_workers=min(self.workers, len(pdf_paths)),
+                                     mp_context=multiprocessing.get_context("spawn")) as pool:
+                futures = {pool.submit(_parse_file, file_path, self.chunk_size, self.chunk_overlap): file_path
+                           for file_path in pdf_paths}
+                for future in as_completed(futures):
+                    try:
+                        results[futures[future]] = future.result()
+                    except Exception as e:
+                        errors[futures[future]] = str(e)
+        if errors:
+            raise RuntimeError("Some files could not be parsed: " + "; ".join(
+                f"{os.path.basename(file_path)}: {message}" for file_path, message in errors.items()))
+        return [results[file_path] for file_path in file_paths]
+
+    def sync_directory(self, docs_dir: str, prune: bool = True) -> Dict:
+        """
+        Brings the collection in line with the PDF and text files of a directory.
+
+        Args:
+            docs_dir (str): The directory of the documents.
+            prune (bool): Whether to remove the chunks of files no longer in the directory.
+
+        Returns:
+            dict: The file names that were `loaded`, `skipped` and `removed`, and the run statistics (`pages`,
+            `chunks`, `parse_seconds`, `embed_seconds`, `seconds`).
+        """
+        start = time.perf_counter()
+        file_paths = sorted(os.path.join(docs_dir, file) for file in os.listdir(docs_dir)
+                            if file.lower().endswith(SUPPORTED_EXTENSIONS))
+        indexed = self.indexed_files()
+        hashes = {file_path: file_sha256(file_path) for file_path in file_paths}
+        changed = [file_path for file_path in file_paths
+                   if indexed.get(os.path.basename(file_path)) != {hashes[file_path]}]
+        skipped = [os.path.basename(file_path) for file_path in file_paths if file_path not in changed]
+
+        parse_start = time.perf_counter()
+        parsed = self.parse_files(changed)
+        parse_seconds = time.perf_counter() - parse_start
+
+        texts, metadatas, ids = [], [], []
+        for result in parsed:
+            source, sha256 = os.path.basename(result["file_path"]), hashes[result["file_path"]]
+            for n, (chunk, page) in enumerate(result["chunks"]):
+                texts.append(chunk)
+                metadatas.append({"source": source, "page": page, "sha256": sha256})
+                ids.append(hashlib.sha256(f"{source}\x00{sha256}\x00{n}".encode("utf-8")).hexdigest())
+            if not result["chunks"]:
+                print(f"{source} has no extractable text (e.g. a scanned PDF) and was not indexed.")
+
+        def upsert_batch(batch, embeddings):
+            self.collection.upsert(ids=[ids[i] for i in batch], documents=[texts[i] for i in batch],
+                                   metadatas=[metadatas[i] for i in batch], embeddings=embeddings)
+
+        embed_start = time.perf_counter()
+        if texts:
+            checkpoint_path = None
+            if self.checkpoint_dir:
+                checkpoint_path = os.path.join(self.checkpoint_dir, f"{self.collection.name}-documents.json")
+            self.executor.embed_in_batches(texts, on_batch=upsert_batch, checkpoint_path=checkpoint_path,
+                                           embed_fn=self.embed_fn)
+        embed_seconds = time.perf_counter() - embed_start
+
+        loaded = []
+        for file_path in changed:
+            source = os.path.basename(file_path)
+            # The new version is fully stored; drop the chunks of the previous one
+            self.collection.delete(where={"$and": [{"source": source}, {"sha256": {"$ne": hashes[file_path]}}]})
+            loaded.append(source)
+        removed = []
+        if prune:
+            wanted = {os.path.basename(file_path) for file_path in file_paths}
+            for source in sorted(source for source in indexed if source not in wanted):
+                self.collection.delete(where={"source": source})
+                removed.append(source)
+
+        stats = {"loaded": loaded, "skipped": skipped, "removed": removed,
+                 "pages": sum(result["pages"] for result in parsed), "chunks": len(texts),
+                 "parse_seconds": parse_seconds, "embed_seconds": embed_seconds,
+                 "seconds": time.perf_counter() - start}
+        self.report(stats)
+        return stats
+
+    @staticmethod
+    def report(stats: Dict) -> None:
+        """Prints what was (re)indexed and the pages/sec and chunks/sec of the run."""
+        pages_rate = stats["pages"] / stats["parse_seconds"] if stats["parse_seconds"] else 0
+        chunks_rate = stats["chunks"] / stats["embed_seconds"] if stats["embed_seconds"] else 0
+        print("==============================")
+        print(f"Indexed {len(stats['loaded'])} new or changed files, skipped {len(stats['skipped'])} unchanged "
+              f"files, removed {len(stats['removed'])} deleted files"
+              f"{': ' + ', '.join(stats['removed']) if stats['removed'] else ''}.")
+        print(f"Parsed {stats['pages']} pages in {stats['parse_seconds']:.2f}s ({pages_rate:,.1f} pages/sec), "
+              f"embedded and stored {stats['chunks']} chunks in {stats['embed_seconds']:.2f}s "
+              f"({chunks_rate:,.1f} chunks/sec). Total: {stats['seconds']:.2f}s")
@@ -0,0 +1,277 @@
+import re
+import hashlib
+import threading
+from functools import lru_cache
+from typing import Callable, Dict, List, Tuple
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+EMBEDDING_PROVIDERS = ("openai", "onnx", "sentence_transformers", "hashing")
+
+# Local providers have no rate limits and are CPU-bound (the runtimes already use every core for one batch), so
+# their executor runs one batch at a time without budgets or retries.
+LOCAL_EXECUTOR_CONFIGS = {"max_concurrency": 1, "requests_per_minute": 0, "tokens_per_minute": 0, "max_retries": 0}
+
+
+class HashingEmbeddings(Embeddings):
+    """
+    Embeds texts in-process with the hashing trick: no model, no download and no network.
+
+    Every lowercased word and pair of adjacent words is hashed to one of `dimensions` signed buckets, weighted by
+    `1 + log(count)`, and the vector is L2-normalized, so the cosine similarity of two texts measures their shared
+    vocabulary. It does not capture synonyms like a neural model does, but it embeds thousands of texts per second
+    and is deterministic, which suits offline tests and keyword-heavy collections.
+
+    Attributes:
+        dimensions (int): The size of the vectors.
+    """
+
+    TOKEN_PATTERN = re.compile(r"\w+")
+
+    def __init__(self, dimensions: int = 384) -> None:
+        """
+        Initializes the vectorizer.
+
+        Args:
+            dimensions (int): The size of the vectors.
+        """
+        self.dimensions = dimensions
+        self._bucket = lru_cache(maxsize=100000)(self._hash)
+
+    def _hash(self, feature: str) -> Tuple[int, float]:
+        """Returns the bucket and the sign of a feature."""
+        value = int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "little")
+        return value % self.dimensions, 1.0 if value >> 63 else -1.0
+
+    def _features(self, text: str) -> Dict[str, int]:
+        """Counts the words and word pairs of a text."""
+        words = self.TOKEN_PATTERN.findall(text.lower())
+        counts: Dict[str, int] = {}
+        for feature in words + [f"{a} {b}" for a, b in zip(words, words[1:])]:
+            counts[feature] = counts.get(feature, 0) + 1
+        return counts
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embeds a list of documents.
+
+        Args:
+            texts (List[str]): The texts to embed.
+
+        Returns:
+            List[List[float]]: One vector per text, in the input order.
+        """
+        matrix = np.zeros((len(texts), self.dimensions), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature, count in self._features(text).items():
+                bucket, sign = self._bucket(feature)
+                matrix[row, bucket] += sign * (1.0 + np.log(count))
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        return (matrix / np.where(norms == 0, 1, norms)).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        """
+        Embeds a query.
+
+        Args:
+            text (str): The query to embed.
+
+        Returns:
+            List[float]: The query vector.
+        """
+        return self.embed_documents([text])[0]
+
+
+class ONNXEmbeddings(Embeddings):
+    """
+    Embeds texts in-process on the CPU with the ONNX export of all-MiniLM-L6-v2 that ships with Chroma.
+
+    Uses `onnxruntime` and `tokenizers`, which are already installed with chromadb. The model (about 80 MB) is
+    downloaded to `~/.cache/chroma/onnx_models` on first use and produces normalized 384-dimensional vectors. The
+    inference session is thread-safe; only its lazy initialization is guarded by a lock.
+
+    Attributes:
+        model_name (str): The name of the model.
+        batch_size (int): The number of texts per forward pass.
+    """
+
+    MODEL_NAME = "all-MiniLM-L6-v2"
+
+    def __init__(self, model_name: str = MODEL_NAME, batch_size: int = 32) -> None:
+        """
+        Initializes the backend without loading the model.
+
+        Args:
+            model_name (str): The name of the model. Only all-MiniLM-L6-v2 is available as ONNX through Chroma.
+            batch_size (int): The number of texts per forward pass.
+        """
+        if model_name != self.MODEL_NAME:
+            raise ValueError(f"The onnx embedding provider only supports {self.MODEL_NAME}, not {model_name}. "
+                             f"Use the sentence_transformers provider for other models.")
+        from chromadb.utils.embedding_functions import ONNXMiniLM_L6_V2
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self._model = ONNXMiniLM_L6_V2()
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def _embed(self, texts: List[str]) -> List[List[float]]:
+        """Runs one batch through the model, downloading and loading it on first use."""
+        if not self._loaded:
+            with self._lock:
+                vectors = self._model(texts)
+                self._loaded = True
+                return vectors
+        return self._model(texts)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embeds a list of documents in batches of `batch_size`.
+
+        Args:
+            texts (List[str]): The texts to embed.
+
+        Returns:
+            List[List[float]]: One vector per text, in the input order.
+        """
+        vectors = []
+        for start in range(0, len(texts), self.batch_size):
+            vectors.extend(self._embed(texts[start:start + self.batch_size]))
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        """
+        Embeds a query.
+
+        Args:
+            text (str): The query to embed.
+
+        Returns:
+            List[float]: The query vector.
+        """
+        return self._embed([text])[0]
+
+
+class SentenceTransformerEmbeddings(Embeddings):
+    """
+    Embeds texts in-process on the CPU with a sentence-transformers model.
+
+    `sentence-transformers` is an optional dependency (`pip install sentence-transformers`); it brings PyTorch and
+    can load any model of the Hugging Face hub. Calls are serialized with a lock, since PyTorch already spreads one
+    batch over all cores.
+
+    Attributes:
+        model_name (str): The name of the model.
+        batch_size (int): The number of texts per forward pass.
+    """
+
+    def __init__(self, model_name: str, batch_size: int = 32) -> None:
+        """
+        Loads the model.
+
+        Args:
+            model_name (str): The name of the model on the Hugging Face hub, e.g. "all-MiniLM-L6-v2".
+            batch_size (int): The number of texts per forward pass.
+        """
+        try:
+            from sentence_transformers import SentenceTransformer
+        except ImportError:
+            raise ImportError("The sentence_transformers embedding provider requires the sentence-transformers "
+                              "package. Install it with `pip install sentence-transformers`.")
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self._model = SentenceTransformer(model_name, device="cpu")
+        self._lock = threading.Lock()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embeds a list of documents.
+
+        Args:
+            texts (List[str]): The texts to embed.
+
+        Returns:
+            List[List[float]]: One vector per text, in the input order.
+        """
+        with self._lock:
+            vectors = self._model.encode(texts, batch_size=self.batch_size, normalize_embeddings=True,
+                                         convert_to_numpy=True, show_progress_bar=False)
+        return vectors.tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        """
+        Embeds a query.
+
+        Args:
+            text (str): The query to embed.
+
+        Returns:
+            List[float]: The query vector.
+        """
+        return self.embed_documents([text])[0]
+
+
+def embedding_model_name(provider: str, openai_model: str, local_model: str, dimensions: int) -> str:
+    """
+    Returns the name identifying the vectors of a provider, used to key the embedding cache and executor.
+
+    Args:
+        provider (str): One of `EMBEDDING_PROVIDERS`.
+        openai_model (str): The OpenAI model, used by the openai provider.
+        local_model (str): The model of the onnx and sentence_transformers providers.
+        dimensions (int): The vector size of the hashing provider.
+
+    Returns:
+        str: The model name.
+    """
+    if provider == "openai":
+        return openai_model
+    if provider == "hashing":
+        return f"hashing-{dimensions}"
+    return f"{provider}:{local_model}"
+
+
+_BACKENDS: Dict[Tuple[str, str, int, int], Embeddings] = {}
+_BACKENDS_LOCK = threading.Lock()
+
+
+def create_embedding_backend(provider: str, openai_factory: Callable[[], Embeddings],
+                             local_model: str = "all-MiniLM-L6-v2", dimensions: int = 384,
+                             batch_size: int = 32) -> Embeddings:
+    """
+    Creates the embedding model of a provider. Local models are loaded once per process and shared.
+
+    Args:
+        provider (str): One of `EMBEDDING_PROVIDERS`.
+        openai_factory (Callable[[], Embeddings]): Builds the OpenAI model for the openai provider.
+        local_model (str): The model of the onnx and sentence_transformers providers.
+        dimensions (int): The vector size of the hashing provider.
+        batch_size (int): The number of texts per forward pass of the onnx and sentence_transformers providers.
+
+    Returns:
+        Embeddings: The embedding model.
+    """
+    if provider not in EMBEDDING_PROVIDERS:
+        raise ValueError(f"Unknown embedding provider {provider!r}, expected one of {', '.join(EMBEDDING_PROVIDERS)}")
+    if provider == "openai":
+        return openai_factory()
+    key = (provider, local_model, dimensions, batch_size)
+    with _BACKENDS_LOCK:
+        backend = _BACKENDS.get(key)
+        if backend is None:
+            if provider == "hashing":
+                backend = HashingEmbeddings(dimensions=dimensions)
+            elif provider == "onnx":
+                backend = ONNXEmbeddings(model_name=local_model, batch_size=batch_size)
+            else:
+                backend = SentenceTransformerEmbeddings(model_name=local_model, batch_size=batch_size)
+            _BACKENDS[key] = backend
+        return backend
+
+
+def executor_configs(provider: str, client_configs: Dict) -> Dict:
+    """
+    Returns the `EmbeddingExecutor` arguments of a provider: the configured client limits for the openai provider,
+    and `LOCAL_EXECUTOR_CONFIGS` for the local ones.
+    """
+    return client_configs if provider == "openai" else LOCAL_EXECUTOR_CONFIGS
@@ -0,0 +1,254 @@
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+from array import array
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+from langchain_core.embeddings import Embeddings
+
+
+def normalize_text(text: str) -> str:
+    """Collapses runs of whitespace and strips the text, so trivially different inputs share a cache entry."""
+    return " ".join(text.split())
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    An `Embeddings` wrapper that caches vectors keyed by (model name, normalized text).
+
+    Lookups go through an in-memory LRU tier first and an on-disk SQLite tier second; only texts missing from both
+    are sent to the wrapped model, in a single batch. The SQLite tier survives restarts and is shared by every
+    process pointing at the same file. Both tiers are bounded by entry count and evict the least recently used
+    vectors first.
+
+    Attributes:
+        underlying (Embeddings): The wrapped embedding model.
+        model_name (str): The name of the embedding model, part of every cache key.
+        cache_path (str): The path of the SQLite file of the on-disk tier.
+        memory_max_entries (int): Maximum number of vectors kept in memory.
+        disk_max_entries (int): Maximum number of vectors kept on disk.
+        hits (int): Number of texts answered from the cache.
+        misses (int): Number of texts that had to be embedded by the wrapped model.
+    """
+
+    def __init__(self, underlying: Embeddings, model_name: str, cache_path: str,
+                 memory_max_entries: int = 2048, disk_max_entries: int = 200000) -> None:
+        """
+        Initializes the cache and creates the on-disk tier if needed.
+
+        Args:
+            underlying (Embeddings): The embedding model to wrap.
+            model_name (str): The name of the embedding model, part of every cache key.
+            cache_path (str): The path of the SQLite file of the on-disk tier.
+            memory_max_entries (int): Maximum number of vectors kept in memory.
+            disk_max_entries (int): Maximum number of vectors kept on disk.
+        """
+        self.underlying = underlying
+        self.model_name = model_name
+        self.cache_path = str(cache_path)
+        self.memory_max_entries = memory_max_entries
+        self.disk_max_entries = disk_max_entries
+        self.hits = 0
+        self.misses = 0
+        self._memory: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(self.cache_path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(self.cache_path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "key TEXT PRIMARY KEY, model TEXT NOT NULL, vector BLOB NOT NULL, last_used REAL NOT NULL)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings (last_used)")
+        self._conn.commit()
+        self._disk_entries = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def _key(self, text: str) -> str:
+        """Returns the cache key of a text for this model."""
+        return hashlib.sha256(f"{self.model_name}\x00{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+    def _remember(self, key: str, vector: List[float]) -> None:
+        """Puts a vector in the memory tier, evicting the least recently used entries. Caller holds the lock."""
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_max_entries:
+            self._memory.popitem(last=False)
+
+    def _lookup(self, keys: List[str]) -> Dict[str, List[float]]:
+        """Returns the cached vectors of the given keys, promoting disk hits into the memory tier."""
+        found = {}
+        with self._lock:
+            for key in keys:
+                if key in self._memory:
+                    self._memory.move_to_end(key)
+                    found[key] = self._memory[key]
+            missing = [key for key in set(keys) if key not in found]
+            rows = []
+            # Stay below SQLite's limit on the number of bound parameters
+            for start in range(0, len(missing), 500):
+                batch = missing[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows.extend(self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch).fetchall())
+            if rows:
+                for key, blob in rows:
+                    vector = array("f", blob).tolist()
+                    found[key] = vector
+                    self._remember(key, vector)
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE key = ?",
+                    [(time.time(), key) for key, _ in rows])
+                self._conn.commit()
+        return found
+
+    def _store(self, vectors: Dict[str, List[float]]) -> None:
+        """Writes freshly computed vectors to both tiers and trims the disk tier to its budget."""
+        now = time.time()
+        with self._lock:
+            for key, vector in vectors.items():
+                self._remember(key, vector)
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, model, vector, last_used) VALUES (?, ?, ?, ?)",
+                [(key, self.model_name, array("f", vector).tobytes(), now) for key, vector in vectors.items()])
+            self._disk_entries += len(vectors)
+            if self._disk_entries > self.disk_max_entries:
+                # Evict down to 90% of the budget so eviction does not run on every insert
+                self._conn.execute(
+                    "DELETE FROM embeddings WHERE key IN ("
+                    "SELECT key FROM embeddings ORDER BY last_used LIMIT ?)",
+                    (self._disk_entries - int(self.disk_max_entries * 0.9),))
+                self._disk_entries = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            self._conn.commit()
+
+    def _split(self, texts: List[str]):
+        """Returns the keys of the texts, the cached vectors and the unique texts that still need embedding."""
+        keys = [self._key(text) for text in texts]
+        found = self._lookup(keys)
+        to_embed = {}
+        for key, text in zip(keys, texts):
+            if key not in found and key not in to_embed:
+                to_embed[key] = text
+        n_missing = sum(1 for key in keys if key not in found)
+        with self._lock:
+            self.hits += len(keys) - n_missing
+            self.misses += n_missing
+        return keys, found, to_embed
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embeds a list of documents, only sending the texts that are not cached to the wrapped model.
+
+        Args:
+            texts (List[str]): The texts to embed.
+
+        Returns:
+            List[List[float]]: One vector per text, in the input order.
+        """
+        keys, found, to_embed = self._split(texts)
+        if to_embed:
+            vectors = self.underlying.embed_documents(list(to_embed.values()))
+            computed = dict(zip(to_embed.keys(), vectors))
+            self._store(computed)
+            found.update(computed)
+        return [found[key] for key in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        """
+        Embeds a query, answering from the cache when the same text was embedded before.
+
+        Args:
+            text (str): The query to embed.
+
+        Returns:
+            List[float]: The query vector.
+        """
+        keys, found, to_embed = self._split([text])
+        if to_embed:
+            vector = self.underlying.embed_query(text)
+            self._store({keys[0]: vector})
+            return vector
+        return found[keys[0]]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Asynchronous variant of `embed_documents`."""
+        keys, found, to_embed = self._split(texts)
+        if to_embed:
+            vectors = await self.underlying.aembed_documents(list(to_embed.values()))
+            computed = dict(zip(to_embed.keys(), vectors))
+            self._store(computed)
+            found.update(computed)
+        return [found[key] for key in keys]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        """Asynchronous variant of `embed_query`."""
+        keys, found, to_embed = self._split([text])
+        if to_embed:
+            vector = await self.underlying.aembed_query(text)
+            self._store({keys[0]: vector})
+            return vector
+        return found[keys[0]]
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Returns the cache counters.
+
+        Returns:
+            dict: Hits, misses, hit rate and the number of entries held in each tier.
+        """
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "memory_entries": len(self._memory),
+            "disk_entries": self._disk_entries,
+        }
+
+
+_CACHED_EMBEDDINGS: Dict[str, CachedEmbeddings] = {}
+_CACHED_EMBEDDINGS_LOCK = threading.Lock()
+
+
+def get_cached_embeddings(model_name: str, underlying_factory: Callable[[], Embeddings], cache_path: str,
+                          memory_max_entries: int = 2048,
+                          disk_max_entries: int = 200000) -> CachedEmbeddings:
+    """
+    Returns the process-wide cached embedding model for `model_name`, creating it on first use.
+
+    Every caller using the same model (e.g. both RAG tools) shares one instance, so a query embedded by one tool
+    is a cache hit for the other. All of them must therefore pass the same cache settings.
+
+    Args:
+        model_name (str): The name of the embedding model.
+        underlying_factory (Callable[[], Embeddings]): Builds the wrapped model when the instance is created.
+        cache_path (str): The path of the SQLite file of the on-disk tier.
+        memory_max_entries (int): Maximum number of vectors kept in memory.
+        disk_max_entries (int): Maximum number of vectors kept on disk.
+
+    Returns:
+        CachedEmbeddings: The shared cached embedding model.
+
+    Raises:
+        ValueError: If the instance of the model was created with other cache settings, which would otherwise be
+            silently ignored.
+    """
+    cache_path = os.path.abspath(str(cache_path))
+    with _CACHED_EMBEDDINGS_LOCK:
+        embeddings: Optional[CachedEmbeddings] = _CACHED_EMBEDDINGS.get(model_name)
+        if embeddings is not None:
+            created = (embeddings.cache_path, embeddings.memory_max_entries, embeddings.disk_max_entries)
+            if created != (cache_path, memory_max_entries, disk_max_entries):
+                raise ValueError(
+                    f"The cached embeddings of '{model_name}' were created with the cache settings {created}, not "
+                    f"{(cache_path, memory_max_entries, disk_max_entries)}; configure the cache in one place "
+                    f"(embedding_cache in app_config.yml).")
+        else:
+            embeddings = CachedEmbeddings(
+                underlying=underlying_factory(),
+                model_name=model_name,
+                cache_path=cache_path,
+                memory_max_entries=memory_max_entries,
+                disk_max_entries=disk_max_entries)
+            _CACHED_EMBEDDINGS[model_name] = embeddings
+        return embeddings
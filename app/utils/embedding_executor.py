@@ -0,0 +1,383 @@
+import os
+import json
+import time
+import random
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, List, Optional
+from langchain_core.embeddings import Embeddings
+from .token_counting import batch_by_tokens, count_tokens
+
+
+class RateLimiter:
+    """
+    A token-bucket limiter for a requests-per-minute and a tokens-per-minute budget, shared by all threads.
+
+    Both buckets start full and refill continuously; a budget of 0 is unlimited. After a 429 response every caller
+    is paused until the server's retry delay has passed, instead of each thread discovering the limit on its own.
+
+    Attributes:
+        requests_per_minute (int): The request budget, 0 for no limit.
+        tokens_per_minute (int): The token budget, 0 for no limit.
+    """
+
+    def __init__(self, requests_per_minute: int, tokens_per_minute: int) -> None:
+        """
+        Initializes full buckets.
+
+        Args:
+            requests_per_minute (int): The request budget, 0 for no limit.
+            tokens_per_minute (int): The token budget, 0 for no limit.
+        """
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self._requests = float(requests_per_minute)
+        self._tokens = float(tokens_per_minute)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        """Adds the budget accumulated since the last update. Caller holds the lock."""
+        elapsed = now - self._updated
+        self._requests = min(self.requests_per_minute, self._requests + elapsed * self.requests_per_minute / 60)
+        self._tokens = min(self.tokens_per_minute, self._tokens + elapsed * self.tokens_per_minute / 60)
+        self._updated = now
+
+    def acquire(self, tokens: int) -> None:
+        """
+        Blocks until a request of `tokens` tokens fits in the budget, then consumes it.
+
+        Args:
+            tokens (int): The number of tokens of the request. Requests above the per-minute budget wait for a
+                full bucket.
+        """
+        if self.requests_per_minute <= 0 and self.tokens_per_minute <= 0:
+            return
+        tokens = min(tokens, self.tokens_per_minute) if self.tokens_per_minute > 0 else 0
+        requests = 1 if self.requests_per_minute > 0 else 0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                wait = self._paused_until - now
+                if wait <= 0:
+                    if self._requests >= requests and self._tokens >= tokens:
+                        self._requests -= requests
+                        self._tokens -= tokens
+                        return
+                    wait = max((requests - self._requests) * 60 / max(self.requests_per_minute, 1),
+                               (tokens - self._tokens) * 60 / max(self.tokens_per_minute, 1))
+            time.sleep(max(wait, 0.01))
+
+    def pause(self, seconds: float) -> None:
+        """Stops every caller from starting requests for `seconds`, e.g. after a 429 response."""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+
+class EmbeddingMetrics:
+    """
+    Thread-safe counters of an embedding client, for the life of the process. The metrics of one run are the
+    difference between a snapshot taken before it and the counters after it (see `since`).
+
+    Attributes:
+        requests (int): Successful requests.
+        texts (int): Texts embedded.
+        tokens (int): Tokens embedded (estimated where tiktoken is unavailable).
+        retries (int): Requests retried after a transient error.
+        rate_limited (int): Responses with status 429.
+        failures (int): Requests that failed after all retries.
+    """
+
+    COUNTERS = ("requests", "texts", "tokens", "retries", "rate_limited", "failures")
+
+    def __init__(self) -> None:
+        """Initializes all counters to zero."""
+        self.requests = 0
+        self.texts = 0
+        self.tokens = 0
+        self.retries = 0
+        self.rate_limited = 0
+        self.failures = 0
+        self._started: Optional[float] = None
+        self._last: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def record(self, **counts: int) -> None:
+        """Adds to one or more counters, e.g. `record(requests=1, texts=32)`."""
+        with self._lock:
+            now = time.monotonic()
+            self._started = self._started or now
+            self._last = now
+            for name, value in counts.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    def snapshot(self) -> Dict[str, float]:
+        """
+        Returns the counters and the throughput between the first and the last recorded event.
+
+        Returns:
+            dict: The counters plus `seconds`, `texts_per_second` and `tokens_per_second`.
+        """
+        with self._lock:
+            seconds = (self._last - self._started) if self._started is not None else 0.0
+            return {
+                "requests": self.requests, "texts": self.texts, "tokens": self.tokens, "retries": self.retries,
+                "rate_limited": self.rate_limited, "failures": self.failures, "seconds": seconds,
+                "texts_per_second": self.texts / seconds if seconds else 0.0,
+                "tokens_per_second": self.tokens / seconds if seconds else 0.0,
+            }
+
+    def since(self, before: Dict[str, float], seconds: float) -> Dict[str, float]:
+        """
+        Returns the counters added since an earlier `snapshot` and the throughput over the given duration, e.g. the
+        metrics of one ingestion run in a long-running server.
+
+        Args:
+            before (dict): A snapshot taken at the start of the run.
+            seconds (float): The duration of the run.
+
+        Returns:
+            dict: The counters of the run plus `seconds`, `texts_per_second` and `tokens_per_second`.
+        """
+        now = self.snapshot()
+        metrics: Dict[str, float] = {name: now[name] - before[name] for name in self.COUNTERS}
+        metrics.update(seconds=seconds,
+                       texts_per_second=metrics["texts"] / seconds if seconds else 0.0,
+                       tokens_per_second=metrics["tokens"] / seconds if seconds else 0.0)
+        return metrics
+
+
+def _status_code(error: Exception) -> Optional[int]:
+    """Returns the HTTP status of an API error, if it has one."""
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return status
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    """Returns the delay requested by the server in a `Retry-After` header, if any."""
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+class EmbeddingExecutor(Embeddings):
+    """
+    An `Embeddings` wrapper that calls the wrapped model within a rate budget, with retries and concurrency.
+
+    Every request first takes its share of the requests-per-minute and tokens-per-minute budgets. Rate limit
+    responses (429) pause all requests for the server's `Retry-After` delay, or an exponential backoff with full
+    jitter, and are retried like server errors and connection errors, up to `max_retries` times. `embed_documents`
+    splits its input into batches bounded by count and tokens and sends up to `max_concurrency` of them at a time.
+
+    For long ingestion runs, `embed_in_batches` hands every batch to a callback as soon as it is embedded and
+    records it in a checkpoint file, so a run interrupted by a crash resumes with the batches that were not
+    stored yet.
+
+    Attributes:
+        underlying (Embeddings): The wrapped embedding model.
+        model_name (str): The name of the model, used to count tokens.
+        max_concurrency (int): The maximum number of requests in flight.
+        batch_size (int): The maximum number of texts per request.
+        max_batch_tokens (int): The maximum number of tokens per request.
+        max_retries (int): The number of retries of a failed request.
+        base_delay (float): The backoff delay in seconds of the first retry, doubled at every retry.
+        max_delay (float): The maximum backoff delay in seconds.
+        limiter (RateLimiter): The shared request and token budget.
+        metrics (EmbeddingMetrics): The counters of the client.
+    """
+
+    RETRYABLE_ERRORS = ("APIConnectionError", "APITimeoutError", "Timeout", "ConnectionError", "ReadTimeout")
+
+    def __init__(self, underlying: Embeddings, model_name: str, max_concurrency: int = 4,
+                 requests_per_minute: int = 3000, tokens_per_minute: int = 1000000, batch_size: int = 512,
+                 max_batch_tokens: int = 200000, max_retries: int = 6, base_delay: float = 1.0,
+                 max_delay: float = 60.0) -> None:
+        """
+        Initializes the executor.
+
+        Args:
+            underlying (Embeddings): The embedding model to wrap. Its own retries should be disabled.
+            model_name (str): The name of the model, used to count tokens.
+            max_concurrency (int): The maximum number of requests in flight.
+            requests_per_minute (int): The request budget, 0 for no limit.
+            tokens_per_minute (int): The token budget, 0 for no limit.
+            batch_size (int): The maximum number of texts per request.
+            max_batch_tokens (int): The maximum number of tokens per request.
+            max_retries (int): The number of retries of a failed request.
+            base_delay (float): The backoff delay in seconds of the first retry, doubled at every retry.
+            max_delay (float): The maximum backoff delay in seconds.
+        """
+        self.underlying = underlying
+        self.model_name = model_name
+        self.max_concurrency = max(1, max_concurrency)
+        self.batch_size = batch_size
+        self.max_batch_tokens = max_batch_tokens
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.limiter = RateLimiter(requests_per_minute, tokens_per_minute)
+        self.metrics = EmbeddingMetrics()
+
+    def _count_tokens(self, text: str) -> int:
+        """Counts the tokens of a text for the wrapped model."""
+        return count_tokens(text, self.model_name)
+
+    def _is_retryable(self, error: Exception) -> bool:
+        """Tells whether a failed request may succeed when retried."""
+        status = _status_code(error)
+        if status is not None:
+            return status == 429 or status >= 500
+        return type(error).__name__ in self.RETRYABLE_ERRORS
+
+    def _call(self, fn: Callable[[List[str]], List[List[float]]], texts: List[str]) -> List[List[float]]:
+        """Sends one request within the budget, retrying transient errors with jittered exponential backoff."""
+        tokens = sum(self._count_tokens(text) for text in texts)
+        for attempt in range(self.max_retries + 1):
+            self.limiter.acquire(tokens)
+            try:
+                vectors = fn(texts)
+            except Exception as e:
+                if attempt == self.max_retries or not self._is_retryable(e):
+                    self.metrics.record(failures=1)
+                    raise
+                delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+                if _status_code(e) == 429:
+                    self.metrics.record(rate_limited=1)
+                    delay = _retry_after(e) or delay
+                    self.limiter.pause(delay)
+                self.metrics.record(retries=1)
+                time.sleep(delay)
+                continue
+            self.metrics.record(requests=1, texts=len(texts), tokens=tokens)
+            return vectors
+
+    def _batches(self, texts: List[str]) -> List[List[int]]:
+        """Splits texts into request-sized batches of indexes."""
+        return list(batch_by_tokens(texts, max_batch_size=self.batch_size, max_batch_tokens=self.max_batch_tokens,
+                                    token_counter=self._count_tokens))
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embeds documents with concurrent, rate-limited requests.
+
+        Args:
+            texts (List[str]): The texts to embed.
+
+        Returns:
+            List[List[float]]: One vector per text, in the input order.
+        """
+        batches = self._batches(texts)
+        if len(batches) <= 1:
+            return self._call(self.underlying.embed_documents, texts) if texts else []
+        vectors: List[Optional[List[float]]] = [None] * len(texts)
+        with ThreadPoolExecutor(max_workers=min(self.max_concurrency, len(batches))) as pool:
+            futures = {pool.submit(self._call, self.underlying.embed_documents, [texts[i] for i in batch]): batch
+                       for batch in batches}
+            for future in as_completed(futures):
+                for i, vector in zip(futures[future], future.result()):
+                    vectors[i] = vector
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        """
+        Embeds a query within the budget, with retries.
+
+        Args:
+            text (str): The query to embed.
+
+        Returns:
+            List[float]: The query vector.
+        """
+        return self._call(lambda texts: [self.underlying.embed_query(texts[0])], [text])[0]
+
+    def embed_in_batches(self, texts: List[str], on_batch: Callable[[List[int], List[List[float]]], None],
+                         checkpoint_path: Optional[str] = None,
+                         embed_fn: Optional[Callable[[List[str]], List[List[float]]]] = None) -> Dict[str, float]:
+        """
+        Embeds a large list of texts, handing each batch to `on_batch` as soon as it is ready.
+
+        Batches are embedded concurrently, but `on_batch` is always called from the calling thread, so it can write
+        to a store that is not thread-safe. With a checkpoint file, batches already handed to `on_batch` by an
+        earlier, interrupted run with the same texts are skipped; the file is removed once every batch is done.
+
+        Args:
+            texts (List[str]): The texts to embed.
+            on_batch (Callable): Receives the indexes into `texts` of a batch and their vectors, and stores them.
+            checkpoint_path (str, optional): The JSON file recording the batches already stored.
+            embed_fn (Callable, optional): Embeds one batch, e.g. a cached model wrapping this executor. Defaults to
+                a rate-limited call of the wrapped model.
+
+        Returns:
+            dict: The metrics of this run alone (see `EmbeddingMetrics.since`).
+        """
+        before = self.metrics.snapshot()
+        start = time.monotonic()
+        embed_fn = embed_fn or (lambda batch_texts: self._call(self.underlying.embed_documents, batch_texts))
+        batches = self._batches(texts)
+        fingerprints = [hashlib.sha256("\x00".join(texts[i] for i in batch).encode("utf-8")).hexdigest()
+                        for batch in batches]
+        done = set()
+        if checkpoint_path and os.path.exists(checkpoint_path):
+            with open(checkpoint_path) as f:
+                done = set(json.load(f).get("done", []))
+            print(f"Resuming from {checkpoint_path}: {len(done & set(fingerprints))}/{len(batches)} batches done")
+        pending = [(batch, fingerprint) for batch, fingerprint in zip(batches, fingerprints)
+                   if fingerprint not in done]
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as pool:
+            futures = {pool.submit(embed_fn, [texts[i] for i in batch]): (batch, fingerprint)
+                       for batch, fingerprint in pending}
+            for future in as_completed(futures):
+                batch, fingerprint = futures[future]
+                on_batch(batch, future.result())
+                if checkpoint_path:
+                    done.add(fingerprint)
+                    os.makedirs(os.path.dirname(checkpoint_path) or ".", exist_ok=True)
+                    with open(f"{checkpoint_path}.tmp", "w") as f:
+                        json.dump({"done": sorted(done)}, f)
+                    os.replace(f"{checkpoint_path}.tmp", checkpoint_path)
+        if checkpoint_path and os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)
+        return self.metrics.since(before, time.monotonic() - start)
+
+
+_EXECUTORS: Dict[str, EmbeddingExecutor] = {}
+_EXECUTOR_CONFIGS: Dict[str, Dict] = {}
+_EXECUTORS_LOCK = threading.Lock()
+
+
+def get_embedding_executor(model_name: str, underlying_factory: Callable[[], Embeddings],
+                           **kwargs) -> EmbeddingExecutor:
+    """
+    Returns the process-wide executor of `model_name`, creating it on first use, so every caller of a model
+    shares one rate budget.
+
+    Args:
+        model_name (str): The name of the embedding model.
+        underlying_factory (Callable[[], Embeddings]): Builds the wrapped model when the executor is created.
+        **kwargs: The other arguments of `EmbeddingExecutor`, which every caller of a model must pass alike.
+
+    Returns:
+        EmbeddingExecutor: The shared executor.
+
+    Raises:
+        ValueError: If the executor of the model was created with other arguments, which would otherwise be
+            silently ignored.
+    """
+    with _EXECUTORS_LOCK:
+        executor = _EXECUTORS.get(model_name)
+        if executor is None:
+            executor = EmbeddingExecutor(underlying=underlying_factory(), model_name=model_name, **kwargs)
+            _EXECUTORS[model_name] = executor
+            _EXECUTOR_CONFIGS[model_name] = dict(kwargs)
+        elif _EXECUTOR_CONFIGS[model_name] != kwargs:
+            raise ValueError(
+                f"The embedding executor of '{model_name}' was created with {_EXECUTOR_CONFIGS[model_name]}, not "
+                f"{kwargs}; configure the model in one place (embedding_client in app_config.yml).")
+        return executor
@@ -0,0 +1,130 @@
+"""
+A local stand-in for the OpenAI embeddings endpoint, to exercise the embedding pipeline offline.
+
+It answers `POST /v1/embeddings` with deterministic unit vectors derived from a hash of each input, enforces its own
+requests-per-minute limit with 429 responses and a `Retry-After` header, and can add latency and random server
+errors. Point the app at it with `embedding_client.base_url: http://localhost:8089/v1` in the configs (any API key
+is accepted).
+
+Usage:
+    python -m app.utils.fake_embedding_server --port 8089 --rpm 600 --latency 0.05 --failure-rate 0.01
+"""
+import json
+import time
+import base64
+import random
+import hashlib
+import argparse
+import threading
+from array import array
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List
+
+
+def fake_embedding(text: str, dimensions: int) -> List[float]:
+    """Returns a deterministic unit vector for a text: identical texts always get identical vectors."""
+    rng = random.Random(hashlib.sha256(text.encode("utf-8")).digest())
+    vector = [rng.gauss(0, 1) for _ in range(dimensions)]
+    norm = sum(value * value for value in vector) ** 0.5
+    return [value / norm for value in vector]
+
+
+class FakeEmbeddingHandler(BaseHTTPRequestHandler):
+    """Serves OpenAI-compatible embedding requests with the settings of the server."""
+
+    def log_message(self, format, *args) -> None:
+        """Silences the per-request access log."""
+
+    def _reply(self, status: int, body: dict, headers: dict = None) -> None:
+        """Sends a JSON response."""
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _rate_limited(self) -> float:
+        """Records the request and returns how long the client must wait if it is over the limit, else 0."""
+        server = self.server
+        with server.lock:
+            now = time.monotonic()
+            while server.recent and now - server.recent[0] > 60:
+                server.recent.popleft()
+            if len(server.recent) >= server.rpm:
+                return 60 - (now - server.recent[0])
+            server.recent.append(now)
+            return 0.0
+
+    def do_POST(self) -> None:
+        """Handles `POST /v1/embeddings`."""
+        if not self.path.rstrip("/").endswith("/embeddings"):
+            self._reply(404, {"error": {"message": f"Unknown path {self.path}"}})
+            return
+        request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        wait = self._rate_limited()
+        if wait > 0:
+            self._reply(429, {"error": {"message": "Rate limit reached", "type": "requests"}},
+                        headers={"Retry-After": f"{wait:.2f}"})
+            return
+        time.sleep(self.server.latency)
+        if random.random() < self.server.failure_rate:
+            self._reply(500, {"error": {"message": "Injected server error"}})
+            return
+        inputs = request.get("input", [])
+        # Accepts a string, a list of strings, a list of token ids or a list of token id lists, like the real API
+        if isinstance(inputs, str) or (inputs and isinstance(inputs[0], int)):
+            inputs = [inputs]
+        dimensions = int(request.get("dimensions") or self.server.dimensions)
+        data = []
+        for i, item in enumerate(inputs):
+            vector = fake_embedding(item if isinstance(item, str) else json.dumps(item), dimensions)
+            if request.get("encoding_format") == "base64":
+                vector = base64.b64encode(array("f", vector).tobytes()).decode("ascii")
+            data.append({"object": "embedding", "index": i, "embedding": vector})
+        tokens = sum(len(item) if isinstance(item, list) else len(item) // 4 + 1 for item in inputs)
+        self._reply(200, {"object": "list", "data": data, "model": request.get("model", "fake"),
+                          "usage": {"prompt_tokens": tokens, "total_tokens": tokens}})
+
+
+def create_server(host: str = "127.0.0.1", port: int = 8089, dimensions: int = 1536, rpm: int = 3000,
+                  latency: float = 0.0, failure_rate: float = 0.0) -> ThreadingHTTPServer:
+    """
+    Creates the fake embedding server without starting it.
+
+    Args:
+        host (str): The interface to listen on.
+        port (int): The port to listen on. 0 picks a free port.
+        dimensions (int): The size of the vectors, unless a request asks for `dimensions`.
+        rpm (int): The number of requests accepted per minute before answering 429.
+        latency (float): Seconds added to every accepted request.
+        failure_rate (float): The share of accepted requests answered with a 500 error.
+
+    Returns:
+        ThreadingHTTPServer: The server; call `serve_forever()` to start it, e.g. in a thread.
+    """
+    server = ThreadingHTTPServer((host, port), FakeEmbeddingHandler)
+    server.dimensions = dimensions
+    server.rpm = rpm
+    server.latency = latency
+    server.failure_rate = failure_rate
+    server.recent = deque()
+    server.lock = threading.Lock()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--dimensions", type=int, default=1536)
+    parser.add_argument("--rpm", type=int, default=3000)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    args = parser.parse_args()
+    fake_server = create_server(args.host, args.port, args.dimensions, args.rpm, args.latency, args.failure_rate)
+    print(f"Fake embedding server listening on http://{args.host}:{fake_server.server_port}/v1")
+    fake_server.serve_forever()
@@ -0,0 +1,208 @@
+"""
+Conversation history backed by SQLite, indexed per thread.
+
+Usage (imports the daily CSV files written before the store existed; files already imported unchanged are skipped):
+    python -m app.utils.history_store            # the memory directory of app_config.yml
+    python -m app.utils.history_store path/to/memory
+"""
+import os
+import csv
+import sys
+import time
+import threading
+from datetime import datetime
+from typing import Dict, Iterable, Optional, Sequence, Tuple
+from .sqlite_pool import get_sqlite_pool
+from .tabular_ingestion import file_sha256
+
+SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS chat_history ("
+    "id INTEGER PRIMARY KEY, thread_id TEXT NOT NULL, timestamp TEXT NOT NULL, user_query TEXT, response TEXT, "
+    "source TEXT)",
+    # Every per-thread read walks this index; the rowid it ends with breaks ties between equal timestamps
+    "CREATE INDEX IF NOT EXISTS idx_chat_history_thread_timestamp ON chat_history (thread_id, timestamp)",
+    "CREATE INDEX IF NOT EXISTS idx_chat_history_source ON chat_history (source)",
+    "CREATE TABLE IF NOT EXISTS chat_history_imports (source TEXT PRIMARY KEY, sha256 TEXT, rows INTEGER, "
+    "imported_at TEXT)",
+)
+COLUMNS = ("thread_id", "timestamp", "user_query", "response")
+
+
+class HistoryStore:
+    """
+    Stores chat interactions in a SQLite table indexed on `(thread_id, timestamp)`.
+
+    Reading the last messages of a thread is an index range scan, whatever the number of threads and days, where
+    the daily CSV files had to be read in full. Pages are read newest first with keyset pagination: the `before`
+    cursor is the id of the oldest message already shown, so every page costs the same however far back it is.
+
+    Messages are written by the `ChatHistoryWriter` in batches (one transaction per batch) through the shared
+    writable connection pool of the database, in WAL mode so reads are never blocked by writes. Messages imported
+    from a CSV file record the file name as their `source`, which lets a changed file be imported again without
+    duplicating its rows.
+
+    Attributes:
+        db_path (str): The path of the SQLite database file.
+    """
+
+    def __init__(self, db_path: str) -> None:
+        """
+        Opens the store, creating the database and its tables if needed.
+
+        Args:
+            db_path (str): The path of the SQLite database file.
+        """
+        self.db_path = str(db_path)
+        with get_sqlite_pool(self.db_path, read_only=False).connection() as conn, conn:
+            for statement in SCHEMA:
+                conn.execute(statement)
+
+    def append_many(self, rows: Iterable[Sequence[str]], durable: bool = False) -> int:
+        """
+        Stores interactions in one transaction.
+
+        Args:
+            rows (Iterable[Sequence[str]]): The `thread_id`, `timestamp` ("YYYY-MM-DD HH:MM:SS"), `user_query` and
+                `response` of every interaction.
+            durable (bool): Whether the transaction is synced to the disk before returning (`synchronous=FULL`)
+                rather than at the next WAL checkpoint.
+
+        Returns:
+            int: The number of stored interactions.
+        """
+        rows = [tuple(row[:4]) for row in rows]
+        with get_sqlite_pool(self.db_path, read_only=False).connection() as conn:
+            conn.execute(f"PRAGMA synchronous={'FULL' if durable else 'NORMAL'}")
+            with conn:
+                conn.executemany(
+                    "INSERT INTO chat_history (thread_id, timestamp, user_query, response) VALUES (?, ?, ?, ?)", rows)
+        return len(rows)
+
+    def append(self, thread_id: str, user_query: str, response: str, timestamp: Optional[str] = None) -> None:
+        """Stores one interaction, timestamped now unless a timestamp is given."""
+        timestamp = timestamp or datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        self.append_many([(thread_id, timestamp, user_query, response)])
+
+    def read(self, thread_id: str, limit: int = 20, before: Optional[int] = None) -> Dict:
+        """
+        Returns a page of the messages of a thread, going back in time.
+
+        Args:
+            thread_id (str): The thread.
+            limit (int): The maximum number of messages of the page.
+            before (int, optional): The id of the oldest message of the previous page; the newest messages when
+                not given.
+
+        Returns:
+            dict: The `messages` of the page in chronological order (each with its `id`, `thread_id`, `timestamp`,
+            `user_query` and `response`), and `next_before`, the cursor of the next (older) page or None when the
+            thread has no older messages.
+        """
+        query = "SELECT id, thread_id, timestamp, user_query, response FROM chat_history WHERE thread_id = ?"
+        params: Tuple = (thread_id,)
+        with get_sqlite_pool(self.db_path, read_only=False).connection() as conn:
+            if before is not None:
+                cursor = conn.execute("SELECT timestamp FROM chat_history WHERE id = ?", (before,)).fetchone()
+                if cursor is None:
+                    return {"messages": [], "next_before": None}
+                query += " AND (timestamp < ? OR (timestamp = ? AND id < ?))"
+                params += (cursor[0], cursor[0], before)
+            # One row more than the page tells whether an older page exists
+            rows = conn.execute(query + " ORDER BY timestamp DESC, id DESC LIMIT ?", params + (limit + 1,)).fetchall()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        messages = [dict(zip(("id",) + COLUMNS, row)) for row in reversed(rows)]
+        return {"messages": messages, "next_before": rows[-1][0] if has_more and rows else None}
+
+    def delete_thread(self, thread_id: str) -> int:
+        """
+        Deletes the messages of a thread.
+
+        Returns:
+            int: The number of deleted messages.
+        """
+        with get_sqlite_pool(self.db_path, read_only=False).connection() as conn, conn:
+            return conn.execute("DELETE FROM chat_history WHERE thread_id = ?", (thread_id,)).rowcount
+
+    def import_csv_directory(self, folder_path: str) -> Dict:
+        """
+        Imports the daily CSV files (`YYYY-MM-DD.csv`) of a memory folder.
+
+        A file is imported in one transaction, which replaces the rows of its previous import, so the import can be
+        run again at any time: unchanged files are skipped and files that grew since are imported again.
+
+        Args:
+            folder_path (str): The folder of the daily CSV files.
+
+        Returns:
+            dict: The file names that were `imported` and `skipped`, the number of `rows` and `seconds` spent.
+        """
+        start = time.perf_counter()
+        pool = get_sqlite_pool(self.db_path, read_only=False)
+        with pool.connection() as conn:
+            imported_versions = dict(conn.execute("SELECT source, sha256 FROM chat_history_imports"))
+        imported, skipped, total_rows = [], [], 0
+        for file in sorted(os.listdir(folder_path)):
+            day = os.path.splitext(file)[0]
+            if not file.endswith(".csv") or not _is_date(day):
+                continue
+            file_path = os.path.join(folder_path, file)
+            sha256 = file_sha256(file_path)
+            if imported_versions.get(file) == sha256:
+                skipped.append(file)
+                continue
+            with open(file_path, newline="", encoding="utf-8") as f:
+                rows = [(row["thread_id"], f"{day} {row['timestamp']}", row["user_query"], row["response"], file)
+                        for row in csv.DictReader(f)]
+            with pool.connection() as conn, conn:
+                conn.execute("DELETE FROM chat_history WHERE source = ?", (file,))
+                conn.executemany("INSERT INTO chat_history (thread_id, timestamp, user_query, response, source) "
+                                 "VALUES (?, ?, ?, ?, ?)", rows)
+                conn.execute("INSERT OR REPLACE INTO chat_history_imports VALUES (?, ?, ?, ?)",
+                             (file, sha256, len(rows), datetime.now().isoformat(timespec="seconds")))
+            imported.append(file)
+            total_rows += len(rows)
+        stats = {"imported": imported, "skipped": skipped, "rows": total_rows,
+                 "seconds": time.perf_counter() - start}
+        print(f"Imported {total_rows} messages from {len(imported)} files, skipped {len(skipped)} unchanged files "
+              f"in {stats['seconds']:.2f}s")
+        return stats
+
+
+def _is_date(text: str) -> bool:
+    """Whether a file name (without extension) is a `YYYY-MM-DD` date."""
+    try:
+        datetime.strptime(text, '%Y-%m-%d')
+        return True
+    except ValueError:
+        return False
+
+
+_STORES: Dict[str, HistoryStore] = {}
+_STORES_LOCK = threading.Lock()
+
+
+def get_history_store(db_path: str) -> HistoryStore:
+    """
+    Returns the process-wide store of a database, creating its tables on first use.
+
+    Args:
+        db_path (str): The path of the SQLite database file.
+
+    Returns:
+        HistoryStore: The shared store.
+    """
+    key = os.path.abspath(str(db_path))
+    with _STORES_LOCK:
+        store = _STORES.get(key)
+        if store is None:
+            store = HistoryStore(key)
+            _STORES[key] = store
+        return store
+
+
+if __name__ == "__main__":
+    from pyprojroot import here
+    from .memory import MEMORY_CFG
+    folder = sys.argv[1] if len(sys.argv) > 1 else str(here(MEMORY_CFG["directory"]))
+    get_history_store(here(MEMORY_CFG["history_db"])).import_csv_directory(folder)
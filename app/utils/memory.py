@@ -1,17 +1,302 @@
 import os
-import pandas as pd
-from typing import List
-from datetime import datetime, date
+import csv
+import sqlite3
+import time
+import uuid
+import queue
+import atexit
+import threading
+from typing import Dict, List, Optional, TextIO, Tuple
+from datetime import datetime
+import yaml
+from pyprojroot import here
+from .history_store import HistoryStore, get_history_store
+
+with open(here("app/configs/app_config.yml")) as cfg:
+    MEMORY_CFG = yaml.load(cfg, Loader=yaml.FullLoader)["memory"]
+
+COLUMNS = ["thread_id", "timestamp", "user_query", "response"]
+FSYNC_POLICIES = ("none", "batch", "always")
+HISTORY_BACKENDS = ("sqlite", "csv")
+
+_STOP = object()
+
+
+class ChatHistoryWriter:
+    """
+    Appends chat interactions to a `HistoryStore`, or to the daily CSV files of a folder, from a background thread.
+
+    `write` only puts the row on an in-memory queue, so the request thread never waits on the disk. The writer
+    thread takes rows off the queue and appends them in batches: a batch is written once `max_batch_size` rows are
+    waiting or `flush_interval` seconds after its first row, whichever comes first, in one SQLite transaction or
+    through a CSV file handle kept open for the current day. The date and time of a row are taken when it is
+    queued, so a batch spanning midnight is split between the two days' files.
+
+    The `fsync` policy sets how durable the written rows are:
+        - "none": rows are handed to the operating system after every batch, which survives a crash of the
+          process but not of the machine.
+        - "batch": every batch is also fsynced to the disk (committed with `synchronous=FULL` in SQLite).
+        - "always": every row is written and fsynced on its own, without waiting for a batch.
+
+    The queue is flushed when the process exits normally (`atexit`), and `flush` waits until every row queued so
+    far is written. Writing never blocks or fails the request thread: a batch that cannot be written is reported
+    and dropped, a writer thread that died is restarted by the next `write`, and rows arriving while the queue is
+    full are dropped and counted in `rows_dropped`.
+
+    Attributes:
+        folder_path (str): The folder of the daily CSV files.
+        history_store (HistoryStore): The store the rows are written to instead of the CSV files, if any.
+        max_batch_size (int): The number of waiting rows that triggers a write.
+        flush_interval (float): The maximum number of seconds a row waits before it is written.
+        fsync (str): The durability policy: "none", "batch" or "always".
+        rows_written (int): The number of rows written.
+        batches_written (int): The number of batches written.
+        rows_dropped (int): The number of rows lost because the queue was full or their batch failed.
+    """
+
+    def __init__(self, folder_path: str, history_store: Optional[HistoryStore] = None, max_batch_size: int = 64,
+                 flush_interval: float = 1.0, fsync: str = "batch", max_queue_size: int = 10000) -> None:
+        """
+        Initializes the writer. The writer thread is started with the first row.
+
+        Args:
+            folder_path (str): The folder of the daily CSV files.
+            history_store (HistoryStore, optional): The store the rows are written to instead of the CSV files.
+            max_batch_size (int): The number of waiting rows that triggers a write.
+            flush_interval (float): The maximum number of seconds a row waits before it is written.
+            fsync (str): The durability policy: "none", "batch" or "always".
+            max_queue_size (int): The maximum number of queued rows; rows written while the queue is full are dropped.
+
+        Raises:
+            ValueError: If the fsync policy is not supported.
+        """
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"Unsupported fsync policy {fsync!r}, expected one of {', '.join(FSYNC_POLICIES)}")
+        self.folder_path = str(folder_path)
+        self.history_store = history_store
+        self.max_batch_size = 1 if fsync == "always" else max(1, max_batch_size)
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        self.rows_written = 0
+        self.batches_written = 0
+        self.rows_dropped = 0
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_queue_size)
+        self._thread: Optional[threading.Thread] = None
+        self._thread_lock = threading.Lock()
+        self._file: Optional[TextIO] = None
+        self._file_day: Optional[str] = None
+
+    def write(self, thread_id: str, user_query: str, response: str) -> None:
+        """
+        Queues one interaction to be appended to the history.
+
+        Args:
+            thread_id (str): The unique identifier for the chat session (or thread).
+            user_query (str): The user's message.
+            response (str): The chatbot's response.
+        """
+        now = datetime.now()
+        self._start()
+        try:
+            self._queue.put_nowait(
+                (now.strftime('%Y-%m-%d'), [thread_id, now.strftime('%H:%M:%S'), user_query, response]))
+        except queue.Full:
+            self._drop(1, "the queue is full")
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Waits until every row queued so far is written.
+
+        Args:
+            timeout (float, optional): The maximum number of seconds to wait.
+
+        Returns:
+            bool: Whether the rows were written within the timeout.
+        """
+        if self._thread is None:
+            return True
+        self._start()
+        done = threading.Event()
+        try:
+            self._queue.put(done, timeout=timeout)
+        except queue.Full:
+            return False
+        return done.wait(timeout)
+
+    def close(self, timeout: float = 10.0) -> None:
+        """Writes the queued rows, stops the writer thread and closes the file. Registered with `atexit`."""
+        with self._thread_lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(_STOP)
+            thread.join(timeout)
+
+    def _drop(self, rows: int, reason: str) -> None:
+        """Counts rows that could not be written, reporting the first loss and every thousandth after it."""
+        first = self.rows_dropped == 0
+        self.rows_dropped += rows
+        if first or self.rows_dropped // 1000 != (self.rows_dropped - rows) // 1000:
+            print(f"Dropped {rows} chat history rows ({self.rows_dropped} in total): {reason}")
+
+    def _start(self) -> None:
+        """Starts the writer thread if it is not running, or no longer running."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._thread_lock:
+            if self._thread is None or not self._thread.is_alive():
+                os.makedirs(self.folder_path, exist_ok=True)
+                self._thread = threading.Thread(target=self._run, name="chat-history-writer", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        """Takes batches of rows off the queue and writes them until `close` is called."""
+        while True:
+            batch: List[Tuple[str, list]] = []
+            waiters: List[threading.Event] = []
+            stop = False
+            item = self._queue.get()
+            deadline = time.monotonic() + self.flush_interval
+            while True:
+                if item is _STOP:
+                    stop = True
+                elif isinstance(item, threading.Event):
+                    waiters.append(item)
+                else:
+                    batch.append(item)
+                # Flush requests and shutdown write whatever is waiting right away
+                if stop or waiters or len(batch) >= self.max_batch_size:
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+            if stop:
+                # Rows queued by other threads while stopping are written too
+                while True:
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if isinstance(item, threading.Event):
+                        waiters.append(item)
+                    elif item is not _STOP:
+                        batch.append(item)
+            try:
+                self._write_batch(batch)
+            except Exception as e:
+                # Whatever goes wrong, the thread must survive: a dead writer would let the queue fill up
+                self._drop(len(batch), repr(e))
+                self._close_file()
+            finally:
+                for waiter in waiters:
+                    waiter.set()
+            if stop:
+                self._close_file()
+                return
+
+    def _open_day(self, day: str) -> TextIO:
+        """Returns the open file of a day, switching files at midnight and writing the header of a new file."""
+        if self._file_day != day:
+            self._sync()
+            self._close_file()
+            self._file = open(os.path.join(self.folder_path, f'{day}.csv'), 'a', newline='', encoding='utf-8')
+            self._file_day = day
+            if self._file.tell() == 0:
+                csv.writer(self._file, lineterminator='\n').writerow(COLUMNS)
+        return self._file
+
+    def _sync(self) -> None:
+        """Hands the written rows to the operating system, and to the disk unless the fsync policy is "none"."""
+        if self._file is not None:
+            self._file.flush()
+            if self.fsync != "none":
+                os.fsync(self._file.fileno())
+
+    def _close_file(self) -> None:
+        """Closes the file of the current day, if any."""
+        if self._file is not None:
+            self._file.close()
+            self._file, self._file_day = None, None
+
+    def _write_batch(self, batch: List[Tuple[str, list]]) -> None:
+        """Appends a batch of rows to the store or to their daily files and applies the fsync policy."""
+        if not batch:
+            return
+        try:
+            if self.history_store is not None:
+                self.history_store.append_many(
+                    [(thread_id, f"{day} {time_str}", user_query, response)
+                     for day, (thread_id, time_str, user_query, response) in batch],
+                    durable=self.fsync != "none")
+            else:
+                for day, row in batch:
+                    f = self._open_day(day)
+                    csv.writer(f, lineterminator='\n').writerow(row)
+                self._sync()
+        except (OSError, sqlite3.Error) as e:
+            # Logging must never take the chatbot down; the rows of the failed batch are reported and dropped
+            self._drop(len(batch), f"could not write them: {e}")
+            self._close_file()
+            return
+        self.rows_written += len(batch)
+        self.batches_written += 1
+
+
+def new_thread_id() -> str:
+    """
+    Returns the id of a new conversation, for requests that send no `thread_id`: they are never stored under a
+    shared id, which anyone could read or delete through `/history`.
+    """
+    return uuid.uuid4().hex
+
+
+_WRITERS: Dict[str, ChatHistoryWriter] = {}
+_WRITERS_LOCK = threading.Lock()
+
+
+def get_chat_history_writer(folder_path: str) -> ChatHistoryWriter:
+    """
+    Returns the process-wide writer of a folder, creating it with the settings of `app_config.yml`.
+
+    With the "sqlite" history backend, the rows go to the history database instead of the folder's CSV files.
+
+    Args:
+        folder_path (str): The folder of the daily CSV files.
+
+    Returns:
+        ChatHistoryWriter: The shared writer, flushed when the process exits.
+    """
+    key = os.path.abspath(str(folder_path))
+    with _WRITERS_LOCK:
+        writer = _WRITERS.get(key)
+        if writer is None:
+            backend = MEMORY_CFG["backend"]
+            if backend not in HISTORY_BACKENDS:
+                raise ValueError(
+                    f"Unsupported history backend {backend!r}, expected one of {', '.join(HISTORY_BACKENDS)}")
+            writer = ChatHistoryWriter(
+                folder_path=key,
+                history_store=get_history_store(here(MEMORY_CFG["history_db"])) if backend == "sqlite" else None,
+                max_batch_size=int(MEMORY_CFG["max_batch_size"]),
+                flush_interval=float(MEMORY_CFG["flush_interval"]),
+                fsync=MEMORY_CFG["fsync"])
+            atexit.register(writer.close)
+            _WRITERS[key] = writer
+        return writer
 
 
 class Memory:
     """
-    A class for handling the storage of chatbot conversation history by writing chat logs to a CSV file.
+    A class for handling the storage of chatbot conversation history by writing chat logs to the history database
+    (or to a CSV file per day with the "csv" history backend).
 
     Methods:
         write_chat_history_to_file(gradio_chatbot: List, thread_id: str, folder_path: str) -> None:
-            Writes the most recent chatbot interaction (user query and bot response) to a CSV file. 
-            The chat log is saved with the current date as the filename, and the interaction is 
+            Writes the most recent chatbot interaction (user query and bot response) to a CSV file.
+            The chat log is saved with the current date as the filename, and the interaction is
             timestamped.
     """
     @staticmethod
@@ -20,8 +305,12 @@ class Memory:
         Writes the most recent chatbot interaction (user query and response) to a CSV file. The log includes
         the thread ID and timestamp of the interaction. The file for each day is saved with the current date as the filename.
 
+        The interaction is queued to the folder's background `ChatHistoryWriter`, so this returns without touching
+        the disk; the row is written within `memory.flush_interval` seconds (see `app_config.yml`). With the default
+        "sqlite" history backend it is stored in the history database rather than in the CSV file below.
+
         Args:
-            gradio_chatbot (List): A list containing tuples of user queries and chatbot responses. 
+            gradio_chatbot (List): A list containing tuples of user queries and chatbot responses.
                                    The most recent interaction is appended to the log.
             thread_id (str): The unique identifier for the chat session (or thread).
             folder_path (str): The directory path where the chat log CSV files should be stored.
@@ -34,25 +323,5 @@ class Memory:
             - The CSV file is named using the current date in 'YYYY-MM-DD' format.
             - Each row in the CSV file contains the following columns: 'thread_id', 'timestamp', 'user_query', 'response'.
         """
-        tmp_list = list(gradio_chatbot[-1])  # Convert the tuple to a list
-
-        today_str = date.today().strftime('%Y-%m-%d')
-        tmp_list.insert(0, thread_id)  # Add the new value to the list
-
-        current_time_str = datetime.now().strftime('%H:%M:%S')
-        tmp_list.insert(1, current_time_str)  # Add the new value to the list
-
-        # File path for today's CSV file
-        file_path = os.path.join(folder_path, f'{today_str}.csv')
-
-        # Create a DataFrame from the list
-        new_df = pd.DataFrame([tmp_list], columns=[
-                              "thread_id", "timestamp", "user_query", "response"])
-
-        # Check if the file for today exists
-        if os.path.exists(file_path):
-            # If it exists, append the new data to the CSV file
-            new_df.to_csv(file_path, mode='a', header=False, index=False)
-        else:
-            # If it doesn't exist, create the CSV file with the new data
-            new_df.to_csv(file_path, mode='w', header=True, index=False)
+        user_query, response = gradio_chatbot[-1]
+        get_chat_history_writer(folder_path).write(thread_id, user_query, response)
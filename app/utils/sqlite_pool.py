@@ -0,0 +1,174 @@
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, Tuple
+import yaml
+from pyprojroot import here
+from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import QueuePool
+
+with open(here("app/configs/app_config.yml")) as cfg:
+    SQLITE_CFG = yaml.load(cfg, Loader=yaml.FullLoader)["sqlite"]
+
+
+class SQLitePool:
+    """
+    A small pool of tuned SQLite connections to one database file, shared by all threads of the process.
+
+    Read-only pools open the file with `mode=ro` (and `immutable=1` for files listed as immutable in
+    `app_config.yml`, which also skips file locking), set `query_only`, a memory-mapped I/O window, a larger page
+    cache and in-memory temporary storage. Writable pools additionally switch the database to WAL so readers are not
+    blocked by ingestion runs. Connections are created with `check_same_thread=False` and handed to one thread at
+    a time.
+
+    Attributes:
+        db_path (str): The path of the SQLite database file.
+        read_only (bool): Whether connections are opened read-only.
+        immutable (bool): Whether the file is opened with `immutable=1`. Only safe for files that never change.
+        max_connections (int): The maximum number of idle connections kept open.
+        mmap_size (int): The `mmap_size` pragma in bytes.
+        cache_size_kib (int): The page cache size in KiB.
+    """
+
+    def __init__(self, db_path: str, read_only: bool = True, immutable: bool = False, max_connections: int = 8,
+                 mmap_size: int = 268435456, cache_size_kib: int = 65536) -> None:
+        """
+        Initializes an empty pool. Connections are opened on demand.
+
+        Args:
+            db_path (str): The path of the SQLite database file.
+            read_only (bool): Whether connections are opened read-only.
+            immutable (bool): Whether the file is opened with `immutable=1`.
+            max_connections (int): The maximum number of idle connections kept open.
+            mmap_size (int): The `mmap_size` pragma in bytes.
+            cache_size_kib (int): The page cache size in KiB.
+        """
+        self.db_path = str(db_path)
+        self.read_only = read_only
+        self.immutable = immutable and read_only
+        self.max_connections = max_connections
+        self.mmap_size = mmap_size
+        self.cache_size_kib = cache_size_kib
+        self._idle: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue(maxsize=max_connections)
+        if not read_only:
+            conn = self.new_connection()
+            conn.execute("PRAGMA journal_mode=WAL")
+            self.release(conn)
+
+    def new_connection(self) -> sqlite3.Connection:
+        """
+        Opens a new tuned connection. Also used as the `creator` of SQLAlchemy engines.
+
+        Returns:
+            sqlite3.Connection: The connection.
+        """
+        if self.read_only:
+            uri = f"file:{self.db_path}?mode=ro" + ("&immutable=1" if self.immutable else "")
+            conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+            conn.execute("PRAGMA query_only=1")
+        else:
+            os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA mmap_size={int(self.mmap_size)}")
+        conn.execute(f"PRAGMA cache_size=-{int(self.cache_size_kib)}")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        return conn
+
+    def acquire(self) -> sqlite3.Connection:
+        """Returns an idle connection, or a new one if none is idle."""
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            return self.new_connection()
+
+    def release(self, conn: sqlite3.Connection) -> None:
+        """Returns a connection to the pool, closing it if the pool is full."""
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+            conn.set_progress_handler(None, 0)
+            self._idle.put_nowait(conn)
+        except (queue.Full, sqlite3.Error):
+            conn.close()
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """
+        Lends a connection for the duration of a `with` block.
+
+        Yields:
+            sqlite3.Connection: A tuned connection.
+        """
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def create_engine(self) -> Engine:
+        """
+        Creates a SQLAlchemy engine whose connections are opened by this pool with the same tuning.
+
+        Returns:
+            Engine: The engine.
+        """
+        return create_engine(
+            "sqlite://", creator=self.new_connection, poolclass=QueuePool,
+            pool_size=self.max_connections, max_overflow=self.max_connections)
+
+    def close(self) -> None:
+        """Closes every idle connection."""
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+_POOLS: Dict[Tuple[str, bool], SQLitePool] = {}
+_POOLS_LOCK = threading.Lock()
+
+
+def get_sqlite_pool(db_path: str, read_only: bool = True) -> SQLitePool:
+    """
+    Returns the process-wide pool of a database, creating it with the settings of `app_config.yml`.
+
+    Args:
+        db_path (str): The path of the SQLite database file.
+        read_only (bool): Whether the pool opens read-only connections.
+
+    Returns:
+        SQLitePool: The shared pool.
+    """
+    key = (os.path.abspath(str(db_path)), read_only)
+    with _POOLS_LOCK:
+        pool = _POOLS.get(key)
+        if pool is None:
+            immutable_files = {os.path.basename(str(path)) for path in SQLITE_CFG["immutable_databases"] or []}
+            pool = SQLitePool(
+                db_path=key[0],
+                read_only=read_only,
+                immutable=os.path.basename(key[0]) in immutable_files,
+                max_connections=int(SQLITE_CFG["max_connections"]),
+                mmap_size=int(SQLITE_CFG["mmap_size"]),
+                cache_size_kib=int(SQLITE_CFG["cache_size_kib"]))
+            _POOLS[key] = pool
+        return pool
+
+
+def create_sqlite_engine(db_path: str, read_only: bool = True) -> Engine:
+    """
+    Creates a SQLAlchemy engine backed by the shared, tuned pool of a database.
+
+    Args:
+        db_path (str): The path of the SQLite database file.
+        read_only (bool): Whether the engine opens read-only connections.
+
+    Returns:
+        Engine: The engine.
+    """
+    return get_sqlite_pool(db_path, read_only=read_only).create_engine()
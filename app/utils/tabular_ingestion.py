@@ -0,0 +1,554 @@
+import os
+import time
+import uuid
+import queue
+import atexit
+import hashlib
+import datetime
+import sqlite3
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import pandas as pd
+from openpyxl import load_workbook
+from .sqlite_pool import get_sqlite_pool
+
+SUPPORTED_EXTENSIONS = (".csv", ".xlsx")
+MANIFEST_TABLE = "_ingestion_manifest"
+STAGING_PREFIX = "_staging_"
+
+
+def table_name_for(file_path: str) -> str:
+    """Returns the name of the table a file is loaded into: its name without extension."""
+    return os.path.splitext(os.path.basename(file_path))[0]
+
+
+def file_sha256(file_path: str) -> str:
+    """Hashes the content of a file, reading it in 1 MB blocks."""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _column_names(header: tuple) -> List[str]:
+    """Names spreadsheet columns the way `pd.read_excel` does: `Unnamed: i` for blanks and `.n` suffixes for repeats."""
+    names, seen = [], {}
+    for i, value in enumerate(header):
+        name = f"Unnamed: {i}" if value is None or str(value).strip() == "" else str(value)
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        names.append(name)
+    return names
+
+
+def read_chunks(file_path: str, chunk_rows: int = 50000) -> Iterator[pd.DataFrame]:
+    """
+    Reads a CSV or XLSX file as a stream of DataFrames of at most `chunk_rows` rows.
+
+    CSV files are read with `pd.read_csv(chunksize=...)`. XLSX files are read row by row with openpyxl in read-only
+    mode, which does not load the whole workbook in memory; like `pd.read_excel`, only the first sheet is read and
+    its first row is the header.
+
+    Args:
+        file_path (str): The path of the file.
+        chunk_rows (int): The maximum number of rows per chunk.
+
+    Yields:
+        pd.DataFrame: The consecutive chunks of the file.
+
+    Raises:
+        ValueError: If the file is neither CSV nor XLSX.
+    """
+    file_extension = os.path.splitext(file_path)[1]
+    if file_extension == ".csv":
+        with pd.read_csv(file_path, chunksize=chunk_rows) as reader:
+            yield from reader
+    elif file_extension == ".xlsx":
+        workbook = load_workbook(file_path, read_only=True, data_only=True)
+        try:
+            rows = workbook.worksheets[0].iter_rows(values_only=True)
+            header = next(rows, None)
+            if header is None:
+                return
+            columns = _column_names(header)
+            batch, chunks = [], 0
+            for row in rows:
+                if all(value is None for value in row):
+                    continue
+                row = tuple(row[:len(columns)]) + (None,) * (len(columns) - len(row))
+                batch.append(row)
+                if len(batch) >= chunk_rows:
+                    yield pd.DataFrame(batch, columns=columns)
+                    batch, chunks = [], chunks + 1
+            if batch or not chunks:
+                # A sheet with only a header still becomes an empty table, as with `pd.read_csv`
+                yield pd.DataFrame(batch, columns=columns)
+        finally:
+            workbook.close()
+    else:
+        raise ValueError("The selected file type is not supported")
+
+
+def infer_column_types(sample: pd.DataFrame) -> List[Tuple[str, str]]:
+    """
+    Infers the SQLite column types of a table from a sample of its rows, using the same types as `df.to_sql`.
+
+    The types are decided once per table; values of later chunks that do not match are stored as they are, as
+    SQLite allows.
+
+    Args:
+        sample (pd.DataFrame): The first rows of the file.
+
+    Returns:
+        List[Tuple[str, str]]: The name and SQLite type of every column.
+    """
+    types = []
+    for column in sample.columns:
+        values = sample[column].dropna()
+        if pd.api.types.is_bool_dtype(values):
+            sql_type = "INTEGER"
+        elif pd.api.types.is_datetime64_any_dtype(values):
+            sql_type = "TIMESTAMP"
+        elif pd.api.types.is_integer_dtype(values):
+            sql_type = "INTEGER"
+        elif pd.api.types.is_float_dtype(values):
+            sql_type = "REAL"
+        else:
+            inferred = pd.api.types.infer_dtype(values, skipna=True)
+            sql_type = {
+                "integer": "INTEGER", "boolean": "INTEGER", "floating": "REAL", "mixed-integer-float": "REAL",
+                "decimal": "REAL", "datetime": "TIMESTAMP", "datetime64": "TIMESTAMP", "date": "DATE",
+            }.get(inferred, "TEXT")
+        types.append((str(column), sql_type))
+    return types
+
+
+def _to_sqlite(value):
+    """Converts a pandas/numpy/openpyxl value to a type the sqlite3 module can bind."""
+    if value is None or (not isinstance(value, (str, bytes)) and pd.isna(value)):
+        return None
+    if hasattr(value, "item") and not isinstance(value, (str, bytes)):
+        value = value.item() if not isinstance(value, pd.Timestamp) else value.to_pydatetime()
+    if isinstance(value, (bool, int, float, str, bytes)):
+        return value
+    if isinstance(value, datetime.datetime):
+        return value.isoformat(sep=" ")
+    return str(value)
+
+
+def to_rows(chunk: pd.DataFrame) -> List[tuple]:
+    """Converts a chunk to a list of tuples ready for `executemany`, column by column."""
+    columns = []
+    for name in chunk.columns:
+        series = chunk[name]
+        if pd.api.types.is_numeric_dtype(series) or (pd.api.types.is_string_dtype(series) and series.dtype != object):
+            # Numbers and pandas strings convert to Python values in bulk
+            columns.append(series.astype(object).where(series.notna(), None).tolist())
+        else:
+            columns.append([_to_sqlite(value) for value in series])
+    return list(zip(*columns))
+
+
+def _quote(identifier: str) -> str:
+    """Quotes an SQL identifier."""
+    return '"' + identifier.replace('"', '""') + '"'
+
+
+def _insert_statement(table_name: str, column_types: List[Tuple[str, str]]) -> str:
+    """Returns the parameterized INSERT statement of a table."""
+    return f"INSERT INTO {_quote(table_name)} VALUES ({', '.join('?' for _ in column_types)})"
+
+
+_PARSED_CHUNKS = None
+
+
+def _init_parser(parsed_chunks) -> None:
+    """Initializes a parser process with the queue shared with the writer."""
+    global _PARSED_CHUNKS
+    _PARSED_CHUNKS = parsed_chunks
+
+
+def _parse_file(run_id: str, file_path: str, chunk_rows: int, sample_rows: int) -> None:
+    """
+    Runs in a parser process: parses a file chunk by chunk and sends its column types, its rows and finally its
+    parse time (or the error that stopped it) to the writer, tagged with the ingestion run they belong to.
+    """
+    parse_seconds = 0.0
+    try:
+        start = time.perf_counter()
+        for i, chunk in enumerate(read_chunks(file_path, chunk_rows=chunk_rows)):
+            if i == 0:
+                _PARSED_CHUNKS.put((run_id, "schema", file_path, infer_column_types(chunk.head(sample_rows))))
+            rows = to_rows(chunk)
+            parse_seconds += time.perf_counter() - start
+            # Blocks while the writer is behind, which bounds the memory held by parsed chunks
+            _PARSED_CHUNKS.put((run_id, "rows", file_path, rows))
+            start = time.perf_counter()
+        _PARSED_CHUNKS.put((run_id, "done", file_path, parse_seconds + time.perf_counter() - start))
+    except Exception as e:
+        _PARSED_CHUNKS.put((run_id, "error", file_path, f"{type(e).__name__}: {e}"))
+
+
+_PARSER_POOLS: Dict[Tuple[int, int], Tuple[ProcessPoolExecutor, Any, threading.Lock]] = {}
+_PARSER_POOLS_LOCK = threading.Lock()
+
+
+def _get_parser_pool(workers: int, queue_chunks: int) -> Tuple[ProcessPoolExecutor, Any, threading.Lock]:
+    """
+    Returns the process-wide parser pool of a size, with the queue its parsers send their chunks to and the lock
+    that lets one ingestion run use it at a time.
+
+    The pool is created on first use and kept for the life of the process: spawned parsers import the server's
+    modules when they start, which costs far more than parsing a small upload, so they are only started once.
+    """
+    key = (workers, queue_chunks)
+    with _PARSER_POOLS_LOCK:
+        entry = _PARSER_POOLS.get(key)
+        if entry is None:
+            # Spawned rather than forked, so parsers do not inherit locks held by the server's threads
+            context = multiprocessing.get_context("spawn")
+            parsed_chunks = context.Queue(maxsize=queue_chunks)
+            pool = ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_parser,
+                                       initargs=(parsed_chunks,))
+            atexit.register(pool.shutdown, wait=False, cancel_futures=True)
+            entry = (pool, parsed_chunks, threading.Lock())
+            _PARSER_POOLS[key] = entry
+        return entry
+
+
+def _discard_parser_pool(workers: int, queue_chunks: int) -> None:
+    """Forgets a parser pool whose processes died, so the next run starts a new one."""
+    with _PARSER_POOLS_LOCK:
+        entry = _PARSER_POOLS.pop((workers, queue_chunks), None)
+    if entry is not None:
+        entry[0].shutdown(wait=False, cancel_futures=True)
+
+
+class TabularIngestor:
+    """
+    Loads CSV and XLSX files into a SQLite database with bounded memory, whatever the size of the files.
+
+    Files are streamed in chunks of `chunk_rows` rows; the column types of each table are inferred once from its
+    first `sample_rows` rows. Every chunk is written with a single `executemany` inside its own transaction on the
+    writable connection pool of the database, so at most one chunk per file is held in memory. The number of rows
+    and the rows/sec of every file are reported at the end.
+
+    With more than one worker, several files totalling at least `parallel_min_bytes` are parsed at the same time in
+    a process pool (parsing, XLSX in particular, is CPU-bound) while a single writer in the calling process inserts
+    their chunks, as SQLite only allows one writer at a time. The pool is shared by the whole process and started
+    once; smaller loads are parsed in the calling process, where they finish before parsers could start. Parsed
+    chunks wait in a queue of `queue_chunks` entries, so memory stays bounded when parsing is faster than writing.
+
+    Attributes:
+        db_path (str): The path of the SQLite database.
+        chunk_rows (int): The number of rows read and written at a time.
+        sample_rows (int): The number of rows used to infer the column types.
+        workers (int): The number of parser processes. 1 parses and writes in the calling process.
+        queue_chunks (int): The number of parsed chunks that may wait for the writer.
+        parallel_min_bytes (int): The total size of the files below which they are not parsed in parallel.
+    """
+
+    def __init__(self, db_path: str, chunk_rows: int = 50000, sample_rows: int = 1000, workers: int = 1,
+                 queue_chunks: int = 8, parallel_min_bytes: int = 64 * 1024 * 1024) -> None:
+        """
+        Initializes the ingestor.
+
+        Args:
+            db_path (str): The path of the SQLite database.
+            chunk_rows (int): The number of rows read and written at a time.
+            sample_rows (int): The number of rows used to infer the column types.
+            workers (int): The number of parser processes. 1 parses and writes in the calling process, 0 uses one
+                process per CPU core.
+            queue_chunks (int): The number of parsed chunks that may wait for the writer.
+            parallel_min_bytes (int): The total size of the files below which they are not parsed in parallel.
+        """
+        self.db_path = str(db_path)
+        self.chunk_rows = chunk_rows
+        self.sample_rows = sample_rows
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        self.queue_chunks = max(1, queue_chunks)
+        self.parallel_min_bytes = parallel_min_bytes
+
+    @staticmethod
+    def create_table(conn: sqlite3.Connection, table_name: str, column_types: List[Tuple[str, str]],
+                     if_exists: str = "fail") -> None:
+        """
+        Creates a table, handling an existing table like `df.to_sql` does.
+
+        Args:
+            conn (sqlite3.Connection): A writable connection.
+            table_name (str): The name of the table.
+            column_types (List[Tuple[str, str]]): The name and SQLite type of every column.
+            if_exists (str): "fail", "replace" or "append".
+
+        Raises:
+            ValueError: If the table exists and `if_exists` is "fail".
+        """
+        exists = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table_name,)).fetchone()
+        if exists and if_exists == "fail":
+            raise ValueError(f"Table '{table_name}' already exists.")
+        if exists and if_exists == "append":
+            return
+        with conn:
+            if exists:
+                conn.execute(f"DROP TABLE {_quote(table_name)}")
+            columns = ", ".join(f"{_quote(name)} {sql_type}" for name, sql_type in column_types)
+            conn.execute(f"CREATE TABLE {_quote(table_name)} ({columns})")
+
+    def ingest_file(self, file_path: str, table_name: Optional[str] = None, if_exists: str = "fail") -> Dict:
+        """
+        Streams a file into a table.
+
+        Args:
+            file_path (str): The path of the CSV or XLSX file.
+            table_name (str, optional): The name of the table. Defaults to the file name without extension.
+            if_exists (str): "fail", "replace" or "append", as in `df.to_sql`.
+
+        Returns:
+            dict: The `file`, `table`, number of `rows` and `seconds` spent.
+        """
+        table_name = table_name or table_name_for(file_path)
+        start = time.perf_counter()
+        rows = 0
+        with get_sqlite_pool(self.db_path, read_only=False).connection() as conn:
+            for i, chunk in enumerate(read_chunks(file_path, chunk_rows=self.chunk_rows)):
+                if i == 0:
+                    column_types = infer_column_types(chunk.head(self.sample_rows))
+                    self.create_table(conn, table_name, column_types, if_exists=if_exists)
+                    insert = _insert_statement(table_name, column_types)
+                with conn:
+                    conn.executemany(insert, to_rows(chunk))
+                rows += len(chunk)
+        return {"file": os.path.basename(file_path), "table": table_name, "rows": rows,
+                "seconds": time.perf_counter() - start}
+
+    def ingest_files(self, file_paths: List[str], if_exists: str = "fail",
+                     table_names: Optional[Dict[str, str]] = None) -> List[Dict]:
+        """
+        Streams several files into tables named after them and reports the throughput, in parallel when more than
+        one worker is configured and the files total at least `parallel_min_bytes`.
+
+        Args:
+            file_paths (List[str]): The paths of the CSV or XLSX files.
+            if_exists (str): "fail", "replace" or "append", as in `df.to_sql`.
+            table_names (dict, optional): Maps file paths to table names, instead of the file names.
+
+        Returns:
+            List[dict]: The statistics of every file, as returned by `ingest_file`.
+
+        Raises:
+            ValueError: If a file is neither CSV nor XLSX.
+            RuntimeError: If files could not be ingested in parallel mode.
+        """
+        for file_path in file_paths:
+            if os.path.splitext(file_path)[1] not in SUPPORTED_EXTENSIONS:
+                raise ValueError("The selected file type is not supported")
+        table_names = {file_path: (table_names or {}).get(file_path) or table_name_for(file_path)
+                       for file_path in file_paths}
+        start = time.perf_counter()
+        if self.workers > 1 and len(file_paths) > 1 and \
+                sum(os.path.getsize(file_path) for file_path in file_paths) >= self.parallel_min_bytes:
+            stats = self._ingest_files_in_parallel(file_paths, table_names, if_exists=if_exists)
+        else:
+            stats = [self.ingest_file(file_path, table_name=table_names[file_path], if_exists=if_exists)
+                     for file_path in file_paths]
+        self.report(stats, time.perf_counter() - start)
+        return stats
+
+    def _ingest_files_in_parallel(self, file_paths: List[str], table_names: Dict[str, str],
+                                  if_exists: str = "fail") -> List[Dict]:
+        """
+        Parses the files in a process pool and writes their chunks from the calling process as they arrive.
+
+        Args:
+            file_paths (List[str]): The paths of the CSV or XLSX files.
+            table_names (dict): Maps every file path to its table name.
+            if_exists (str): "fail", "replace" or "append", as in `df.to_sql`.
+
+        Returns:
+            List[dict]: The statistics of every file, with the `parse_seconds` and `write_seconds` spent on it.
+
+        Raises:
+            RuntimeError: If some files could not be ingested. The other files are still loaded.
+        """
+        file_paths = list(dict.fromkeys(file_paths))
+        stats = {file_path: {"file": os.path.basename(file_path), "table": table_names[file_path],
+                             "rows": 0, "seconds": 0.0, "parse_seconds": 0.0, "write_seconds": 0.0}
+                 for file_path in file_paths}
+        inserts: Dict[str, str] = {}
+        errors: Dict[str, str] = {}
+        pending = set(file_paths)
+        pool, parsed_chunks, pool_lock = _get_parser_pool(self.workers, self.queue_chunks)
+        # Chunks left in the shared queue by an earlier run that failed are recognized and dropped
+        run_id = uuid.uuid4().hex
+        start = time.perf_counter()
+        with pool_lock, get_sqlite_pool(self.db_path, read_only=False).connection() as conn:
+            futures = {pool.submit(_parse_file, run_id, file_path, self.chunk_rows, self.sample_rows): file_path
+                       for file_path in file_paths}
+            try:
+                while pending:
+                    try:
+                        message_run_id, kind, file_path, payload = parsed_chunks.get(timeout=1)
+                    except queue.Empty:
+                        # A parser process that died cannot report its error itself
+                        for future, file_path in futures.items():
+                            if file_path in pending and future.done() and future.exception() is not None:
+                                errors.setdefault(file_path, str(future.exception()))
+                                pending.discard(file_path)
+                        continue
+                    if message_run_id != run_id:
+                        continue
+                    file_stats = stats[file_path]
+                    if kind in ("done", "error"):
+                        if kind == "error":
+                            errors.setdefault(file_path, payload)
+                        else:
+                            file_stats["parse_seconds"] = payload
+                        file_stats["seconds"] = time.perf_counter() - start
+                        pending.discard(file_path)
+                        continue
+                    if file_path in errors:
+                        # Drained so the parser is not blocked, but not written
+                        continue
+                    write_start = time.perf_counter()
+                    try:
+                        if kind == "schema":
+                            self.create_table(conn, file_stats["table"], payload, if_exists=if_exists)
+                            inserts[file_path] = _insert_statement(file_stats["table"], payload)
+                        else:
+                            with conn:
+                                conn.executemany(inserts[file_path], payload)
+                            file_stats["rows"] += len(payload)
+                    except (ValueError, sqlite3.Error) as e:
+                        errors[file_path] = str(e)
+                    file_stats["write_seconds"] += time.perf_counter() - write_start
+            finally:
+                # Whatever stopped the writer, parsers of this run must not stay blocked on the full queue, holding
+                # the pool's processes: the files not started are cancelled and the others drained until they end
+                for future in futures:
+                    future.cancel()
+                while not all(future.done() for future in futures):
+                    try:
+                        parsed_chunks.get(timeout=0.1)
+                    except queue.Empty:
+                        pass
+                if any(not future.cancelled() and isinstance(future.exception(), BrokenProcessPool)
+                       for future in futures):
+                    _discard_parser_pool(self.workers, self.queue_chunks)
+        if errors:
+            raise RuntimeError("Some files could not be ingested: " + "; ".join(
+                f"{os.path.basename(file_path)}: {message}" for file_path, message in errors.items()))
+        return [stats[file_path] for file_path in file_paths]
+
+    def sync_files(self, file_paths: List[str], prune: bool = True) -> Dict[str, List[str]]:
+        """
+        Brings the database in line with a set of files, loading only what changed since the last run.
+
+        A manifest table records the source file, SHA-256, size, modification time and row count of every table
+        loaded by this method. Files whose size and modification time, or else content hash, match the manifest are
+        skipped. New and changed files are loaded into staging tables first; each staging table then replaces its
+        table and its manifest entry in a single transaction, so readers never see a half-loaded table and a failed
+        load leaves the previous data in place. With `prune`, tables whose source file is no longer in `file_paths`
+        are dropped. Tables not recorded in the manifest are never dropped.
+
+        Args:
+            file_paths (List[str]): The paths of the CSV or XLSX files the database should contain.
+            prune (bool): Whether to drop the tables of files missing from `file_paths`.
+
+        Returns:
+            dict: The tables that were `loaded`, `skipped` and `dropped`.
+
+        Raises:
+            ValueError: If a file is neither CSV nor XLSX.
+        """
+        pool = get_sqlite_pool(self.db_path, read_only=False)
+        with pool.connection() as conn:
+            with conn:
+                conn.execute(
+                    f"CREATE TABLE IF NOT EXISTS {MANIFEST_TABLE} (table_name TEXT PRIMARY KEY, source TEXT, "
+                    f"sha256 TEXT, size INTEGER, mtime_ns INTEGER, rows INTEGER, ingested_at TEXT)")
+            manifest = {row[0]: row[1:] for row in conn.execute(
+                f"SELECT table_name, sha256, size, mtime_ns FROM {MANIFEST_TABLE}")}
+            existing = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+
+        changed, skipped, versions = [], [], {}
+        for file_path in file_paths:
+            table_name = table_name_for(file_path)
+            stat = os.stat(file_path)
+            entry = manifest.get(table_name)
+            if entry is not None and table_name in existing and entry[1:] == (stat.st_size, stat.st_mtime_ns):
+                skipped.append(table_name)
+                continue
+            sha256 = file_sha256(file_path)
+            versions[file_path] = (sha256, stat.st_size, stat.st_mtime_ns)
+            if entry is not None and table_name in existing and entry[0] == sha256:
+                # Touched but not modified: only the recorded modification time changes
+                with pool.connection() as conn, conn:
+                    conn.execute(f"UPDATE {MANIFEST_TABLE} SET mtime_ns = ?, size = ? WHERE table_name = ?",
+                                 (stat.st_mtime_ns, stat.st_size, table_name))
+                skipped.append(table_name)
+            else:
+                changed.append(file_path)
+
+        staging = {file_path: STAGING_PREFIX + table_name_for(file_path) for file_path in changed}
+        stats = []
+        if changed:
+            try:
+                stats = self.ingest_files(changed, if_exists="replace", table_names=staging)
+            except Exception:
+                with pool.connection() as conn, conn:
+                    for staging_table in staging.values():
+                        conn.execute(f"DROP TABLE IF EXISTS {_quote(staging_table)}")
+                raise
+
+        loaded = []
+        with pool.connection() as conn:
+            for file_stats, file_path in zip(stats, changed):
+                table_name = table_name_for(file_path)
+                if not conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+                                    (staging[file_path],)).fetchone():
+                    print(f"{os.path.basename(file_path)} is empty, the table {table_name} was left unchanged.")
+                    continue
+                with conn:
+                    conn.execute("BEGIN IMMEDIATE")
+                    conn.execute(f"DROP TABLE IF EXISTS {_quote(table_name)}")
+                    conn.execute(f"ALTER TABLE {_quote(staging[file_path])} RENAME TO {_quote(table_name)}")
+                    conn.execute(
+                        f"INSERT OR REPLACE INTO {MANIFEST_TABLE} VALUES (?, ?, ?, ?, ?, ?, datetime('now'))",
+                        (table_name, os.path.basename(file_path), *versions[file_path], file_stats["rows"]))
+                loaded.append(table_name)
+            dropped = []
+            if prune:
+                wanted = {table_name_for(file_path) for file_path in file_paths}
+                for table_name in sorted(set(manifest) - wanted):
+                    with conn:
+                        conn.execute("BEGIN IMMEDIATE")
+                        conn.execute(f"DROP TABLE IF EXISTS {_quote(table_name)}")
+                        conn.execute(f"DELETE FROM {MANIFEST_TABLE} WHERE table_name = ?", (table_name,))
+                    dropped.append(table_name)
+        print(f"Loaded {len(loaded)} new or changed files, skipped {len(skipped)} unchanged files, "
+              f"dropped {len(dropped)} tables of removed files{': ' + ', '.join(dropped) if dropped else ''}.")
+        return {"loaded": loaded, "skipped": skipped, "dropped": dropped}
+
+    @staticmethod
+    def report(stats: List[Dict], seconds: float) -> None:
+        """Prints the rows and rows/sec of every file and of the whole run."""
+        print("==============================")
+        for file_stats in stats:
+            rate = file_stats["rows"] / file_stats["seconds"] if file_stats["seconds"] else 0
+            timing = ""
+            if "parse_seconds" in file_stats:
+                timing = f", parse {file_stats['parse_seconds']:.2f}s, write {file_stats['write_seconds']:.2f}s"
+            print(f"{file_stats['file']} -> {file_stats['table']}: {file_stats['rows']} rows in "
+                  f"{file_stats['seconds']:.2f}s ({rate:,.0f} rows/sec{timing})")
+        total_rows = sum(file_stats["rows"] for file_stats in stats)
+        rate = total_rows / seconds if seconds else 0
+        print(f"Total: {total_rows} rows in {seconds:.2f}s ({rate:,.0f} rows/sec)")
@@ -0,0 +1,96 @@
+from functools import lru_cache
+from typing import Callable, Iterator, List, Optional
+
+try:
+    import tiktoken
+except ImportError:  # tiktoken is in requirements.txt, but token counts can be estimated without it
+    tiktoken = None
+
+
+@lru_cache(maxsize=8)
+def _encoding(model_name: str):
+    """Returns the tiktoken encoding of a model, or None when tiktoken cannot provide one."""
+    if tiktoken is None:
+        return None
+    try:
+        try:
+            return tiktoken.encoding_for_model(model_name)
+        except KeyError:
+            # Not an OpenAI model, e.g. a local embedding model
+            return tiktoken.get_encoding("cl100k_base")
+    except Exception:
+        # The encoding files could not be downloaded, e.g. offline
+        return None
+
+
+def count_tokens(text: str, model_name: str = "text-embedding-ada-002") -> int:
+    """
+    Counts the tokens of a text for an OpenAI model.
+
+    Uses tiktoken when available and otherwise estimates one token per four characters, which slightly
+    overestimates English text and is therefore safe for budgeting.
+
+    Args:
+        text (str): The text.
+        model_name (str): The model whose tokenizer to use.
+
+    Returns:
+        int: The number of tokens.
+    """
+    encoding = _encoding(model_name)
+    if encoding is None:
+        return len(text) // 4 + 1
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def truncate_to_tokens(text: str, max_tokens: int, model_name: str = "text-embedding-ada-002") -> str:
+    """
+    Cuts a text to at most `max_tokens` tokens of a model.
+
+    Args:
+        text (str): The text.
+        max_tokens (int): The maximum number of tokens to keep.
+        model_name (str): The model whose tokenizer to use.
+
+    Returns:
+        str: The beginning of the text, whole if it already fits.
+    """
+    if max_tokens <= 0:
+        return ""
+    encoding = _encoding(model_name)
+    if encoding is None:
+        # Mirrors the estimate of `count_tokens`
+        return text[:(max_tokens - 1) * 4]
+    tokens = encoding.encode(text, disallowed_special=())
+    if len(tokens) <= max_tokens:
+        return text
+    return encoding.decode(tokens[:max_tokens])
+
+
+def batch_by_tokens(texts: List[str], max_batch_size: int = 512, max_batch_tokens: int = 200000,
+                    token_counter: Optional[Callable[[str], int]] = None) -> Iterator[List[int]]:
+    """
+    Groups texts into batches bounded by a number of texts and a number of tokens, as embedding APIs require.
+
+    A text larger than `max_batch_tokens` on its own is put in a batch of its own.
+
+    Args:
+        texts (List[str]): The texts to group.
+        max_batch_size (int): The maximum number of texts per batch.
+        max_batch_tokens (int): The maximum total number of tokens per batch.
+        token_counter (Callable[[str], int], optional): Counts the tokens of a text. Defaults to `count_tokens`.
+
+    Yields:
+        List[int]: The indexes into `texts` of each batch, in order.
+    """
+    token_counter = token_counter or count_tokens
+    batch, batch_tokens = [], 0
+    for i, text in enumerate(texts):
+        tokens = token_counter(text)
+        if batch and (len(batch) >= max_batch_size or batch_tokens + tokens > max_batch_tokens):
+            yield batch
+            batch, batch_tokens = [], 0
+        batch.append(i)
+        batch_tokens += tokens
+    if batch:
+        yield batch
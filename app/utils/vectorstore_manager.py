@@ -0,0 +1,164 @@
+import os
+import time
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple
+import chromadb
+from langchain_chroma import Chroma
+
+
+class VectorStoreManager:
+    """
+    Keeps one open Chroma client per persist directory and one LangChain `Chroma` handle per collection for the
+    life of the process.
+
+    Opening a `chromadb.PersistentClient` loads the SQLite catalogue and the HNSW segments from disk, so the RAG
+    tools and `LoadConfig` share the handles kept here instead of reopening them on every query. Each handle is
+    health-checked at most once every `health_check_interval` seconds and reopened when the check fails or when the
+    collection's `chroma.sqlite3` file was rewritten by another process (e.g. a re-ingestion run).
+
+    Attributes:
+        health_check_interval (float): Minimum number of seconds between two health checks of the same handle.
+    """
+
+    def __init__(self, health_check_interval: float = 30.0) -> None:
+        """
+        Initializes an empty manager.
+
+        Args:
+            health_check_interval (float): Minimum number of seconds between two health checks of the same handle.
+        """
+        self.health_check_interval = health_check_interval
+        self._lock = threading.RLock()
+        self._clients: Dict[str, Any] = {}
+        # (persist_directory, collection_name) -> [vectordb, file signature, last health check time]
+        self._vectordbs: Dict[Tuple[str, str], list] = {}
+
+    @staticmethod
+    def _signature(persist_directory: str) -> Optional[Tuple[float, int]]:
+        """Returns the (mtime, size) signature of the collection catalogue, or None if it does not exist yet."""
+        catalogue = os.path.join(persist_directory, "chroma.sqlite3")
+        if not os.path.exists(catalogue):
+            return None
+        stat = os.stat(catalogue)
+        return stat.st_mtime, stat.st_size
+
+    def get_client(self, persist_directory: str):
+        """
+        Returns the shared persistent Chroma client for a directory.
+
+        Args:
+            persist_directory (str): The directory where the Chroma database is persisted.
+
+        Returns:
+            chromadb.PersistentClient: The shared client.
+        """
+        persist_directory = str(persist_directory)
+        with self._lock:
+            client = self._clients.get(persist_directory)
+            if client is None:
+                client = chromadb.PersistentClient(path=persist_directory)
+                self._clients[persist_directory] = client
+            return client
+
+    def get_vectordb(self, collection_name: str, persist_directory: str,
+                     embedding_function: Callable[[], Any]) -> Chroma:
+        """
+        Returns the shared LangChain `Chroma` handle for a collection, opening it on first use.
+
+        Args:
+            collection_name (str): The name of the collection inside the vector database.
+            persist_directory (str): The directory where the Chroma database is persisted.
+            embedding_function (Callable[[], Any]): A factory returning the embedding model used for queries. It is
+                only called when the handle is (re)opened.
+
+        Returns:
+            Chroma: The shared vector store handle.
+        """
+        key = (str(persist_directory), collection_name)
+        with self._lock:
+            entry = self._vectordbs.get(key)
+            if entry is not None and not self._needs_reload(key, entry):
+                return entry[0]
+            if entry is not None:
+                print(f"Reloading vector store '{collection_name}' from {persist_directory}")
+                self._drop_client(key[0])
+            vectordb = Chroma(
+                client=self.get_client(key[0]),
+                collection_name=collection_name,
+                embedding_function=embedding_function()
+            )
+            print("Number of vectors in vectordb:",
+                  vectordb._collection.count(), "\n\n")
+            self._vectordbs[key] = [vectordb, self._signature(key[0]), time.monotonic()]
+            return vectordb
+
+    def _needs_reload(self, key: Tuple[str, str], entry: list) -> bool:
+        """Checks whether a handle must be reopened because its files changed or it is no longer healthy."""
+        if entry[1] is not None and self._signature(key[0]) != entry[1]:
+            return True
+        now = time.monotonic()
+        if now - entry[2] < self.health_check_interval:
+            return False
+        entry[2] = now
+        return not self.is_healthy(entry[0])
+
+    @staticmethod
+    def is_healthy(vectordb: Chroma) -> bool:
+        """
+        Checks that a handle can still reach its collection.
+
+        Args:
+            vectordb (Chroma): The handle to check.
+
+        Returns:
+            bool: True if the client answers and the collection can be counted.
+        """
+        try:
+            vectordb._client.heartbeat()
+            vectordb._collection.count()
+            return True
+        except Exception as e:
+            print(f"Vector store health check failed: {e}")
+            return False
+
+    def _drop_client(self, persist_directory: str) -> None:
+        """Closes every handle opened on a directory so that the next access reopens it from disk."""
+        self._clients.pop(persist_directory, None)
+        for key in [key for key in self._vectordbs if key[0] == persist_directory]:
+            del self._vectordbs[key]
+        # Chroma shares one system per path inside the process, keyed by the path the client was opened with; drop
+        # only this directory's system so the files are read again without closing the other directories' clients.
+        system = chromadb.api.client.SharedSystemClient._identifier_to_system.pop(persist_directory, None)
+        if system is not None:
+            system.stop()
+
+    def mark_updated(self, persist_directory: str) -> None:
+        """
+        Records that this process wrote to a directory, so that its own writes do not trigger a reload.
+
+        Args:
+            persist_directory (str): The directory that was written to.
+        """
+        persist_directory = str(persist_directory)
+        with self._lock:
+            for key, entry in self._vectordbs.items():
+                if key[0] == persist_directory:
+                    entry[1] = self._signature(persist_directory)
+
+    def reload(self, persist_directory: Optional[str] = None) -> None:
+        """
+        Drops the handles of one directory (or all of them) so they are reopened on the next access.
+
+        Args:
+            persist_directory (str, optional): The directory to reload. If omitted, every handle is dropped.
+        """
+        with self._lock:
+            if persist_directory is None:
+                self._clients.clear()
+                self._vectordbs.clear()
+                chromadb.api.client.SharedSystemClient.clear_system_cache()
+            else:
+                self._drop_client(str(persist_directory))
+
+
+VECTORSTORE_MANAGER = VectorStoreManager()
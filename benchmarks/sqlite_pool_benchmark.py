@@ -0,0 +1,182 @@
+"""
+Compares the latency of SQL queries run with a new connection per query (the previous behaviour) and on the shared,
+tuned connection pool of `app/utils/sqlite_pool.py`, at two levels:
+
+- raw `sqlite3` connections, which isolates the cost of opening and tuning a connection;
+- the paths the SQL agents run their queries through: the `BoundedSQLRunner` result pager (without its result
+  cache and cost guard, so every query reaches SQLite) and `SQLDatabase.run`, with an engine opened per tool call
+  as before and with the pooled engine of `load_sql_database`. The `SQLDatabase` strategies are skipped when
+  `langchain_community` is not installed.
+
+The queries are point lookups and small aggregates over the largest table of the database, not queries written by
+the LLM, so the numbers measure the connection overhead of each path rather than end-to-end agent latency.
+
+Usage:
+    python -m benchmarks.sqlite_pool_benchmark [path/to/database.db] [--queries N]
+
+Without a database path, a synthetic database of 200,000 rows is created in a temporary directory.
+"""
+import os
+import sys
+import time
+import random
+import sqlite3
+import argparse
+import tempfile
+import statistics
+from contextlib import contextmanager, nullcontext
+from unittest import mock
+from typing import Callable, ContextManager, List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app.utils.sqlite_pool import SQLitePool, create_sqlite_engine  # noqa: E402
+from app.agent_graph import sql_pagination  # noqa: E402
+from app.agent_graph.sql_pagination import BoundedSQLRunner  # noqa: E402
+
+
+class ConnectionPerQuery:
+    """Stands in for the pool of a database, opening a new connection per query as the pager did before it."""
+
+    def __init__(self, db_path: str, read_only: bool = True) -> None:
+        self.db_path = db_path
+
+    @contextmanager
+    def connection(self):
+        """Opens a connection for one query and closes it afterwards."""
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+
+def build_synthetic_db(db_path: str, rows: int = 200_000) -> None:
+    """Creates a table shaped like the Chinook invoice lines, with an index on the lookup column."""
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE InvoiceLine (InvoiceLineId INTEGER PRIMARY KEY, InvoiceId INTEGER, "
+                 "TrackId INTEGER, UnitPrice REAL, Quantity INTEGER)")
+    conn.executemany(
+        "INSERT INTO InvoiceLine VALUES (?, ?, ?, ?, ?)",
+        ((i, i // 5, random.randint(1, 3500), round(random.uniform(0.5, 2.0), 2), random.randint(1, 3))
+         for i in range(rows)))
+    conn.execute("CREATE INDEX IX_InvoiceLine_TrackId ON InvoiceLine (TrackId)")
+    conn.commit()
+    conn.close()
+
+
+def pick_queries(db_path: str, n: int) -> List[str]:
+    """Returns a mix of point lookups and small aggregates over the largest table of the database."""
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    tables = [row[0] for row in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'")]
+    table = max(tables, key=lambda name: conn.execute(f'SELECT COUNT(*) FROM "{name}"').fetchone()[0])
+    max_rowid = conn.execute(f'SELECT MAX(rowid) FROM "{table}"').fetchone()[0] or 1
+    conn.close()
+    queries = []
+    for i in range(n):
+        if i % 4 == 3:
+            start = random.randint(1, max_rowid)
+            queries.append(f'SELECT COUNT(*) FROM "{table}" WHERE rowid BETWEEN {start} AND {start + 1000}')
+        else:
+            queries.append(f'SELECT * FROM "{table}" WHERE rowid = {random.randint(1, max_rowid)}')
+    return queries
+
+
+def measure(run: Callable[[str], list], queries: List[str]) -> List[float]:
+    """Runs every query and returns the latencies in milliseconds."""
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        run(query)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+Strategy = Tuple[str, Callable[[str], object], Callable[[], ContextManager]]
+
+
+def agent_strategies(db_path: str) -> List[Strategy]:
+    """
+    Returns the query paths of the SQL agents, the `SQLDatabase` ones only if langchain_community is installed.
+    Each comes with the context it is measured in, outside the timed calls.
+    """
+    pager = BoundedSQLRunner()
+
+    def run_pager(query: str) -> str:
+        return pager.run(db_path, query)
+
+    strategies = [
+        ("agent pager, connection/query", run_pager,
+         lambda: mock.patch.object(sql_pagination, "get_sqlite_pool", ConnectionPerQuery)),
+        ("agent pager, pooled", run_pager, nullcontext)]
+    try:
+        from langchain_community.utilities import SQLDatabase
+    except ImportError:
+        print("langchain_community is not installed: skipping the SQLDatabase strategies")
+        return strategies
+
+    def sql_database_new_engine(query: str) -> str:
+        db = SQLDatabase.from_uri(f"sqlite:///{db_path}", lazy_table_reflection=True)
+        try:
+            return db.run(query)
+        finally:
+            db._engine.dispose()
+
+    pooled_db = SQLDatabase(engine=create_sqlite_engine(db_path), lazy_table_reflection=True)
+    strategies += [("SQLDatabase, engine per call", sql_database_new_engine, nullcontext),
+                   ("SQLDatabase, pooled engine", pooled_db.run, nullcontext)]
+    return strategies
+
+
+def report(name: str, latencies: List[float]) -> None:
+    """Prints the median and 95th percentile latency."""
+    p95 = statistics.quantiles(latencies, n=20)[-1]
+    print(f"{name:<30} p50 {statistics.median(latencies):7.3f} ms   p95 {p95:7.3f} ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("db_path", nargs="?", help="The SQLite database to query. A synthetic one if omitted.")
+    parser.add_argument("--queries", type=int, default=2000, help="The number of queries per strategy.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = args.db_path
+        if db_path is None:
+            db_path = os.path.join(tmp_dir, "synthetic.db")
+            build_synthetic_db(db_path)
+        queries = pick_queries(db_path, args.queries)
+
+        def new_connection_per_query(query: str) -> list:
+            conn = sqlite3.connect(db_path)
+            try:
+                return conn.execute(query).fetchall()
+            finally:
+                conn.close()
+
+        pool = SQLitePool(db_path, read_only=True)
+
+        def pooled(query: str) -> list:
+            with pool.connection() as conn:
+                return conn.execute(query).fetchall()
+
+        immutable_pool = SQLitePool(db_path, read_only=True, immutable=True)
+
+        def pooled_immutable(query: str) -> list:
+            with immutable_pool.connection() as conn:
+                return conn.execute(query).fetchall()
+
+        print(f"{len(queries)} queries against {db_path}")
+        strategies = [("new connection per query", new_connection_per_query, nullcontext),
+                      ("pooled read-only", pooled, nullcontext),
+                      ("pooled read-only immutable", pooled_immutable, nullcontext)] + agent_strategies(db_path)
+        for name, run, context in strategies:
+            with context():
+                measure(run, queries[:100])
+                report(name, measure(run, queries))
+        pool.close()
+        immutable_pool.close()
+
+
+if __name__ == "__main__":
+    main()